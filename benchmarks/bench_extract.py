@@ -0,0 +1,106 @@
+# benchmarks/bench_extract.py
+
+"""
+Benchmark da extração de informações e do cache de metadados, sem internet.
+
+Usa o yt-dlp falso (`benchmarks.fake_ytdl`), que devolve dicionários do tamanho
+dos reais, e mede:
+  - extract_info: falha de cache (extração + gravação), acerto em memória e
+    acerto no SQLite (novo Downloader, com o LRU vazio), por vídeo e por playlist;
+  - cache em escala: `CacheManager.save_info` e `get_info` com milhares de
+    entradas (a maioria fora do LRU em memória) e o tamanho do banco resultante.
+
+`--extract-latency` simula o tempo de rede de cada extração; o padrão (0)
+mede apenas o custo local.
+
+Uso:
+    python -m benchmarks.bench_extract --videos 200 --playlist 200 --cache-entries 2000
+"""
+
+import os
+import random
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from benchmarks.fake_ytdl import installed, make_info
+from src.core.cache import CacheManager
+from src.core.downloader import Downloader
+
+def _video_urls(count: int, prefix: str = "bench") -> list:
+    return [f"https://www.youtube.com/watch?v={prefix}{i:06d}" for i in range(count)]
+
+def _quiet(message, level="info"):
+    pass
+
+def measure_extract(videos: int, playlist_size: int, extract_latency: float) -> dict:
+    results = {}
+    urls = _video_urls(videos)
+    playlist_url = f"https://www.youtube.com/playlist?list=PLbench&n={playlist_size}"
+    with installed(extract_latency=extract_latency) as fake:
+        downloader = Downloader(logger_callback=_quiet)
+        with Timer() as timer:
+            for url in urls: downloader.extract_info(url)
+        results['video_miss_ms'] = timer.elapsed * 1000 / videos
+        with Timer() as timer:
+            for url in urls: downloader.extract_info(url)
+        results['video_hit_memory_ms'] = timer.elapsed * 1000 / videos
+
+        # Um novo Downloader tem o LRU vazio: os acertos vêm do SQLite
+        downloader.cache_manager.stop_background_purge()
+        downloader = Downloader(logger_callback=_quiet)
+        with Timer() as timer:
+            for url in urls: downloader.extract_info(url)
+        results['video_hit_db_ms'] = timer.elapsed * 1000 / videos
+
+        calls_before = len(fake.calls)
+        with Timer() as timer:
+            downloader.extract_info(playlist_url, download_playlist=True)
+        results['playlist_miss_ms'] = timer.elapsed * 1000
+        results['playlist_miss_extractions'] = len(fake.calls) - calls_before
+        with Timer() as timer:
+            downloader.extract_info(playlist_url, download_playlist=True)
+        results['playlist_hit_ms'] = timer.elapsed * 1000
+        downloader.cache_manager.stop_background_purge()
+        downloader.stats_manager.flush()  # Ainda dentro do diretório temporário (o caminho das estatísticas é relativo)
+    results['memory_hit_speedup'] = results['video_miss_ms'] / max(results['video_hit_memory_ms'], 1e-9)
+    results['db_hit_speedup'] = results['video_miss_ms'] / max(results['video_hit_db_ms'], 1e-9)
+    return results
+
+def measure_cache_scale(entries: int, reads: int) -> dict:
+    results = {}
+    urls = _video_urls(entries, prefix="scale")
+    infos = [make_info(url.rsplit('=', 1)[1], "http://127.0.0.1:9") for url in urls[:50]]
+    cache = CacheManager()
+    with Timer() as timer:
+        for i, url in enumerate(urls): cache.save_info(url, infos[i % len(infos)])
+    results['cache_save_per_sec'] = entries / timer.elapsed
+    rng = random.Random(42)
+    sample = [rng.choice(urls) for _ in range(reads)]
+    cache = CacheManager()  # LRU vazio: a maior parte das leituras vai ao SQLite
+    with Timer() as timer:
+        for url in sample: cache.get_info(url)
+    results['cache_get_per_sec'] = reads / timer.elapsed
+    stats = cache.get_stats()
+    results['cache_memory_hit_rate'] = stats['memory_hits'] / max(stats['hits'], 1)
+    results['cache_rows'] = stats['rows']
+    results['cache_bytes_per_entry'] = stats['bytes'] / max(stats['rows'], 1)
+    db_path = cache.db_path
+    results['cache_db_file_mb'] = sum(os.path.getsize(db_path + suffix) for suffix in ('', '-wal') if os.path.exists(db_path + suffix)) / 2**20
+    return results
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--playlist", type=int, default=200, help="Número de vídeos da playlist.")
+    parser.add_argument("--cache-entries", type=int, default=2000)
+    parser.add_argument("--cache-reads", type=int, default=5000)
+    parser.add_argument("--extract-latency", type=float, default=0.0, help="Atraso simulado por extração, em segundos.")
+    args = parser.parse_args(argv)
+    with temp_workdir():
+        results = measure_extract(args.videos, args.playlist, args.extract_latency)
+        results.update(measure_cache_scale(args.cache_entries, args.cache_reads))
+    print_results(f"extract_info e cache ({args.videos} vídeos, playlist de {args.playlist}, {args.cache_entries} entradas)", results)
+    write_json(args.json, "extract", results)
+    return results
+
+if __name__ == "__main__":
+    main()
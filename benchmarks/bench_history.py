@@ -0,0 +1,79 @@
+# benchmarks/bench_history.py
+
+"""
+Benchmark da gravação do histórico ao final de uma playlist.
+
+Compara, para uma playlist de N entradas (1.000 por padrão):
+  - legacy:  uma conexão e uma transação por registro (comportamento antigo);
+  - add_entry: uma transação por registro, com a conexão compartilhada;
+  - add_entries: todos os registros numa única transação (`executemany`);
+  - async: registros enfileirados por várias threads no HistoryWriter.
+
+Uso:
+    python -m benchmarks.bench_history --entries 1000
+"""
+
+import datetime
+import sqlite3
+import threading
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from src.core.history import HistoryManager
+
+def _entries(count: int) -> list:
+    return [{'title': f"Vídeo {i}", 'url': f"https://www.youtube.com/watch?v=vid{i:08d}", 'size_bytes': 1024 * i}
+            for i in range(count)]
+
+def _legacy_insert(db_path: str, entry: dict):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO download_history (title, url, download_date, size_bytes) VALUES (?, ?, ?, ?)",
+                     (entry['title'], entry['url'], datetime.datetime.now().isoformat(), entry['size_bytes']))
+        conn.commit()
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=4, help="Threads produtoras no modo async.")
+    args = parser.parse_args(argv)
+    entries = _entries(args.entries)
+    results = {}
+
+    with temp_workdir():
+        manager = HistoryManager()
+
+        manager.clear_history()
+        with Timer() as timer:
+            for entry in entries:
+                _legacy_insert(manager.db_path, entry)
+        results['legacy_seconds'] = timer.elapsed
+
+        manager.clear_history()
+        with Timer() as timer:
+            for entry in entries:
+                manager.add_entry(entry['title'], entry['url'], entry['size_bytes'])
+        results['add_entry_seconds'] = timer.elapsed
+
+        manager.clear_history()
+        with Timer() as timer:
+            manager.add_entries(entries)
+        results['add_entries_seconds'] = timer.elapsed
+
+        manager.clear_history()
+        chunks = [entries[i::args.threads] for i in range(args.threads)]
+        with Timer() as timer:
+            producers = [threading.Thread(target=lambda chunk=chunk: [manager.add_entry_async(e['title'], e['url'], e['size_bytes']) for e in chunk])
+                         for chunk in chunks]
+            for producer in producers: producer.start()
+            for producer in producers: producer.join()
+            manager.flush()
+        results['async_seconds'] = timer.elapsed
+        results['rows_written'] = len(manager.get_all_entries())
+
+    for mode in ('legacy', 'add_entry', 'add_entries', 'async'):
+        results[f'{mode}_entries_per_sec'] = args.entries / results[f'{mode}_seconds']
+    print_results(f"history ({args.entries} entradas)", results)
+    write_json(args.json, "history", results)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_history_scale.py
+
+"""
+Benchmark das consultas do histórico com um histórico grande (100.000 registros por padrão).
+
+Preenche o histórico em lotes (`add_entries`) e mede a latência, em ms, de:
+  - first_page: a primeira página exibida na aba de histórico;
+  - deep_page: uma página no fim do histórico (paginação por cursor);
+  - has_entry: a verificação de "já baixado" feita antes de cada download;
+  - search: a busca por texto (FTS5, ou LIKE se indisponível), comum e rara;
+  - since: os registros novos desde o último exibido (atualização da aba).
+
+Uso:
+    python -m benchmarks.bench_history_scale --rows 100000 --repeat 200
+"""
+
+import random
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from src.core.history import HistoryManager
+
+BATCH_SIZE = 5000
+WORDS = ("música", "ao vivo", "tutorial", "python", "receita", "podcast", "trailer", "review", "jogo", "aula")
+
+def _row(i: int, rng: random.Random) -> dict:
+    words = " ".join(rng.sample(WORDS, 3))
+    return {'title': f"{words.title()} parte {i}", 'url': f"https://www.youtube.com/watch?v=h{i:010d}",
+            'size_bytes': rng.randint(1, 500) * 2**20, 'uploader': f"Canal {i % 500}"}
+
+def _time_ms(function, repeat: int) -> float:
+    with Timer() as timer:
+        for _ in range(repeat): function()
+    return timer.elapsed * 1000 / repeat
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=200, help="Repetições de cada consulta.")
+    args = parser.parse_args(argv)
+    rng = random.Random(7)
+    results = {}
+
+    with temp_workdir():
+        manager = HistoryManager()
+        with Timer() as timer:
+            for start in range(0, args.rows, BATCH_SIZE):
+                manager.add_entries([_row(i, rng) for i in range(start, min(start + BATCH_SIZE, args.rows))])
+        results['fill_rows_per_sec'] = args.rows / timer.elapsed
+        results['fts_enabled'] = manager.fts_enabled
+
+        first_page = manager.get_page(200)
+        results['first_page_ms'] = _time_ms(lambda: manager.get_page(200), args.repeat)
+        # Uma página perto do fim do histórico (ids 400 a 201): o custo não deve depender da posição
+        results['deep_page_ms'] = _time_ms(lambda: manager.get_page(200, before_id=401), args.repeat)
+        lookups = [f"https://youtu.be/h{rng.randrange(args.rows * 2):010d}" for _ in range(args.repeat)]
+        lookups_iter = iter(lookups)
+        results['has_entry_ms'] = _time_ms(lambda: manager.has_entry(next(lookups_iter)), args.repeat)
+        results['search_common_ms'] = _time_ms(lambda: manager.search("tutorial", limit=200), args.repeat)
+        results['search_rare_ms'] = _time_ms(lambda: manager.search(f"parte {args.rows - 1}", limit=200), args.repeat)
+        results['search_prefix_ms'] = _time_ms(lambda: manager.search("pyth", limit=200), args.repeat)
+        results['since_ms'] = _time_ms(lambda: manager.get_entries_since(first_page[0][0] - 50), args.repeat)
+
+    print_results(f"histórico em escala ({args.rows} registros)", results)
+    write_json(args.json, "history_scale", results)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# benchmarks/bench_ratelimit.py
+
+"""
+Benchmark do limite global de banda e do limite de conexões por site, sem internet.
+
+Os jobs passam pelo caminho completo da aplicação (DownloadScheduler ->
+Downloader -> yt-dlp falso -> MediaServer local), com mais workers que o limite
+de conexões por site e URLs de dois sites (variações do YouTube e do Vimeo).
+São medidos:
+  - unlimited: a vazão somada sem limite de banda, como referência;
+  - limited: a vazão somada com `max_download_speed_kb`, que deve ficar dentro
+    do orçamento (mais a rajada inicial do token bucket e `--tolerance`);
+  - live: o limite é alterado no arquivo de configuração no meio da execução, e
+    a vazão de cada janela (antes e depois) é comparada com o limite vigente;
+  - o máximo de downloads simultâneos por site, que não pode passar de
+    `max_connections_per_host`.
+
+Sai com código 1 se algum limite for violado.
+
+Uso:
+    python -m benchmarks.bench_ratelimit --jobs 12 --workers 6 --rate-kb 4096 --live-rate-kb 1024,6144
+"""
+
+import sys
+import threading
+import time
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from benchmarks.fake_ytdl import MediaServer, installed
+from src.core.config import get_config
+from src.core.downloader import Downloader
+from src.core.ratelimit import DEFAULT_BURST_SECONDS
+from src.core.scheduler import DownloadScheduler, JobStatus
+
+FORMAT_CODE = "137+140"
+# Janela ignorada logo após a troca do limite: a dívida do token bucket ainda reflete o limite anterior
+SETTLE_SECONDS = 0.3
+
+def _quiet(message, level="info"):
+    pass
+
+def _urls(prefix: str, count: int) -> list:
+    templates = ("https://www.youtube.com/watch?v={}", "https://youtu.be/{}", "https://vimeo.com/{}")
+    return [templates[i % len(templates)].format(f"{prefix}{i:06d}") for i in range(count)]
+
+class Meter:
+    """Progress hook que acumula os bytes recebidos por todos os downloads, com o instante de cada evento."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = {}
+        self.samples = []  # (instante, total acumulado)
+        self.total = 0
+
+    def observe(self, d: dict):
+        key = d.get('tmpfilename') or d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._lock:
+            delta = downloaded - self._last.get(key, 0)
+            if d.get('status') == 'downloading': self._last[key] = downloaded
+            else: self._last.pop(key, None)
+            self.total += max(delta, 0)
+            self.samples.append((time.monotonic(), self.total))
+
+    def bytes_between(self, start: float, end: float) -> int:
+        with self._lock:
+            before = next((total for at, total in reversed(self.samples) if at <= start), 0)
+            after = next((total for at, total in reversed(self.samples) if at <= end), 0)
+        return after - before
+
+class HostSampler:
+    """Registra o máximo de downloads simultâneos por site observado no HostLimiter."""
+
+    def __init__(self, limiter, interval: float = 0.005):
+        self.limiter = limiter
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            for host, count in self.limiter.active().items():
+                self.peaks[host] = max(self.peaks.get(host, 0), count)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set(); self._thread.join()
+
+def run_jobs(downloader: Downloader, urls: list, workers: int, on_started=None) -> float:
+    scheduler = DownloadScheduler(downloader, max_workers=workers)
+    with Timer() as timer:
+        submitted = [scheduler.submit(url, FORMAT_CODE) for url in urls]
+        if on_started: on_started(time.monotonic())
+        scheduler.wait_all()
+    scheduler.shutdown()
+    failed = [job for job in submitted if job.status != JobStatus.COMPLETED]
+    if failed:
+        raise RuntimeError(f"{len(failed)} job(s) falharam: {failed[0].error}")
+    return timer.elapsed
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=6)
+    parser.add_argument("--connections-per-host", type=int, default=2)
+    parser.add_argument("--rate-kb", type=int, default=4096, help="Limite global da fase 'limited', em KB/s.")
+    parser.add_argument("--live-rate-kb", default="1024,6144", help="Limites antes e depois da troca na fase 'live', em KB/s.")
+    parser.add_argument("--switch-after", type=float, default=1.5, help="Segundos até a troca do limite na fase 'live'.")
+    parser.add_argument("--media-scale", type=float, default=0.02,
+                        help="Fração do tamanho real servida (1.0 = ~88 MB por job de 4 minutos em 1080p).")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Excesso relativo tolerado sobre o limite.")
+    args = parser.parse_args(argv)
+    before_kb, after_kb = (int(value) for value in args.live_rate_kb.split(','))
+    results = {}
+    violations = []
+
+    server = MediaServer()
+    try:
+        with temp_workdir(), installed(server, media_scale=args.media_scale):
+            config = get_config()
+            config.update(max_download_speed_kb=0, max_connections_per_host=args.connections_per_host)
+            downloader = Downloader(logger_callback=_quiet)
+            meter = Meter()
+            hook = downloader._progress_hook
+            downloader._progress_hook = lambda d: (meter.observe(d), hook(d))
+
+            with HostSampler(downloader.host_limiter) as sampler:
+                start = meter.total
+                elapsed = run_jobs(downloader, _urls("free", args.jobs), args.workers)
+                results['unlimited.mb_per_sec'] = (meter.total - start) / 2**20 / elapsed
+
+                config.update(max_download_speed_kb=args.rate_kb)
+                budget = args.rate_kb * 1024
+                start = meter.total
+                elapsed = run_jobs(downloader, _urls("lim", args.jobs), args.workers)
+                allowed = budget * (elapsed * (1 + args.tolerance) + DEFAULT_BURST_SECONDS)
+                results['limited.budget_kb'] = args.rate_kb
+                results['limited.observed_kb'] = (meter.total - start) / 1024 / elapsed
+                results['limited.budget_utilization'] = (meter.total - start) / (budget * elapsed)
+                if meter.total - start > allowed:
+                    violations.append(f"limited: {results['limited.observed_kb']:,.0f} KB/s com limite de {args.rate_kb} KB/s")
+
+                config.update(max_download_speed_kb=before_kb)
+                started = {}
+                def switch_later(at):
+                    started['at'] = at
+                    def switch():
+                        started['switch'] = time.monotonic()
+                        config.update(max_download_speed_kb=after_kb)
+                    timer = threading.Timer(args.switch_after, switch); timer.daemon = True; timer.start()
+                    started['timer'] = timer
+                elapsed = run_jobs(downloader, _urls("live", args.jobs), args.workers, on_started=switch_later)
+                started['timer'].cancel()
+                end = started['at'] + elapsed
+                if 'switch' not in started:
+                    violations.append("live: os downloads terminaram antes da troca do limite (aumente --jobs ou reduza --switch-after)")
+                else:
+                    windows = {'before': (started['at'], started['switch'], before_kb),
+                               'after': (started['switch'] + SETTLE_SECONDS, end, after_kb)}
+                    for name, (window_start, window_end, limit_kb) in windows.items():
+                        seconds = window_end - window_start
+                        if seconds <= 0: continue
+                        moved = meter.bytes_between(window_start, window_end)
+                        results[f'live.{name}.budget_kb'] = limit_kb
+                        results[f'live.{name}.observed_kb'] = moved / 1024 / seconds
+                        if moved > limit_kb * 1024 * (seconds * (1 + args.tolerance) + DEFAULT_BURST_SECONDS):
+                            violations.append(f"live.{name}: {moved / 1024 / seconds:,.0f} KB/s com limite de {limit_kb} KB/s")
+                    if results.get('live.after.observed_kb', 0) <= before_kb * (1 + args.tolerance):
+                        violations.append("live: a vazão não acompanhou o aumento do limite")
+
+            for host, peak in sorted(sampler.peaks.items()):
+                results[f'hosts.{host}.max_concurrent'] = peak
+                if peak > args.connections_per_host:
+                    violations.append(f"hosts: {peak} downloads simultâneos de '{host}' (limite {args.connections_per_host})")
+            downloader.cache_manager.stop_background_purge()
+            downloader.history_manager.flush()
+            downloader.stats_manager.flush()  # Ainda dentro do diretório temporário (o caminho das estatísticas é relativo)
+            config.unsubscribe(downloader._on_config_changed)
+    finally:
+        server.close()
+
+    results['violations'] = violations
+    print_results(f"limite de banda ({args.jobs} jobs, {args.workers} workers, {args.connections_per_host} conexões por site)", results)
+    for violation in violations:
+        print(f"VIOLAÇÃO: {violation}")
+    write_json(args.json, "ratelimit", results)
+    return results
+
+if __name__ == "__main__":
+    sys.exit(1 if main()['violations'] else 0)
@@ -0,0 +1,163 @@
+# benchmarks/bench_segmented.py
+
+"""
+Benchmark do download segmentado (várias conexões com Range), sem internet.
+
+O MediaServer local limita a vazão de cada conexão (`--connection-rate`), como
+as CDNs reais. São medidos e verificados (o conteúdo de todo arquivo baixado é
+comparado byte a byte com o esperado):
+  - single/segmented_<n>: a vazão de um arquivo grande com 1 e com n conexões;
+  - faults: o download com uma a cada `--fault-every` respostas interrompida no
+    meio, que deve terminar íntegro graças às novas tentativas por segmento;
+  - resume: um download interrompido no meio e retomado pelo mapa de segmentos,
+    que não deve baixar de novo os bytes já gravados;
+  - downloader: o caminho completo (Downloader + yt-dlp falso) com um formato
+    único (segmentado), uma mesclagem e um servidor sem Range (ambos pelo yt-dlp).
+
+Sai com código 1 se alguma verificação falhar.
+
+Uso:
+    python -m benchmarks.bench_segmented --size-mb 64 --connections 4,8 --connection-rate 8
+"""
+
+import os
+import sys
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from benchmarks.fake_ytdl import MediaServer, installed, expected_media
+from src.core.config import get_config
+from src.core.downloader import Downloader
+from src.core.segmented import SegmentedDownloader, MAP_SUFFIX, PART_SUFFIX
+
+def _quiet(message, level="info"):
+    pass
+
+class _Interrupt(Exception):
+    pass
+
+def _media_url(server: MediaServer, name: str, size: int) -> str:
+    return f"{server.base_url}/media/{name}/direct?size={size}"
+
+def _intact(path: str, size: int) -> bool:
+    with open(path, 'rb') as f:
+        return f.read() == expected_media(size)
+
+def measure_throughput(server: MediaServer, size: int, connections: int, failures: list) -> float:
+    path = f"throughput_{connections}.bin"
+    with Timer() as timer:
+        SegmentedDownloader(connections=connections).download(_media_url(server, f"t{connections}", size), path)
+    if not _intact(path, size):
+        failures.append(f"{connections} conexão(ões): conteúdo diferente do esperado")
+    os.remove(path)
+    return size / 2**20 / timer.elapsed
+
+def measure_faults(server: MediaServer, size: int, connections: int, fault_every: int, failures: list) -> dict:
+    path = "faults.bin"
+    server.fault_every, faults_before = fault_every, server.faults
+    try:
+        with Timer() as timer:
+            SegmentedDownloader(connections=connections, retries=10).download(_media_url(server, "faults", size), path)
+    finally:
+        server.fault_every = 0
+    if not _intact(path, size):
+        failures.append("faults: conteúdo diferente do esperado")
+    os.remove(path)
+    return {'faults.injected': server.faults - faults_before, 'faults.mb_per_sec': size / 2**20 / timer.elapsed}
+
+def measure_resume(server: MediaServer, size: int, connections: int, failures: list) -> dict:
+    path = "resume.bin"
+    url = _media_url(server, "resume", size)
+
+    def interrupt(d):
+        if d['status'] == 'downloading' and d['downloaded_bytes'] >= size // 2:
+            raise _Interrupt()
+    try:
+        SegmentedDownloader(connections=connections).download(url, path, progress_hooks=[interrupt])
+        failures.append("resume: o download não foi interrompido")
+    except Exception:
+        pass
+    if not (os.path.exists(path + PART_SUFFIX) and os.path.exists(path + MAP_SUFFIX)):
+        failures.append("resume: o arquivo parcial ou o mapa de segmentos não foi preservado")
+
+    events = []
+    with Timer() as timer:
+        SegmentedDownloader(connections=connections).download(url, path, progress_hooks=[events.append])
+    downloading = [d for d in events if d['status'] == 'downloading']
+    already_done = downloading[0]['downloaded_bytes'] - (downloading[1]['downloaded_bytes'] - downloading[0]['downloaded_bytes']) if len(downloading) > 1 else 0
+    fetched = sum(b['downloaded_bytes'] - a['downloaded_bytes'] for a, b in zip(downloading, downloading[1:]))
+    if not _intact(path, size):
+        failures.append("resume: conteúdo diferente do esperado")
+    if already_done < size // 4:
+        failures.append(f"resume: apenas {already_done} bytes aproveitados da tentativa anterior")
+    if os.path.exists(path + MAP_SUFFIX) or os.path.exists(path + PART_SUFFIX):
+        failures.append("resume: o mapa de segmentos ou o arquivo parcial não foi removido")
+    os.remove(path)
+    return {'resume.reused_fraction': already_done / size, 'resume.refetched_fraction': fetched / size,
+            'resume.seconds': timer.elapsed}
+
+def measure_downloader(server: MediaServer, media_scale: float, failures: list) -> dict:
+    results = {}
+    config = get_config()
+    config.update(prefer_aria2c=True, segmented_connections=4, max_download_speed_kb=0)
+    downloader = Downloader(logger_callback=_quiet)
+    cases = [('single_format', "137", None, True), ('per_job_disabled', "137", False, False),
+             ('merged', "137+140", None, False)]
+    with installed(server, media_scale=media_scale):
+        for name, format_code, segmented, expect_segmented in cases:
+            events = []
+            with Timer() as timer:
+                downloader.download(f"https://www.youtube.com/watch?v={name}", format_code,
+                                    progress_hook=events.append, segmented=segmented)
+            used = any(str(d.get('tmpfilename', '')).endswith(PART_SUFFIX) for d in events)
+            results[f'downloader.{name}.seconds'] = timer.elapsed
+            if used != expect_segmented:
+                failures.append(f"downloader.{name}: download segmentado {'não ' if expect_segmented else ''}utilizado")
+    no_ranges = MediaServer(rate=None, ranges=False)
+    try:
+        with installed(no_ranges, media_scale=media_scale):
+            events = []
+            downloader.download("https://www.youtube.com/watch?v=noranges", "137", progress_hook=events.append)
+            if any(str(d.get('tmpfilename', '')).endswith(PART_SUFFIX) for d in events) or not any(d['status'] == 'finished' for d in events):
+                failures.append("downloader.no_ranges: não voltou ao download padrão do yt-dlp")
+    finally:
+        no_ranges.close()
+    downloader.cache_manager.stop_background_purge()
+    downloader.history_manager.flush()
+    downloader.stats_manager.flush()  # Ainda dentro do diretório temporário (o caminho das estatísticas é relativo)
+    config.unsubscribe(downloader._on_config_changed)
+    return results
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=64)
+    parser.add_argument("--connections", default="4,8", help="Números de conexões testados, separados por vírgula.")
+    parser.add_argument("--connection-rate", type=float, default=8.0, help="Limite por conexão, em MB/s (0 para sem limite).")
+    parser.add_argument("--fault-every", type=int, default=3, help="Uma a cada N respostas é interrompida na fase 'faults'.")
+    parser.add_argument("--media-scale", type=float, default=0.05, help="Escala da mídia na fase 'downloader'.")
+    args = parser.parse_args(argv)
+    size = int(args.size_mb * 2**20)
+    levels = [int(value) for value in args.connections.split(',')]
+    results, failures = {}, []
+
+    server = MediaServer(rate=args.connection_rate * 2**20 or None)
+    try:
+        with temp_workdir():
+            results['single.mb_per_sec'] = measure_throughput(server, size, 1, failures)
+            for connections in levels:
+                results[f'segmented_{connections}.mb_per_sec'] = measure_throughput(server, size, connections, failures)
+                results[f'segmented_{connections}.speedup'] = results[f'segmented_{connections}.mb_per_sec'] / results['single.mb_per_sec']
+            results.update(measure_faults(server, size, levels[0], args.fault_every, failures))
+            results.update(measure_resume(server, size, levels[0], failures))
+            results.update(measure_downloader(server, args.media_scale, failures))
+    finally:
+        server.close()
+
+    results['failures'] = failures
+    print_results(f"download segmentado ({args.size_mb:g} MB, {args.connection_rate:g} MB/s por conexão)", results)
+    for failure in failures:
+        print(f"FALHA: {failure}")
+    write_json(args.json, "segmented", results)
+    return results
+
+if __name__ == "__main__":
+    sys.exit(1 if main()['failures'] else 0)
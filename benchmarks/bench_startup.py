@@ -0,0 +1,146 @@
+# benchmarks/bench_startup.py
+
+"""
+Benchmark do tempo de inicialização.
+
+Cada medição roda num processo Python novo (imports a frio), num diretório
+temporário, e mede:
+  - import: o tempo de import (`-X importtime`) da interface gráfica e da linha
+    de comando, com os módulos que mais pesam em cada um;
+  - heavy modules: quais módulos pesados (yt-dlp, Pillow, requests) já estão
+    carregados depois do import, o que não deveria acontecer;
+  - first window: o tempo até a janela principal ser mapeada na tela, medido
+    dentro do processo e a partir do lançamento do processo. Exige um display;
+    sem ele a medição é ignorada.
+
+Os valores de cada métrica são a mediana de `--runs` execuções. O benchmark
+termina com código 1 se o import da GUI passar de `--max-import-ms`, se a
+primeira janela passar de `--max-window-ms` ou se um módulo pesado for
+carregado na inicialização, e pode ser usado como verificação de regressão.
+
+Uso:
+    python -m benchmarks.bench_startup --runs 5 --max-import-ms 120 --max-window-ms 1500
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_MODULES = {'gui': 'src.gui.main_window', 'cli': 'src.cli.main'}
+HEAVY_MODULES = ('yt_dlp', 'PIL', 'requests')
+TOP_IMPORTS = 8
+# Limites de regressão padrão. Antes do carregamento tardio do yt-dlp e do Pillow o import da GUI levava ~230 ms
+MAX_IMPORT_MS = 120.0
+MAX_WINDOW_MS = 1500.0
+
+FIRST_WINDOW_SCRIPT = r"""
+import time
+start = time.perf_counter()
+import tkinter as tk
+from src.gui.main_window import MainWindow
+try:
+    root = tk.Tk()
+except tk.TclError:
+    print("NO_DISPLAY", flush=True); raise SystemExit(0)
+app = MainWindow(root)
+def on_map(event):
+    if event.widget is root:
+        print(f"FIRST_WINDOW {(time.perf_counter() - start) * 1000:.3f}", flush=True)
+        root.after(0, app.on_close)
+root.bind("<Map>", on_map)
+root.mainloop()
+"""
+
+def _run_python(args: list, cwd: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    return subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+
+def parse_importtime(stderr: str) -> list:
+    """Converte a saída de `-X importtime` em [(módulo, nível, próprio_us, acumulado_us)], na ordem de término."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(own), int(cumulative)))
+    return rows
+
+def measure_import(module: str, cwd: str) -> dict:
+    """Importa `module` num processo novo e retorna o tempo total, os maiores imports e os módulos pesados carregados."""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    result = _run_python(["-X", "importtime", "-c", code], cwd)
+    if result.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {module}: {result.stderr.strip().splitlines()[-1:]}")
+    rows = parse_importtime(result.stderr)
+    end = next(i for i, row in enumerate(rows) if row[0] == module and row[1] == 0)
+    start = end
+    while start > 0 and rows[start - 1][1] > 0:
+        start -= 1
+    total_us = rows[end][3]
+    # Só os imports feitos por `module` (não os da inicialização do interpretador), até dois níveis abaixo dele
+    top = sorted(rows[start:end], key=lambda row: row[3], reverse=True)
+    top = [row for row in top if row[1] <= 2][:TOP_IMPORTS]
+    return {'total_ms': total_us / 1000, 'top': [(name, cumulative / 1000) for name, _, _, cumulative in top],
+            'heavy_loaded': json.loads(result.stdout.strip().splitlines()[-1])}
+
+def measure_first_window(cwd: str) -> dict | None:
+    """Abre a janela principal num processo novo; None se não houver display."""
+    launched = time.perf_counter()
+    result = _run_python(["-c", FIRST_WINDOW_SCRIPT], cwd)
+    wall_ms = (time.perf_counter() - launched) * 1000
+    if "NO_DISPLAY" in result.stdout:
+        return None
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_WINDOW "):
+            return {'in_process_ms': float(line.split()[1]), 'process_wall_ms': wall_ms}
+    raise RuntimeError(f"A janela não foi aberta: {result.stderr.strip().splitlines()[-1:]}")
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=MAX_IMPORT_MS, help="Limite para a mediana do import da interface gráfica.")
+    parser.add_argument("--max-window-ms", type=float, default=MAX_WINDOW_MS, help="Limite para a mediana do tempo até a primeira janela (no processo).")
+    args = parser.parse_args(argv)
+    results = {}
+    regressions = []
+
+    with temp_workdir() as workdir:
+        for label, module in STARTUP_MODULES.items():
+            runs = [measure_import(module, workdir) for _ in range(args.runs)]
+            results[f'{label}_import_ms'] = statistics.median(run['total_ms'] for run in runs)
+            heavy = sorted({name for run in runs for name in run['heavy_loaded']})
+            results[f'{label}_heavy_modules'] = ", ".join(heavy) or "-"
+            if heavy:
+                regressions.append(f"{module} carrega {', '.join(heavy)} na inicialização")
+            for name, cumulative_ms in runs[-1]['top']:
+                results[f'{label}_import_ms[{name}]'] = cumulative_ms
+
+        windows = [measure_first_window(workdir) for _ in range(args.runs)]
+        if all(windows):
+            results['first_window_ms'] = statistics.median(w['in_process_ms'] for w in windows)
+            results['first_window_process_ms'] = statistics.median(w['process_wall_ms'] for w in windows)
+        else:
+            results['first_window_ms'] = "sem display (ignorado)"
+
+    if results['gui_import_ms'] > args.max_import_ms:
+        regressions.append(f"import da GUI: {results['gui_import_ms']:.1f} ms > {args.max_import_ms:.1f} ms")
+    window_ms = results['first_window_ms']
+    if isinstance(window_ms, float) and window_ms > args.max_window_ms:
+        regressions.append(f"primeira janela: {window_ms:.1f} ms > {args.max_window_ms:.1f} ms")
+
+    results['regressions'] = regressions
+    print_results(f"startup ({args.runs} execuções)", {k: v for k, v in results.items() if k != 'regressions'})
+    for message in regressions:
+        print(f"  REGRESSÃO: {message}")
+    write_json(args.json, "startup", results)
+    return results
+
+if __name__ == "__main__":
+    sys.exit(1 if main()['regressions'] else 0)
@@ -0,0 +1,106 @@
+# benchmarks/bench_stats.py
+
+"""
+Benchmark da amplificação de escrita das estatísticas.
+
+Várias threads registram downloads concluídos (`increment_download_count` e
+`add_bytes_downloaded`, como no fim de cada download) e, para cada modo, são
+medidos os incrementos por segundo, o número de gravações do arquivo, os bytes
+gravados por incremento e os incrementos perdidos. Com `--pace-ms` os downloads
+são espaçados no tempo, como numa sessão real, e o intervalo de gravação passa a
+determinar o número de gravações:
+  - legacy: lê e regrava o JSON a cada incremento, sem lock (comportamento antigo);
+  - batched_<intervalo>: StatsManager com as gravações agrupadas a cada intervalo.
+
+Uso:
+    python -m benchmarks.bench_stats --threads 8 --increments 1000 --pace-ms 1
+"""
+
+import json
+import os
+import threading
+import time
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from src.core.stats import StatsManager, DEFAULT_STATS, DEFAULT_FLUSH_INTERVAL
+
+BYTES_PER_DOWNLOAD = 50 * 2**20
+
+class LegacyStats:
+    """Reproduz o padrão anterior: leitura e gravação do arquivo inteiro a cada alteração."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.writes = 0
+        self.bytes_written = 0
+
+    def _add(self, key: str, amount: int):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f: stats = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            stats = DEFAULT_STATS.copy()
+        stats[key] += amount
+        data = json.dumps(stats, indent=4)
+        with open(self.path, 'w', encoding='utf-8') as f: f.write(data)
+        self.writes += 1; self.bytes_written += len(data)
+
+    def increment_download_count(self):
+        self._add("total_downloads", 1)
+
+    def add_bytes_downloaded(self, byte_count: int):
+        self._add("total_bytes_downloaded", byte_count)
+
+    def flush(self):
+        pass
+
+def _run(stats, threads: int, increments: int, pace: float) -> float:
+    def worker():
+        for _ in range(increments):
+            stats.add_bytes_downloaded(BYTES_PER_DOWNLOAD); stats.increment_download_count()
+            if pace: time.sleep(pace)
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    with Timer() as timer:
+        for t in workers: t.start()
+        for t in workers: t.join()
+        stats.flush()
+    return timer.elapsed
+
+def _counting_manager(path: str, flush_interval: float) -> StatsManager:
+    manager = StatsManager(path, flush_interval=flush_interval)
+    manager.writes = 0; manager.bytes_written = 0
+    write_atomic = manager._write_atomic
+    def counted(stats):
+        write_atomic(stats)
+        manager.writes += 1; manager.bytes_written += os.path.getsize(path)
+    manager._write_atomic = counted
+    return manager
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--increments", type=int, default=1000, help="Downloads registrados por thread.")
+    parser.add_argument("--pace-ms", type=float, default=1.0, help="Intervalo entre os downloads de cada thread (0 para sem pausa).")
+    args = parser.parse_args(argv)
+    downloads = args.threads * args.increments
+    results = {}
+
+    with temp_workdir():
+        modes = [('legacy', lambda path: LegacyStats(path))]
+        for interval in (0.05, DEFAULT_FLUSH_INTERVAL):
+            modes.append((f'batched_{interval:g}s', lambda path, interval=interval: _counting_manager(path, interval)))
+        for name, factory in modes:
+            path = f"{name}.json"
+            stats = factory(path)
+            elapsed = _run(stats, args.threads, args.increments, args.pace_ms / 1000)
+            with open(path, 'r', encoding='utf-8') as f: saved = json.load(f)
+            results[f'{name}.increments_per_sec'] = downloads * 2 / elapsed
+            results[f'{name}.file_writes'] = stats.writes
+            results[f'{name}.bytes_written_per_increment'] = stats.bytes_written / (downloads * 2)
+            results[f'{name}.lost_downloads'] = downloads - saved['total_downloads']
+
+    print_results(f"estatísticas ({args.threads} threads x {args.increments} downloads)", results)
+    write_json(args.json, "stats", results)
+    return results
+
+if __name__ == "__main__":
+    main()
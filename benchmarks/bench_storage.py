@@ -0,0 +1,122 @@
+# benchmarks/bench_storage.py
+
+"""
+Benchmark da camada de armazenamento SQLite.
+
+Compara o acesso antigo (uma conexão nova por operação, journaling padrão) com
+`src.core.storage.Database` (conexão por thread, WAL, escritor único), medindo
+operações por segundo com leitores e escritores concorrentes.
+
+Uso:
+    python -m benchmarks.bench_storage --readers 4 --writers 2 --seconds 3
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json
+from src.core.storage import Database
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS bench (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+PAYLOAD = "x" * 2048
+PRELOADED_ROWS = 1000
+
+class LegacyStore:
+    """Reproduz o padrão anterior: `sqlite3.connect` a cada chamada."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self, key):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute("SELECT value FROM bench WHERE key = ?", (key,)).fetchone()
+
+    def write(self, key):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("INSERT OR REPLACE INTO bench (key, value) VALUES (?, ?)", (key, PAYLOAD))
+            conn.commit()
+
+class PooledStore:
+    """Usa a camada compartilhada de `src.core.storage`."""
+
+    def __init__(self, path):
+        self.db = Database(path)
+
+    def read(self, key):
+        with self.db.read() as conn:
+            return conn.execute("SELECT value FROM bench WHERE key = ?", (key,)).fetchone()
+
+    def write(self, key):
+        with self.db.write() as conn:
+            conn.execute("INSERT OR REPLACE INTO bench (key, value) VALUES (?, ?)", (key, PAYLOAD))
+
+def _prepare(path):
+    with sqlite3.connect(path) as conn:
+        conn.execute(SCHEMA)
+        conn.executemany("INSERT OR REPLACE INTO bench (key, value) VALUES (?, ?)",
+                         ((f"key-{i}", PAYLOAD) for i in range(PRELOADED_ROWS)))
+        conn.commit()
+
+def run_workload(store, readers: int, writers: int, seconds: float) -> dict:
+    """Executa leitores e escritores em paralelo por `seconds` segundos."""
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'locked_errors': 0}
+    lock = threading.Lock()
+
+    def worker(kind, index):
+        done = errors = 0
+        i = 0
+        while not stop.is_set():
+            i += 1
+            try:
+                if kind == 'reads':
+                    store.read(f"key-{(i * 7 + index) % PRELOADED_ROWS}")
+                else:
+                    store.write(f"writer-{index}-{i % 500}")
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts[kind] += done
+            counts['locked_errors'] += errors
+
+    threads = [threading.Thread(target=worker, args=('reads', i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=('writes', i)) for i in range(writers)]
+    start = time.perf_counter()
+    for thread in threads: thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads: thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'reads_per_sec': counts['reads'] / elapsed,
+        'writes_per_sec': counts['writes'] / elapsed,
+        'locked_errors': counts['locked_errors'],
+    }
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    results = {}
+    with temp_workdir() as workdir:
+        for name, factory in (("legacy", LegacyStore), ("pooled", PooledStore)):
+            path = os.path.join(workdir, f"{name}.db")
+            _prepare(path)
+            store = factory(path)
+            for key, value in run_workload(store, args.readers, args.writers, args.seconds).items():
+                results[f"{name}.{key}"] = value
+            if isinstance(store, PooledStore):
+                store.db.close()
+
+    print_results(f"storage ({args.readers} leitores, {args.writers} escritores)", results)
+    write_json(args.json, "storage", results)
+    return results
+
+if __name__ == "__main__":
+    main()
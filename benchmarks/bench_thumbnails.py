@@ -0,0 +1,115 @@
+# benchmarks/bench_thumbnails.py
+
+"""
+Benchmark do cache de thumbnails (`src.core.thumbnails`).
+
+Sobe um servidor HTTP local que serve N imagens JPEG 1280x720 e compara:
+  - legacy: `requests.get` + decodificação + redimensionamento a cada exibição;
+  - cold:   ThumbnailCache vazio (sessão compartilhada, grava em disco);
+  - disk:   novo ThumbnailCache sobre a pasta já preenchida (sem rede);
+  - memory: mesmas imagens exibidas de novo (LRU em memória);
+  - prefetch: N thumbnails pré-carregadas pelo pool.
+
+Requer `requests` e Pillow.
+
+Uso:
+    python -m benchmarks.bench_thumbnails --images 50 --views 3
+"""
+
+import io
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from PIL import Image
+
+from benchmarks.common import make_parser, temp_workdir, print_results, write_json, Timer
+from src.core.thumbnails import ThumbnailCache
+
+def _make_jpeg(index: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', (1280, 720), ((index * 37) % 256, (index * 91) % 256, 128)).save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+def start_image_server(images: list) -> ThreadingHTTPServer:
+    """Servidor local que responde `/<i>.jpg` com a i-ésima imagem."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            # Sem isso, cabeçalho e corpo em escritas separadas esperam o ACK atrasado (~40 ms) em conexões keep-alive
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        def do_GET(self):
+            body = images[int(self.path.strip('/').split('.')[0])]
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _legacy_view(url: str):
+    response = requests.get(url, timeout=10); response.raise_for_status()
+    image = Image.open(io.BytesIO(response.content)); image.thumbnail((128, 72))
+    return image
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--views", type=int, default=3, help="Quantas vezes cada thumbnail é exibida.")
+    args = parser.parse_args(argv)
+    server = start_image_server([_make_jpeg(i) for i in range(args.images)])
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    items = [(f"{base}/{i}.jpg", f"video{i:05d}", "Youtube") for i in range(args.images)]
+    views = args.images * args.views
+    results = {}
+
+    try:
+        with temp_workdir() as workdir:
+            with Timer() as timer:
+                for _ in range(args.views):
+                    for url, _, _ in items: _legacy_view(url)
+            results['legacy_ms_per_view'] = timer.elapsed * 1000 / views
+
+            cache = ThumbnailCache(f"{workdir}/thumbs")
+            with Timer() as timer:
+                for url, video_id, extractor in items: cache.get(url, video_id, extractor)
+            results['cold_ms_per_view'] = timer.elapsed * 1000 / args.images
+            with Timer() as timer:
+                for _ in range(args.views):
+                    for url, video_id, extractor in items: cache.get(url, video_id, extractor)
+            results['memory_ms_per_view'] = timer.elapsed * 1000 / views
+            cache.close()
+
+            cache = ThumbnailCache(f"{workdir}/thumbs")
+            with Timer() as timer:
+                for url, video_id, extractor in items: cache.get(url, video_id, extractor)
+            results['disk_ms_per_view'] = timer.elapsed * 1000 / args.images
+            results['disk_cache_downloads'] = cache.get_stats()['downloads']
+            cache.close()
+
+            cache = ThumbnailCache(f"{workdir}/prefetch")
+            with Timer() as timer:
+                for future in cache.prefetch(items): future.result()
+            results['prefetch_ms_per_image'] = timer.elapsed * 1000 / args.images
+            cache.close()
+    finally:
+        server.shutdown()
+
+    results['memory_speedup'] = results['legacy_ms_per_view'] / max(results['memory_ms_per_view'], 1e-9)
+    print_results(f"thumbnails ({args.images} imagens x {args.views} exibições)", results)
+    write_json(args.json, "thumbnails", results)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_url_keys.py
+
+"""
+Benchmark da canonicalização de URLs (`src.core.urls`).
+
+Usa um corpus de variações reais de URLs para a mesma mídia e compara a taxa de
+acertos de um cache chaveado pela URL bruta com a de um cache chaveado por
+`cache_key`. Também confere se cada variação é mapeada para a chave esperada e
+termina com código de saída 1 se alguma não for.
+
+Uso:
+    python -m benchmarks.bench_url_keys
+"""
+
+import random
+import sys
+
+from benchmarks.common import make_parser, print_results, write_json, Timer
+from src.core.urls import cache_key
+
+# Chave esperada -> variações da URL que devem ser reconhecidas como a mesma mídia
+CORPUS = {
+    'youtube:dQw4w9WgXcQ': [
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://youtube.com/watch?v=dQw4w9WgXcQ",
+        "http://www.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://m.youtube.com/watch?v=dQw4w9WgXcQ",
+        "https://music.youtube.com/watch?v=dQw4w9WgXcQ&feature=share",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=30",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=1m2s&si=AbCdEf123",
+        "https://www.youtube.com/watch?feature=youtu.be&v=dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ&ab_channel=RickAstley",
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://youtu.be/dQw4w9WgXcQ?si=tracking123",
+        "https://youtu.be/dQw4w9WgXcQ?t=42",
+        "youtu.be/dQw4w9WgXcQ",
+        "https://www.youtube.com/embed/dQw4w9WgXcQ",
+        "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ?rel=0",
+        "https://www.youtube.com/v/dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=dQw4w9WgXcQ#comments",
+    ],
+    'youtube:9bZkp7q19f0': [
+        "https://www.youtube.com/shorts/9bZkp7q19f0",
+        "https://youtube.com/shorts/9bZkp7q19f0?feature=share",
+        "https://m.youtube.com/shorts/9bZkp7q19f0",
+        "https://www.youtube.com/watch?v=9bZkp7q19f0&pp=ygUFZ2FuZ25h",
+        "https://youtu.be/9bZkp7q19f0?utm_source=newsletter&utm_medium=email",
+    ],
+    'youtube:jfKfPfyJRdk': [
+        "https://www.youtube.com/live/jfKfPfyJRdk",
+        "https://www.youtube.com/live/jfKfPfyJRdk?si=xyz",
+        "https://www.youtube.com/watch?v=jfKfPfyJRdk",
+    ],
+    'youtube:playlist:PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI': [
+        "https://www.youtube.com/playlist?list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI",
+        "https://m.youtube.com/playlist?list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI&si=share",
+        "https://youtube.com/playlist?feature=shared&list=PLFgquLnL59alCl_2TQvOiD5Vgm1hCaGSI",
+    ],
+    'vimeo:76979871': [
+        "https://vimeo.com/76979871",
+        "https://www.vimeo.com/76979871?share=copy",
+        "https://player.vimeo.com/video/76979871",
+    ],
+    'https://example.com/media/clip.mp4?quality=hd': [
+        "https://example.com/media/clip.mp4?quality=hd",
+        "https://www.Example.com/media/clip.mp4?quality=hd&utm_campaign=spring",
+        "https://example.com:443/media/clip.mp4?quality=hd#t=10",
+        "https://example.com/media/clip.mp4/?fbclid=IwAR0&quality=hd",
+    ],
+}
+
+def check_corpus() -> list:
+    """Retorna as variações que não foram mapeadas para a chave esperada."""
+    failures = []
+    for expected, urls in CORPUS.items():
+        for url in urls:
+            key = cache_key(url, playlist=expected.startswith('youtube:playlist:'))
+            if key != expected:
+                failures.append((url, key, expected))
+    return failures
+
+def simulate_cache(stream: list, key_function) -> tuple:
+    """
+    Simula um cache ilimitado.
+
+    Returns:
+        tuple: (taxa de acertos, número de falhas, ou seja, extrações na rede).
+    """
+    seen = set()
+    hits = 0
+    for url in stream:
+        key = key_function(url)
+        if key in seen:
+            hits += 1
+        seen.add(key)
+    return hits / len(stream), len(stream) - hits
+
+def main(argv=None) -> dict:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=200, help="Número de consultas simuladas.")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    failures = check_corpus()
+    all_urls = [url for urls in CORPUS.values() for url in urls]
+
+    # Cada consulta escolhe uma mídia e depois uma das variações da sua URL
+    rng = random.Random(args.seed)
+    media = list(CORPUS.values())
+    stream = [rng.choice(rng.choice(media)) for _ in range(args.lookups)]
+
+    raw_rate, raw_misses = simulate_cache(stream, lambda url: url)
+    with Timer() as timer:
+        canonical_rate, canonical_misses = simulate_cache(stream, cache_key)
+    results = {
+        'corpus_urls': len(all_urls),
+        'corpus_media': len(CORPUS),
+        'mismatches': len(failures),
+        'lookups': args.lookups,
+        'raw_url_hit_rate': raw_rate,
+        'raw_url_misses': raw_misses,
+        'canonical_hit_rate': canonical_rate,
+        'canonical_misses': canonical_misses,
+        'canonical_keys_per_sec': args.lookups / timer.elapsed,
+    }
+    print_results("url keys", results)
+    for url, key, expected in failures:
+        print(f"  FALHA: {url} -> {key} (esperado {expected})")
+    write_json(args.json, "url_keys", results)
+    if failures:
+        sys.exit(1)
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/common.py
+
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks são scripts independentes, executados a partir da raiz do projeto
+(ex: `python -m benchmarks.bench_storage`). Cada um imprime um resumo legível e
+pode gravar os resultados em JSON com `--json <arquivo>`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+def make_parser(description: str) -> argparse.ArgumentParser:
+    """Cria um parser de argumentos com as opções comuns a todos os benchmarks."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--json", metavar="ARQUIVO", help="Grava os resultados em JSON neste arquivo.")
+    return parser
+
+@contextmanager
+def temp_workdir():
+    """Executa o bloco em um diretório temporário, para não tocar nos dados reais do usuário."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="sd-bench-") as path:
+        os.chdir(path)
+        try:
+            yield path
+        finally:
+            os.chdir(previous)
+
+class Timer:
+    """Cronômetro simples baseado em `time.perf_counter`."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+def print_results(name: str, results: dict):
+    """Imprime os resultados de um benchmark em formato de tabela simples."""
+    print(f"== {name} ==")
+    for key, value in results.items():
+        if isinstance(value, float):
+            value = f"{value:,.2f}"
+        print(f"  {key:<40} {value}")
+
+def write_json(path: str | None, name: str, results: dict):
+    """Grava os resultados (com metadados do ambiente) em JSON, se um caminho foi informado."""
+    if not path:
+        return
+    payload = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=4)
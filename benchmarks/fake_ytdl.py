@@ -0,0 +1,368 @@
+# benchmarks/fake_ytdl.py
+
+"""
+Substituto offline do yt-dlp para os benchmarks.
+
+`installed(server)` registra em `sys.modules` um módulo `yt_dlp` falso, cujo
+`YoutubeDL` devolve dicionários de informações com o tamanho e a estrutura dos
+reais (dezenas de formatos com URLs longas e cabeçalhos, fragmentos DASH,
+legendas automáticas em ~100 idiomas) e baixa a mídia de um `MediaServer`
+local, chamando os progress hooks como o yt-dlp. Assim o `Downloader`, o
+agendador e os caches são exercitados de ponta a ponta sem acessar a internet.
+
+Suporta:
+  - vídeos: qualquer URL com `v=<id>` (ou o último segmento do caminho);
+  - playlists: URLs com `list=`; `n=<quantidade>` define o número de vídeos;
+  - `extract_flat`, `noplaylist`, `outtmpl` (com `%(title).Ns`), seleção de
+    formato ('137+140', 'bestaudio/best', ...) e `progress_hooks`;
+  - `extract_info(download=False)` seguido de `process_ie_result` e `prepare_filename`.
+
+O `MediaServer` responde a requisições parciais (Range) e pode simular
+servidores sem Range e conexões derrubadas no meio da resposta.
+"""
+
+import hashlib
+import os
+import socket
+import sys
+import threading
+import time
+import types
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_PLAYLIST_SIZE = 50
+# (format_id, altura, fps, vcodec, ext, bytes por segundo de vídeo)
+VIDEO_FORMATS = [
+    ('160', 144, 30, 'avc1.4d400c', 'mp4', 12_000), ('278', 144, 30, 'vp9', 'webm', 10_000),
+    ('133', 240, 30, 'avc1.4d4015', 'mp4', 25_000), ('242', 240, 30, 'vp9', 'webm', 22_000),
+    ('134', 360, 30, 'avc1.4d401e', 'mp4', 50_000), ('243', 360, 30, 'vp9', 'webm', 45_000),
+    ('135', 480, 30, 'avc1.4d401f', 'mp4', 90_000), ('244', 480, 30, 'vp9', 'webm', 80_000),
+    ('136', 720, 30, 'avc1.4d401f', 'mp4', 180_000), ('247', 720, 30, 'vp9', 'webm', 160_000),
+    ('298', 720, 60, 'avc1.4d4020', 'mp4', 270_000), ('302', 720, 60, 'vp9', 'webm', 240_000),
+    ('137', 1080, 30, 'avc1.640028', 'mp4', 350_000), ('248', 1080, 30, 'vp9', 'webm', 300_000),
+    ('299', 1080, 60, 'avc1.64002a', 'mp4', 520_000), ('303', 1080, 60, 'vp9', 'webm', 450_000),
+    ('400', 1440, 30, 'av01.0.12M.08', 'mp4', 900_000), ('271', 1440, 30, 'vp9', 'webm', 1_000_000),
+    ('401', 2160, 30, 'av01.0.12M.08', 'mp4', 2_000_000), ('313', 2160, 30, 'vp9', 'webm', 2_200_000),
+]
+# (format_id, abr, acodec, ext)
+AUDIO_FORMATS = [('139', 48, 'mp4a.40.5', 'm4a'), ('140', 129, 'mp4a.40.2', 'm4a'),
+                 ('249', 50, 'opus', 'webm'), ('250', 70, 'opus', 'webm'), ('251', 135, 'opus', 'webm')]
+CAPTION_LANGUAGES = 150
+CAPTION_EXTS = ('json3', 'srv1', 'srv2', 'srv3', 'ttml', 'vtt')
+FRAGMENT_SECONDS = 5
+
+def _token(*parts) -> str:
+    return hashlib.sha1("/".join(map(str, parts)).encode()).hexdigest()
+
+def video_id_from_url(url: str) -> str:
+    query = parse_qs(urlsplit(url).query)
+    if 'v' in query:
+        return query['v'][0]
+    return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1] or _token(url)[:11]
+
+def make_info(video_id: str, media_base: str, duration: int = 240, media_scale: float = 1.0) -> dict:
+    """
+    Cria o dicionário de informações de um vídeo, no formato do extrator do YouTube.
+
+    Args:
+        video_id (str): O id do vídeo.
+        media_base (str): A URL base do MediaServer que serve a mídia.
+        duration (int): A duração, em segundos (define o tamanho dos arquivos).
+        media_scale (float): Fator aplicado ao tamanho real servido (ex: 0.01 baixa 1% dos bytes).
+    """
+    webpage_url = f"https://www.youtube.com/watch?v={video_id}"
+    headers = {'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/115.0',
+               'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+               'Accept-Language': 'en-us,en;q=0.5', 'Sec-Fetch-Mode': 'navigate'}
+
+    def media_url(format_id, size):
+        served = max(1, int(size * media_scale))
+        signature = _token(video_id, format_id) * 8  # URLs reais de CDN têm centenas de caracteres de parâmetros
+        return f"{media_base}/media/{video_id}/{format_id}?size={served}&expire=1792000000&sig={signature}"
+
+    def fragments(size):
+        count = max(1, duration // FRAGMENT_SECONDS)
+        return [{'url': f"sq/{i}", 'duration': FRAGMENT_SECONDS, 'filesize': size // count} for i in range(count)]
+
+    formats = []
+    for format_id, abr, acodec, ext in AUDIO_FORMATS:
+        size = abr * 125 * duration
+        formats.append({
+            'format_id': format_id, 'format_note': 'medium' if abr > 100 else 'low', 'ext': ext,
+            'acodec': acodec, 'vcodec': 'none', 'abr': abr, 'asr': 48000 if acodec == 'opus' else 44100,
+            'audio_channels': 2, 'tbr': abr, 'filesize': size, 'protocol': 'https', 'container': f'{ext}_dash',
+            'url': media_url(format_id, size), 'http_headers': dict(headers), 'language': 'en',
+            'downloader_options': {'http_chunk_size': 10485760}, 'fragments': fragments(size),
+            'format': f"{format_id} - audio only ({'medium' if abr > 100 else 'low'})",
+        })
+    for format_id, height, fps, vcodec, ext, rate in VIDEO_FORMATS:
+        size = rate * duration
+        formats.append({
+            'format_id': format_id, 'format_note': f"{height}p{fps if fps > 30 else ''}", 'ext': ext,
+            'acodec': 'none', 'vcodec': vcodec, 'width': height * 16 // 9, 'height': height, 'fps': fps,
+            'dynamic_range': 'SDR', 'tbr': rate * 8 / 1000, 'vbr': rate * 8 / 1000, 'filesize': size,
+            'protocol': 'https', 'container': f'{ext}_dash', 'url': media_url(format_id, size),
+            'http_headers': dict(headers), 'downloader_options': {'http_chunk_size': 10485760},
+            'fragments': fragments(size), 'resolution': f"{height * 16 // 9}x{height}",
+            'format': f"{format_id} - {height * 16 // 9}x{height} ({height}p)",
+        })
+    captions = {
+        f"lang{i:03d}": [{'ext': caption_ext, 'name': f"Language {i}",
+                          'url': f"https://www.youtube.com/api/timedtext?v={video_id}&lang=l{i}&fmt={caption_ext}&sig={_token(video_id, i, caption_ext)}"}
+                         for caption_ext in CAPTION_EXTS]
+        for i in range(CAPTION_LANGUAGES)
+    }
+    return {
+        'id': video_id, 'title': f"Vídeo de teste {video_id}", 'fulltitle': f"Vídeo de teste {video_id}",
+        'description': ("Descrição de exemplo com links e marcações. " * 40).strip(),
+        'uploader': 'Canal de Teste', 'uploader_id': '@canaldeteste', 'channel_id': 'UC' + _token('channel')[:22],
+        'duration': duration, 'view_count': 123456, 'like_count': 4321, 'upload_date': '20240101',
+        'tags': [f"tag{i}" for i in range(30)], 'categories': ['Music'],
+        'thumbnail': f"{media_base}/thumb/{video_id}.jpg",
+        'thumbnails': [{'url': f"https://i.ytimg.com/vi/{video_id}/{name}.jpg", 'id': str(i), 'preference': -i}
+                       for i, name in enumerate(('maxresdefault', 'sddefault', 'hqdefault', 'mqdefault', 'default'))],
+        'formats': formats, 'automatic_captions': captions, 'subtitles': {},
+        'chapters': [{'start_time': i * 30.0, 'end_time': (i + 1) * 30.0, 'title': f"Capítulo {i}"} for i in range(duration // 30)],
+        'webpage_url': webpage_url, 'original_url': webpage_url, 'extractor': 'youtube', 'extractor_key': 'Youtube',
+        'filesize_approx': VIDEO_FORMATS[12][5] * duration + AUDIO_FORMATS[1][1] * 125 * duration,
+    }
+
+# O byte na posição p de toda mídia é PATTERN[p % len(PATTERN)]: respostas parciais (Range) são verificáveis
+PATTERN = bytes(range(251))
+
+def expected_media(size: int) -> bytes:
+    """O conteúdo completo de uma mídia de `size` bytes servida pelo MediaServer."""
+    return (PATTERN * (size // len(PATTERN) + 1))[:size]
+
+class MediaServer:
+    """Servidor HTTP local que serve bytes determinísticos em `/media/<id>/<formato>?size=N` (com suporte a Range)."""
+
+    def __init__(self, rate: float | None = None, ranges: bool = True, fault_every: int = 0):
+        """
+        Inicia o servidor numa porta livre.
+
+        Args:
+            rate (float | None): Limite de vazão, em bytes/s, de cada conexão (simula a rede). None para sem limite.
+            ranges (bool): Se o cabeçalho Range é respeitado. Se False, toda resposta é o arquivo inteiro (200).
+            fault_every (int): Se maior que 0, uma a cada `fault_every` respostas de mídia é interrompida
+                depois do primeiro bloco (simula uma conexão derrubada). As falhas ficam em `.faults`.
+        """
+        block = PATTERN * (CHUNK_SIZE // len(PATTERN) + 2)
+        self.requests = 0
+        self.faults = 0
+        self.ranges = ranges
+        self.fault_every = fault_every
+        server = self
+        counter_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Sem isso, cabeçalho e corpo em escritas separadas esperam o ACK atrasado (~40 ms) em conexões keep-alive
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if not parts.path.startswith('/media/'):
+                    self.send_error(404)
+                    return
+                with counter_lock:
+                    server.requests += 1
+                    fault = bool(server.fault_every) and server.requests % server.fault_every == 0
+                size = int(parse_qs(parts.query).get('size', ['0'])[0])
+                start, end = 0, size - 1
+                range_header = self.headers.get('Range')
+                if server.ranges and range_header and range_header.startswith('bytes='):
+                    first, _, last = range_header[len('bytes='):].partition('-')
+                    start = int(first or 0); end = min(int(last), size - 1) if last else size - 1
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Accept-Ranges", "bytes" if server.ranges else "none")
+                self.send_header("Content-Length", str(end - start + 1))
+                self.end_headers()
+                try:
+                    self._send_body(start, end, fault)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # O cliente desistiu da resposta (ex: download interrompido)
+
+            def _send_body(self, position, end, fault):
+                start, started = position, time.monotonic()
+                while position <= end:
+                    offset = position % len(PATTERN)
+                    piece = block[offset:offset + min(CHUNK_SIZE, end - position + 1)]
+                    self.wfile.write(piece); position += len(piece)
+                    if fault and position <= end:
+                        with counter_lock: server.faults += 1
+                        self.close_connection = True
+                        return
+                    if rate:
+                        # Dorme o necessário para que a conexão não ultrapasse `rate` bytes/s
+                        delay = (position - start) / rate - (time.monotonic() - started)
+                        if delay > 0: time.sleep(delay)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, name="media-server", daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class DownloadError(Exception):
+    """Equivalente a `yt_dlp.utils.DownloadError`."""
+
+class FakeYoutubeDL:
+    """Implementa o subconjunto da API do `yt_dlp.YoutubeDL` usado pelo Downloader."""
+
+    # Configurados por `installed()`
+    media_base = ""
+    extract_latency = 0.0
+    duration = 240
+    media_scale = 1.0
+    calls = []
+
+    def __init__(self, params: dict | None = None):
+        self.params = dict(params or {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def _info(self, video_id: str) -> dict:
+        return make_info(video_id, self.media_base, self.duration, self.media_scale)
+
+    def extract_info(self, url: str, download: bool = True) -> dict:
+        self.calls.append((url, download))
+        if self.extract_latency:
+            time.sleep(self.extract_latency)  # Simula as requisições da extração
+        query = parse_qs(urlsplit(url).query)
+        if 'list' in query and not self.params.get('noplaylist'):
+            count = int(query.get('n', [DEFAULT_PLAYLIST_SIZE])[0])
+            ids = [f"{query['list'][0][:6]}{i:05d}" for i in range(count)]
+            if self.params.get('extract_flat'):
+                entries = [{'_type': 'url', 'ie_key': 'Youtube', 'id': vid, 'url': f"https://www.youtube.com/watch?v={vid}",
+                            'title': f"Vídeo de teste {vid}", 'duration': self.duration} for vid in ids]
+            else:
+                entries = [self._process(self._info(vid), download) for vid in ids]
+            return {'_type': 'playlist', 'id': query['list'][0], 'title': f"Playlist {query['list'][0]}",
+                    'webpage_url': url, 'extractor_key': 'YoutubeTab', 'entries': entries}
+        return self._process(self._info(video_id_from_url(url)), download)
+
+    def add_progress_hook(self, hook):
+        self.params['progress_hooks'] = [*(self.params.get('progress_hooks') or []), hook]
+
+    def process_ie_result(self, ie_result: dict, download: bool = True) -> dict:
+        return self._process(ie_result, download)
+
+    def prepare_filename(self, info: dict) -> str:
+        template = self.params.get('outtmpl', '%(title)s.%(ext)s')
+        template = template.get('default') if isinstance(template, dict) else template
+        ext = info.get('ext') or info['requested_formats'][0]['ext']
+        return template % {'title': info['title'], 'ext': ext, 'id': info['id']}
+
+    def _process(self, info: dict, download: bool) -> dict:
+        if not download:
+            if self.params.get('format'):
+                # Como no yt-dlp, os formatos são escolhidos mesmo sem baixar: um formato único é
+                # copiado para o dicionário; uma mesclagem fica em 'requested_formats'
+                requested = self._select_formats(info)
+                if len(requested) == 1: info.update(requested[0])
+                else: info['requested_formats'] = requested
+            return info
+        requested = self._select_formats(info)
+        final_path = self.prepare_filename(dict(info, ext=requested[0]['ext']))
+        os.makedirs(os.path.dirname(final_path) or '.', exist_ok=True)
+        for fmt in requested:
+            stream_path = final_path if len(requested) == 1 else f"{os.path.splitext(final_path)[0]}.f{fmt['format_id']}.{fmt['ext']}"
+            self._fetch(fmt, dict(info, **fmt), stream_path)
+        info['requested_downloads'] = [{'filepath': final_path}]
+        info['filepath'] = final_path
+        return info
+
+    def _select_formats(self, info: dict) -> list:
+        by_id = {f['format_id']: f for f in info['formats']}
+        audio = [f for f in info['formats'] if f['vcodec'] == 'none']
+        video = [f for f in info['formats'] if f['acodec'] == 'none']
+        for alternative in str(self.params.get('format') or 'best').split('/'):
+            chosen = []
+            for part in alternative.split('+'):
+                if part in by_id: chosen.append(by_id[part])
+                elif part == 'bestaudio': chosen.append(max(audio, key=lambda f: f['abr']))
+                elif part in ('best', 'bestvideo'): chosen.append(max(video, key=lambda f: f['height']))
+            if chosen and len(chosen) == len(alternative.split('+')):
+                return chosen
+        raise DownloadError(f"Requested format is not available: {self.params.get('format')}")
+
+    def _fetch(self, fmt: dict, info: dict, path: str):
+        hooks = self.params.get('progress_hooks') or []
+        part_path = path + ".part"
+        downloaded = os.path.getsize(part_path) if self.params.get('continuedl') and os.path.exists(part_path) else 0
+        request = urllib.request.Request(fmt['url'], headers={'Range': f"bytes={downloaded}-"} if downloaded else {})
+        start = time.monotonic()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response, open(part_path, 'ab' if downloaded else 'wb') as f:
+                total = downloaded + int(response.headers['Content-Length'])
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk); downloaded += len(chunk)
+                    elapsed = time.monotonic() - start
+                    event = {'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': total,
+                             'speed': downloaded / elapsed if elapsed else None, 'eta': None, 'elapsed': elapsed,
+                             'filename': path, 'tmpfilename': part_path, 'info_dict': info}
+                    for hook in hooks: hook(event)
+            if downloaded < total:
+                raise DownloadError(f"Unable to download {fmt['format_id']}: connection closed at {downloaded} of {total} bytes")
+        except OSError as e:
+            raise DownloadError(f"Unable to download {fmt['format_id']}: {e}") from e
+        os.replace(part_path, path)
+        event = {'status': 'finished', 'downloaded_bytes': downloaded, 'total_bytes': downloaded,
+                 'elapsed': time.monotonic() - start, 'filename': path, 'info_dict': info}
+        for hook in hooks: hook(event)
+
+@contextmanager
+def installed(server: MediaServer | None = None, extract_latency: float = 0.0, duration: int = 240, media_scale: float = 1.0):
+    """
+    Substitui o módulo `yt_dlp` pelo falso durante o bloco.
+
+    Args:
+        server (MediaServer | None): O servidor que serve a mídia (obrigatório para downloads).
+        extract_latency (float): Atraso, em segundos, simulado em cada extração.
+        duration (int): Duração dos vídeos gerados, em segundos.
+        media_scale (float): Fração dos bytes de cada formato que é realmente servida.
+
+    Yields:
+        type: A classe FakeYoutubeDL (com o registro de chamadas em `calls`).
+    """
+    fake_class = type('FakeYoutubeDL', (FakeYoutubeDL,), {
+        'media_base': server.base_url if server else "http://127.0.0.1:9", 'extract_latency': extract_latency,
+        'duration': duration, 'media_scale': media_scale, 'calls': [],
+    })
+    module = types.ModuleType('yt_dlp')
+    module.YoutubeDL = fake_class
+    module.utils = types.ModuleType('yt_dlp.utils')
+    module.utils.DownloadError = DownloadError
+    saved = {name: sys.modules.get(name) for name in ('yt_dlp', 'yt_dlp.utils')}
+    sys.modules['yt_dlp'], sys.modules['yt_dlp.utils'] = module, module.utils
+    try:
+        yield fake_class
+    finally:
+        for name, previous in saved.items():
+            if previous is None: sys.modules.pop(name, None)
+            else: sys.modules[name] = previous
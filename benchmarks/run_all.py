@@ -0,0 +1,131 @@
+# benchmarks/run_all.py
+
+"""
+Executa a suíte de benchmarks e grava todos os resultados num único JSON.
+
+Cada benchmark roda num processo separado (singletons, caches e arquivos
+temporários isolados). Nenhum deles acessa a internet: os que precisam do
+yt-dlp usam o substituto de `benchmarks.fake_ytdl` e um servidor HTTP local.
+
+Com `--baseline` os resultados são comparados com os de uma execução anterior, e
+métricas que pioraram mais que `--tolerance` são listadas como regressões
+(código de saída 1). A direção de cada métrica vem do sufixo do nome: `_per_sec`,
+`_speedup` e `_rate` quanto maior, melhor; `_ms`, `_seconds`, `_per_increment`,
+`_writes` e `_lost_downloads` quanto menor, melhor; as demais, e as das
+implementações antigas de referência (`legacy`), são apenas registradas.
+
+Um benchmark que termina com código de saída diferente de 0 (limites ou
+verificações próprias violados) conta como falha, mesmo tendo gravado o JSON.
+Benchmarks cujas dependências opcionais não estão instaladas são ignorados.
+
+Uso:
+    python -m benchmarks.run_all --output resultados.json
+    python -m benchmarks.run_all --quick --baseline resultados.json --tolerance 0.25
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_parser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# nome -> (módulo, argumentos do modo --quick)
+BENCHMARKS = {
+    'extract': ('benchmarks.bench_extract', ['--videos', '50', '--playlist', '50', '--cache-entries', '300', '--cache-reads', '1000']),
+    'history': ('benchmarks.bench_history', ['--entries', '500']),
+    'history_scale': ('benchmarks.bench_history_scale', ['--rows', '20000', '--repeat', '50']),
+    'stats': ('benchmarks.bench_stats', ['--increments', '200']),
+    'storage': ('benchmarks.bench_storage', ['--seconds', '1']),
+    'url_keys': ('benchmarks.bench_url_keys', []),
+    'downloads': ('benchmarks.bench_downloads', ['--jobs', '8', '--workers', '1,4']),
+    'ratelimit': ('benchmarks.bench_ratelimit', ['--jobs', '6', '--media-scale', '0.01', '--switch-after', '0.8']),
+    'segmented': ('benchmarks.bench_segmented', ['--size-mb', '16', '--connections', '4']),
+    'thumbnails': ('benchmarks.bench_thumbnails', ['--images', '20']),
+    'startup': ('benchmarks.bench_startup', ['--runs', '3']),
+}
+HIGHER_IS_BETTER = ('_per_sec', '_speedup', 'speedup', '_rate')
+LOWER_IS_BETTER = ('_ms', '_seconds', '_per_increment', '_writes', '_lost_downloads')
+
+def run_benchmark(name: str, quick: bool) -> dict:
+    """Executa um benchmark num processo novo e retorna o seu JSON (ou o erro)."""
+    module, quick_args = BENCHMARKS[name]
+    fd, json_path = tempfile.mkstemp(prefix=f"sd-{name}-", suffix=".json"); os.close(fd)
+    started = time.perf_counter()
+    try:
+        process = subprocess.run([sys.executable, "-m", module, "--json", json_path, *(quick_args if quick else [])],
+                                 cwd=ROOT, capture_output=True, text=True)
+        sys.stdout.write(process.stdout)
+        payload = None
+        if os.path.getsize(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f: payload = json.load(f)
+    finally:
+        os.remove(json_path)
+    if payload is None:
+        error = (process.stderr.strip().splitlines() or [f"código de saída {process.returncode}"])[-1]
+        if error.startswith("ModuleNotFoundError"):
+            # Dependência opcional ausente (ex: requests/Pillow para as thumbnails)
+            print(f"== {name} ==\n  IGNORADO: {error}")
+            return {'benchmark': name, 'skipped': error}
+        print(f"== {name} ==\n  FALHOU: {error}")
+        return {'benchmark': name, 'error': error}
+    payload['exit_code'] = process.returncode
+    if process.returncode:
+        print(f"  FALHOU: código de saída {process.returncode}")
+    payload['wall_seconds'] = time.perf_counter() - started
+    return payload
+
+def _direction(key: str) -> int:
+    """1 se maior é melhor, -1 se menor é melhor, 0 se a métrica não é comparada."""
+    if 'legacy' in key: return 0
+    if key.endswith(HIGHER_IS_BETTER): return 1
+    if key.endswith(LOWER_IS_BETTER): return -1
+    return 0
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Lista as métricas que pioraram mais que `tolerance` (fração) em relação à linha de base."""
+    regressions = []
+    for name, payload in current['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name, {}).get('results') or {}
+        for key, value in (payload.get('results') or {}).items():
+            old = previous.get(key)
+            direction = _direction(key)
+            if not direction or isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / abs(old) * direction
+            if change < -tolerance:
+                regressions.append({'benchmark': name, 'metric': key, 'baseline': old, 'current': value, 'change': change})
+    return regressions
+
+def main(argv=None) -> int:
+    parser = make_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark-results.json", help="Arquivo JSON com todos os resultados.")
+    parser.add_argument("--only", help=f"Benchmarks a executar, separados por vírgula ({', '.join(BENCHMARKS)}).")
+    parser.add_argument("--quick", action="store_true", help="Cargas menores, para verificações rápidas.")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparação.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Piora relativa tolerada na comparação (padrão: 0.2).")
+    args = parser.parse_args(argv)
+    names = [name.strip() for name in args.only.split(',')] if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmark(s) desconhecido(s): {', '.join(unknown)}")
+
+    suite = {'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"), 'quick': args.quick,
+             'benchmarks': {name: run_benchmark(name, args.quick) for name in names}}
+    # Falha: o benchmark não gravou resultados, ou gravou e saiu com erro (limites e verificações próprias)
+    failed = [name for name, payload in suite['benchmarks'].items() if 'error' in payload or payload.get('exit_code', 0) != 0]
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f: baseline = json.load(f)
+        suite['regressions'] = compare(suite, baseline, args.tolerance)
+        for item in suite['regressions']:
+            print(f"REGRESSÃO: {item['benchmark']}.{item['metric']}: {item['baseline']:,.2f} -> {item['current']:,.2f} ({item['change']:+.0%})")
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(suite, f, indent=4, default=str)
+    print(f"Resultados gravados em {args.output}" + (f"; falharam: {', '.join(failed)}" if failed else ""))
+    return 1 if failed or suite.get('regressions') else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
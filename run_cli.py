@@ -0,0 +1,11 @@
+# run_cli.py
+#
+# DESCRIÇÃO:
+# Ponto de entrada da interface de linha de comando (sem interface gráfica).
+# Exemplo: python run_cli.py urls.txt --jobs 4 > resultados.jsonl
+
+import sys
+from src.cli.main import main
+
+if __name__ == "__main__":
+    sys.exit(main())
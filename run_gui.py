@@ -5,7 +5,8 @@
 # Executar este arquivo inicia a interface gráfica.
 
 import logging
-from src.gui.main_window import DownloaderApp
+import tkinter as tk
+from src.gui.main_window import MainWindow
 from src.core.constants import LOG_FILE
 
 def setup_logging():
@@ -21,5 +22,6 @@ def setup_logging():
 
 if __name__ == "__main__":
     setup_logging()
-    app = DownloaderApp()
-    app.mainloop()
+    root = tk.Tk()
+    app = MainWindow(root)
+    root.mainloop()
@@ -0,0 +1,148 @@
+# src/cli/main.py
+
+"""
+Interface de linha de comando (sem interface gráfica).
+
+Lê uma lista de URLs (de um arquivo ou da entrada padrão, uma por linha; linhas
+vazias e iniciadas por '#' são ignoradas), executa os downloads pelo agendador
+com o paralelismo desejado e escreve na saída padrão um objeto JSON por linha
+(JSON Lines) para cada evento: 'queued', 'progress', 'result', 'log' e, ao
+final, 'summary'.
+
+Não importa o Tkinter nem o Pillow, de modo que pode ser executada em cron jobs
+e containers sem display.
+
+Um job cujo conteúdo já constava no arquivo de downloads termina com o estado
+'skipped' (contado à parte no 'summary'), e não 'completed'.
+
+Códigos de saída: 0 se todos os downloads foram concluídos ou ignorados, 1 se algum falhou,
+2 para erros de uso e 130 se interrompida (Ctrl+C).
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from ..core.scheduler import DownloadScheduler, DownloadJob, JobStatus
+
+LOG_LEVELS = ("info", "warning", "error", "critical")
+
+class JsonLinesWriter:
+    """Escreve eventos JSON Lines de forma thread-safe, com um flush por linha."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def read_urls(source) -> list:
+    """Lê as URLs de um arquivo de texto (uma por linha), ignorando linhas vazias e comentários."""
+    urls = []
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            urls.append(line)
+    return urls
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="run_cli.py", description="Super Downloader - downloads em lote sem interface gráfica.")
+    parser.add_argument("input", nargs="?", default="-", help="Arquivo com uma URL por linha ('-' para a entrada padrão).")
+    parser.add_argument("-j", "--jobs", type=int, help="Downloads simultâneos (padrão: max_concurrent_downloads da configuração).")
+    parser.add_argument("-f", "--format", dest="format_code", help="Código de formato do yt-dlp (padrão: escolhido pela política da configuração).")
+    parser.add_argument("-a", "--audio", action="store_true", help="Baixa apenas o áudio ('flac' em --format converte para FLAC).")
+    parser.add_argument("-p", "--playlist", action="store_true", help="Baixa a playlist inteira quando a URL tiver uma.")
+    parser.add_argument("--segmented", action=argparse.BooleanOptionalAction, default=None,
+                        help="Usa (ou não) o download segmentado por várias conexões (padrão: prefer_aria2c da configuração).")
+    parser.add_argument("--resume", action="store_true", help="Também retoma os downloads interrompidos em execuções anteriores.")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default="warning", help="Nível mínimo das mensagens de log emitidas (padrão: warning).")
+    parser.add_argument("--progress-interval", type=float, default=1.0, help="Intervalo mínimo, em segundos, entre eventos de progresso de um job.")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.jobs is not None and args.jobs < 1:
+        print("--jobs deve ser pelo menos 1.", file=sys.stderr); return 2
+    try:
+        if args.input == "-":
+            urls = read_urls(sys.stdin)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f: urls = read_urls(f)
+    except OSError as e:
+        print(f"Não foi possível ler a lista de URLs: {e}", file=sys.stderr); return 2
+
+    out = JsonLinesWriter()
+    min_level = LOG_LEVELS.index(args.log_level)
+    def log(message, level="info"):
+        if level not in LOG_LEVELS or LOG_LEVELS.index(level) >= min_level:
+            out.emit("log", level=level, message=message)
+
+    # Importado aqui para que `--help` e erros de uso não paguem o custo do yt-dlp
+    from ..core.downloader import Downloader
+
+    downloader = Downloader(logger_callback=log)
+    scheduler = DownloadScheduler(downloader, max_workers=args.jobs)
+    kind = DownloadJob.KIND_AUDIO if args.audio else DownloadJob.KIND_VIDEO
+    last_progress = {}
+    reported = threading.Condition()
+    reported_ids = set()
+
+    def on_progress(job):
+        now = time.monotonic()
+        if now - last_progress.get(job.id, 0.0) < args.progress_interval: return
+        last_progress[job.id] = now
+        progress = dict(job.progress)
+        out.emit("progress", job=job.id, url=job.url, **{key: progress.get(key) for key in ('status', 'title', 'downloaded_bytes', 'total_bytes', 'speed', 'eta')},
+                 playlist=progress.get('playlist'))
+
+    def on_done(job):
+        elapsed = (job.finished_at - job.started_at).total_seconds() if job.started_at else 0.0
+        out.emit("result", job=job.id, url=job.url, status=job.status, format=job.format_code,
+                 error=str(job.error) if job.error else None, elapsed=round(elapsed, 3), playlist=job.progress.get('playlist'))
+        with reported:
+            reported_ids.add(job.id); reported.notify_all()
+
+    jobs = scheduler.resume_pending() if args.resume else []
+    for job in jobs:
+        out.emit("queued", job=job.id, url=job.url, kind=job.kind, resumed=True, resumed_bytes=job.resumed_bytes)
+    for url in urls:
+        job = scheduler.submit(url, args.format_code, kind=kind, download_playlist=args.playlist, segmented=args.segmented)
+        out.emit("queued", job=job.id, url=url, kind=kind, resumed=False)
+        jobs.append(job)
+    for job in jobs:
+        job.add_progress_callback(on_progress)
+        job.add_done_callback(on_done)
+
+    try:
+        # Aguarda também o evento 'result' de cada job, para que o 'summary' seja sempre a última linha
+        with reported:
+            while len(reported_ids) < len(jobs):
+                reported.wait(timeout=0.5)
+    except KeyboardInterrupt:
+        # Os jobs pendentes continuam no diário e podem ser retomados com --resume
+        scheduler.shutdown(wait=False, cancel_pending=True)
+        downloader.history_manager.flush()
+        out.emit("summary", interrupted=True, **_summary(jobs))
+        return 130
+    scheduler.shutdown()
+    downloader.history_manager.flush()
+    summary = _summary(jobs)
+    out.emit("summary", interrupted=False, **summary)
+    return 0 if summary['failed'] == 0 else 1
+
+def _summary(jobs: list) -> dict:
+    return {
+        'total': len(jobs),
+        'completed': sum(1 for job in jobs if job.status == JobStatus.COMPLETED),
+        'skipped': sum(1 for job in jobs if job.status == JobStatus.SKIPPED),
+        'failed': sum(1 for job in jobs if job.status == JobStatus.FAILED),
+        'cancelled': sum(1 for job in jobs if job.status == JobStatus.CANCELLED),
+    }
+
+if __name__ == "__main__":
+    sys.exit(main())
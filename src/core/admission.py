@@ -0,0 +1,223 @@
+# src/core/admission.py
+
+"""
+Módulo de controle de admissão por espaço em disco.
+
+Antes de começar um download, o espaço que ele vai ocupar é estimado a partir
+do dicionário de informações (`filesize`/`filesize_approx` dos formatos
+escolhidos, mais a sobra necessária para a mesclagem ou a conversão) e
+reservado no `DiskAdmissionController`. Um download só é admitido se o espaço
+livre do volume, descontado o que os downloads em andamento ainda vão gravar e
+uma margem mínima, comportar a sua reserva; caso contrário ele aguarda até que
+outros downloads terminem (ou que espaço seja liberado), em vez de falhar no
+meio do caminho depois de gastar banda.
+
+A parte ainda não gravada de cada reserva é atualizada pelos eventos do
+progress hook, de modo que os bytes já baixados não são contados duas vezes
+(uma no espaço livre do disco, outra na reserva). Se os eventos informarem um
+tamanho maior que a estimativa (ou a estimativa não tiver sido possível), a
+reserva cresce até o tamanho informado.
+"""
+
+import shutil
+import threading
+import time
+from .exceptions import FileSystemError
+from .formats import get_format_index
+
+DEFAULT_MIN_FREE_BYTES = 50 * 1024 * 1024
+DEFAULT_POLL_INTERVAL = 5.0
+# Na mesclagem os streams separados e o arquivo final coexistem até o fim: o pico é o dobro dos streams
+MERGE_OVERHEAD = 1.0
+# A conversão para FLAC grava o áudio original e o FLAC (~880 kbps em estéreo a 44,1 kHz)
+FLAC_BYTES_PER_SECOND = 110_000
+FLAC_SIZE_RATIO = 6
+# `filesize_approx` é uma estimativa do yt-dlp: uma pequena margem evita admitir downloads no limite
+SAFETY_MARGIN = 0.05
+
+def _format_size(entry: dict, duration) -> int:
+    if entry.get('size'):
+        return int(entry['size'])
+    if entry.get('tbr') and duration:
+        return int(entry['tbr'] * 1000 / 8 * duration)
+    return 0
+
+def _resolve_format(index: dict, format_code: str) -> list | None:
+    """Resolve um código de formato ('137+140', 'bestaudio/best', ...) em entradas do índice de formatos."""
+    by_id = {entry['id']: entry for entry in index['video'] + index['audio']}
+    for alternative in str(format_code or '').split('/'):
+        chosen = []
+        for part in alternative.split('+'):
+            part = part.strip()
+            if part in by_id: chosen.append(by_id[part])
+            elif part == 'bestaudio' and index['audio']: chosen.append(index['audio'][0])
+            elif part in ('best', 'bestvideo') and index['video']: chosen.append(index['video'][0])
+            else: chosen = None; break
+        if chosen:
+            return chosen
+    return None
+
+def estimate_download_bytes(info: dict | None, format_code: str | None, transcode: str | None = None) -> int:
+    """
+    Estima o pico de espaço em disco de um download.
+
+    Args:
+        info (dict | None): O dicionário de informações (completo ou a projeção do cache).
+        format_code (str | None): O código de formato passado ao yt-dlp.
+        transcode (str | None): O codec de conversão do áudio (ex: 'flac'), se houver.
+
+    Returns:
+        int: Os bytes estimados, ou 0 se as informações não permitirem uma estimativa.
+    """
+    if not info:
+        return 0
+    duration = info.get('duration')
+    chosen = _resolve_format(get_format_index(info), format_code) if info.get('formats') or info.get('format_index') else None
+    if chosen:
+        streams = sum(_format_size(entry, duration) for entry in chosen)
+        if len(chosen) > 1:
+            streams += int(streams * MERGE_OVERHEAD)
+    else:
+        streams = int(info.get('filesize') or info.get('filesize_approx') or 0)
+    if transcode == 'flac' and streams:
+        streams += int(duration * FLAC_BYTES_PER_SECOND) if duration else streams * FLAC_SIZE_RATIO
+    return int(streams * (1 + SAFETY_MARGIN))
+
+class Reservation:
+    """Espaço reservado para um download em andamento. Use como gerenciador de contexto."""
+
+    def __init__(self, controller: 'DiskAdmissionController', expected_bytes: int, label: str):
+        self.controller = controller
+        self.expected_bytes = expected_bytes
+        self.label = label
+        self._written = {}
+        self._totals = {}
+        # Os progress hooks rodam nas threads do download; o controlador lê a reserva em outras threads
+        self._lock = threading.Lock()
+
+    @property
+    def written_bytes(self) -> int:
+        with self._lock:
+            return sum(self._written.values())
+
+    @property
+    def outstanding_bytes(self) -> int:
+        """Bytes da reserva que ainda não foram gravados no disco."""
+        with self._lock:
+            expected = max(self.expected_bytes, sum(self._totals.values()))
+            return max(0, expected - sum(self._written.values()))
+
+    def record_progress(self, d: dict):
+        """Progress hook do yt-dlp: atualiza os bytes já gravados (e o tamanho informado) de cada arquivo do download."""
+        if d.get('status') in ('downloading', 'finished'):
+            filename = d.get('filename')
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            with self._lock:
+                self._written[filename] = d.get('downloaded_bytes') or d.get('total_bytes') or 0
+                if total: self._totals[filename] = int(total)
+
+    def release(self):
+        self.controller._release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+class DiskAdmissionController:
+    """Admite downloads apenas quando o disco comporta o que eles vão gravar (thread-safe)."""
+
+    def __init__(self, min_free_bytes: int = DEFAULT_MIN_FREE_BYTES, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 disk_usage=shutil.disk_usage):
+        """
+        Inicializa o DiskAdmissionController.
+
+        Args:
+            min_free_bytes (int): Espaço que deve continuar livre depois de todas as reservas.
+            poll_interval (float): Intervalo, em segundos, entre novas medições do disco enquanto há downloads aguardando
+                (o espaço também pode ser liberado fora da aplicação).
+            disk_usage (callable): Função que mede o volume (padrão: `shutil.disk_usage`).
+        """
+        self.min_free_bytes = min_free_bytes
+        self.poll_interval = poll_interval
+        self._disk_usage = disk_usage
+        self._reservations = []
+        self._waiting = 0
+        self._condition = threading.Condition()
+
+    def _free_bytes(self, path: str) -> int:
+        try:
+            return self._disk_usage(path).free
+        except FileNotFoundError:
+            raise FileSystemError(f"O caminho '{path}' não foi encontrado para verificar o espaço em disco.")
+
+    def available_bytes(self, path: str) -> int:
+        """Espaço que ainda pode ser reservado: o livre, menos o pendente das reservas e a margem mínima."""
+        with self._condition:
+            return self._available(path)
+
+    def _available(self, path: str) -> int:
+        outstanding = sum(reservation.outstanding_bytes for reservation in self._reservations)
+        return self._free_bytes(path) - outstanding - self.min_free_bytes
+
+    def admit(self, expected_bytes: int, path: str, label: str = '', on_wait=None, timeout: float | None = None) -> Reservation:
+        """
+        Reserva `expected_bytes` no volume de `path`, aguardando até que haja espaço.
+
+        Args:
+            expected_bytes (int): O espaço estimado do download (ver `estimate_download_bytes`).
+            path (str): A pasta de destino.
+            label (str): Uma descrição do download, usada nas mensagens.
+            on_wait (callable | None): Chamada uma vez, com `(expected_bytes, available_bytes)`, se o download precisar aguardar.
+            timeout (float | None): Tempo máximo de espera, em segundos. None para aguardar indefinidamente.
+
+        Returns:
+            Reservation: A reserva, que deve ser liberada (`release()` ou `with`) ao fim do download.
+
+        Lança:
+            FileSystemError: Se não houver espaço e nenhum download em andamento puder liberá-lo, ou se o tempo esgotar.
+        """
+        expected_bytes = max(0, int(expected_bytes or 0))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        notified = False
+        with self._condition:
+            while True:
+                available = self._available(path)
+                if expected_bytes <= available:
+                    reservation = Reservation(self, expected_bytes, label)
+                    self._reservations.append(reservation)
+                    return reservation
+                if not self._reservations:
+                    # Nenhum download em andamento vai liberar espaço: falha antes de baixar qualquer byte
+                    raise FileSystemError(
+                        f"Espaço em disco insuficiente para '{label or path}': são necessários {expected_bytes / 2**20:.0f} MB, "
+                        f"mas apenas {max(available, 0) / 2**20:.0f} MB podem ser usados em '{path}'."
+                    )
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise FileSystemError(f"Tempo esgotado aguardando espaço em disco para '{label or path}'.")
+                if on_wait and not notified:
+                    on_wait(expected_bytes, available); notified = True
+                self._waiting += 1
+                try:
+                    self._condition.wait(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                finally:
+                    self._waiting -= 1
+
+    def _release(self, reservation: Reservation):
+        with self._condition:
+            if reservation in self._reservations:
+                self._reservations.remove(reservation)
+                self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        """Retorna o número de reservas e de downloads aguardando e os bytes reservados e ainda não gravados."""
+        with self._condition:
+            return {
+                'reservations': len(self._reservations),
+                'waiting': self._waiting,
+                'reserved_bytes': sum(reservation.expected_bytes for reservation in self._reservations),
+                'outstanding_bytes': sum(reservation.outstanding_bytes for reservation in self._reservations),
+            }
@@ -0,0 +1,135 @@
+# src/core/archive.py
+
+"""
+Módulo do arquivo de downloads ("download archive").
+
+Registra os vídeos já baixados numa tabela indexada do banco de dados do cache,
+identificados como no arquivo do yt-dlp (`<extrator> <id>`, ex: `youtube dQw4w9WgXcQ`).
+Os identificadores são carregados num conjunto em memória na inicialização, de
+modo que a verificação é feita antes de qualquer extração: ao sincronizar de novo
+um canal ou uma playlist, apenas as entradas novas são extraídas e baixadas.
+
+Um arquivo de texto no formato do yt-dlp (`archive_file` da configuração) é
+importado automaticamente, se existir.
+"""
+
+import datetime
+import os
+import threading
+from .storage import get_database
+from .urls import media_key
+
+def archive_id(info: dict) -> str | None:
+    """
+    Retorna o identificador de arquivo de um vídeo extraído ou de uma entrada "flat" de playlist.
+
+    Returns:
+        str | None: '<extrator> <id>', ou None se o extrator ou o id forem desconhecidos.
+    """
+    extractor = info.get('extractor_key') or info.get('ie_key')
+    video_id = info.get('id')
+    if not extractor or not video_id:
+        return None
+    return f"{extractor.lower()} {video_id}"
+
+def archive_id_from_url(url: str) -> str | None:
+    """Identificador de arquivo deduzido apenas da URL (sem extração), para sites reconhecidos."""
+    key = media_key(url)
+    if not key or key[0] not in ('youtube', 'vimeo'):
+        return None
+    return f"{key[0]} {key[1]}"
+
+class DownloadArchive:
+    """Conjunto persistente dos vídeos já baixados, thread-safe."""
+
+    def __init__(self, db_path: str, legacy_file: str | None = None):
+        """
+        Inicializa o DownloadArchive e carrega os identificadores em memória.
+
+        Args:
+            db_path (str): O banco de dados SQLite (o mesmo do cache).
+            legacy_file (str | None): Arquivo de texto do yt-dlp a importar, se existir.
+        """
+        self._db = get_database(db_path)
+        self._lock = threading.Lock()
+        self._create_table()
+        with self._db.read() as conn:
+            self._ids = {row[0] for row in conn.execute("SELECT archive_id FROM download_archive")}
+        if legacy_file and os.path.exists(legacy_file):
+            self.import_file(legacy_file)
+
+    def _create_table(self):
+        with self._db.write() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_archive (
+                    archive_id TEXT PRIMARY KEY,
+                    added_at TEXT NOT NULL
+                ) WITHOUT ROWID
+            """)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._ids
+
+    def contains_url(self, url: str) -> bool:
+        """Verifica, sem extração, se a URL aponta para um vídeo já baixado."""
+        item_id = archive_id_from_url(url)
+        return item_id is not None and item_id in self._ids
+
+    def contains_entry(self, entry: dict) -> bool:
+        """Verifica uma entrada "flat" de playlist (ou um vídeo extraído), com a URL como alternativa."""
+        item_id = archive_id(entry)
+        if item_id is not None and item_id in self._ids:
+            return True
+        url = entry.get('webpage_url') or entry.get('url')
+        return bool(url) and self.contains_url(url)
+
+    def add_ids(self, item_ids):
+        """Registra vários identificadores numa única transação (ignora os já existentes)."""
+        with self._lock:
+            new_ids = [item_id for item_id in dict.fromkeys(item_ids) if item_id and item_id not in self._ids]
+            if not new_ids:
+                return 0
+            now = datetime.datetime.now().isoformat()
+            with self._db.write() as conn:
+                conn.executemany("INSERT OR IGNORE INTO download_archive (archive_id, added_at) VALUES (?, ?)",
+                                 [(item_id, now) for item_id in new_ids])
+            self._ids.update(new_ids)
+            return len(new_ids)
+
+    def add(self, info: dict) -> bool:
+        """
+        Registra um vídeo baixado.
+
+        Returns:
+            bool: True se o vídeo ainda não constava no arquivo.
+        """
+        return self.add_ids([archive_id(info)]) > 0
+
+    def import_file(self, path: str) -> int:
+        """
+        Importa um arquivo de texto no formato do yt-dlp (uma linha '<extrator> <id>' por vídeo).
+
+        Returns:
+            int: O número de identificadores novos.
+        """
+        item_ids = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) >= 2:
+                        item_ids.append(f"{parts[0].lower()} {parts[1]}")
+        except OSError as e:
+            print(f"Erro ao importar o arquivo de downloads '{path}': {e}")
+            return 0
+        return self.add_ids(item_ids)
+
+    def clear(self):
+        """Remove todos os registros do arquivo."""
+        with self._lock:
+            with self._db.write() as conn:
+                conn.execute("DELETE FROM download_archive")
+            self._ids.clear()
@@ -5,17 +5,92 @@ Módulo para gerenciamento de cache de metadados de vídeos.
 
 Usa um banco de dados SQLite para armazenar informações extraídas,
 evitando requisições repetidas para a mesma URL e acelerando a resposta da aplicação.
+
+O dicionário completo do yt-dlp pode ter centenas de KB (todos os formatos,
+cabeçalhos HTTP, legendas automáticas), mas a aplicação só usa alguns campos.
+Por isso cada entrada guarda apenas uma projeção compacta, comprimida com zlib,
+que é o que `get_info` retorna. O dicionário completo não é guardado: quem precisa
+dele (o download) extrai a URL de novo.
+
+O tamanho do banco é limitado por um orçamento de linhas/bytes: ao ultrapassá-lo,
+as entradas acessadas há mais tempo são removidas (LRU), e uma thread em segundo
+plano remove periodicamente as entradas expiradas.
+
+Na frente do SQLite há uma camada LRU em memória (chaveada por URL + modo
+playlist) que atende consultas repetidas sem tocar no banco nem decodificar JSON.
+
+As entradas são indexadas pela chave canônica da URL (ver `urls.cache_key`), de
+modo que variações da mesma URL (`youtu.be/ID`, `watch?v=ID&t=30`, ...) compartilham
+a mesma linha.
+
+Playlists são guardadas como um índice (metadados da playlist + lista de URLs
+das entradas) que aponta para as linhas de cada vídeo em `video_cache`, de modo
+que uma atualização só precisa extrair as entradas que ainda não estão em cache.
 """
 
-import sqlite3
 import json
 import datetime
 import os
-from .config import load_config
+import threading
+import zlib
+from .config import get_config
+from .lru import LRUCache
+from .formats import get_format_index
+from .storage import get_database
+from .urls import cache_key
+
+# Campos do dicionário de informações usados pela aplicação
+PROJECTED_FIELDS = (
+    'id', 'title', 'uploader', 'channel', 'duration', 'thumbnail', 'webpage_url', 'original_url',
+    'extractor', 'extractor_key', '_type', 'entry_count', 'playlist_count', 'upload_date',
+    'ext', 'format_id', 'filesize', 'filesize_approx',
+)
+# Campos de cada formato usados na seleção de qualidade
+PROJECTED_FORMAT_FIELDS = (
+    'format_id', 'ext', 'vcodec', 'acodec', 'height', 'width', 'fps', 'abr', 'tbr',
+    'filesize', 'filesize_approx', 'protocol',
+)
+
+def project_info(info: dict) -> dict:
+    """
+    Reduz um dicionário do yt-dlp aos campos usados pela aplicação.
+
+    Entradas de playlists são projetadas recursivamente.
+
+    Args:
+        info (dict): O dicionário de informações completo.
+
+    Returns:
+        dict: A projeção compacta.
+    """
+    projected = {key: info[key] for key in PROJECTED_FIELDS if info.get(key) is not None}
+    formats = info.get('formats')
+    if formats:
+        projected['formats'] = [
+            {key: f[key] for key in PROJECTED_FORMAT_FIELDS if f.get(key) is not None}
+            for f in formats if f
+        ]
+        # Índice de formatos já ordenado, para que a seleção não precise reprocessar a lista
+        projected['format_index'] = get_format_index(info)
+    entries = info.get('entries')
+    if entries is not None:
+        projected['entries'] = [project_info(entry) if entry else None for entry in entries]
+    return projected
+
+def encode_payload(data: dict, level: int = 6) -> bytes:
+    """Serializa um dicionário em JSON compacto e o comprime com zlib."""
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), level)
+
+def decode_payload(payload: bytes) -> dict:
+    """Operação inversa de `encode_payload`."""
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
 
 class CacheManager:
     """Gerencia o armazenamento e recuperação de metadados de vídeo em um banco de dados SQLite."""
 
+    # Número de acessos acumulados em memória antes de gravar `last_accessed` no banco
+    TOUCH_FLUSH_THRESHOLD = 64
+
     def __init__(self, ttl_days: int = 7):
         """
         Inicializa o CacheManager.
@@ -23,22 +98,31 @@ class CacheManager:
         Args:
             ttl_days (int): Tempo de vida (em dias) para os dados em cache.
         """
-        config = load_config()
+        config = get_config()
         # Armazena o banco de dados na pasta de downloads para portabilidade
         db_folder = config.get('download_path', 'downloads')
         os.makedirs(db_folder, exist_ok=True)
         
         self.db_path = os.path.join(db_folder, 'cache.db')
         self.ttl = datetime.timedelta(days=ttl_days)
+        self.playlist_ttl = datetime.timedelta(minutes=config.get('playlist_cache_ttl_minutes', 60))
+        self.compression_level = config.get('cache_compression_level', 6)
+        self.max_bytes = config.get('cache_max_bytes', 0)
+        self.max_rows = config.get('cache_max_rows', 0)
+        self.purge_interval = config.get('cache_purge_interval_minutes', 30) * 60
+        self._stats = {'hits': 0, 'memory_hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'purged': 0}
+        self._memory = LRUCache(config.get('cache_memory_entries', 256))
+        self._pending_touches = {}
+        self._lock = threading.Lock()
+        self._purge_thread = None
+        self._purge_stop = threading.Event()
+        self._db = get_database(self.db_path)
+        self._db.enable_incremental_vacuum()
         self._create_table()
 
-    def _get_connection(self):
-        """Retorna uma conexão com o banco de dados SQLite."""
-        return sqlite3.connect(self.db_path)
-
     def _create_table(self):
-        """Cria a tabela de cache se ela não existir."""
-        with self._get_connection() as conn:
+        """Cria a tabela de cache se ela não existir e migra tabelas de versões anteriores."""
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS video_cache (
@@ -47,54 +131,344 @@ class CacheManager:
                     cached_at TIMESTAMP NOT NULL
                 )
             """)
-            conn.commit()
+            # `info_json` é mantido apenas para ler entradas antigas (não comprimidas)
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(video_cache)")}
+            if 'info_compact' not in columns:
+                cursor.execute("ALTER TABLE video_cache ADD COLUMN info_compact BLOB")
+            if 'info_full' not in columns:
+                cursor.execute("ALTER TABLE video_cache ADD COLUMN info_full BLOB")
+            if 'last_accessed' not in columns:
+                cursor.execute("ALTER TABLE video_cache ADD COLUMN last_accessed TIMESTAMP")
+            if 'size_bytes' not in columns:
+                cursor.execute("ALTER TABLE video_cache ADD COLUMN size_bytes INTEGER")
+                cursor.execute("""
+                    UPDATE video_cache SET size_bytes = length(info_json)
+                        + coalesce(length(info_compact), 0) + coalesce(length(info_full), 0)
+                """)
+            # O dicionário completo gravado por versões anteriores não é mais lido: libera o espaço
+            cursor.execute("""
+                UPDATE video_cache SET info_full = NULL, size_bytes = length(info_json) + coalesce(length(info_compact), 0)
+                WHERE info_full IS NOT NULL
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_cache_last_accessed ON video_cache (last_accessed)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_video_cache_cached_at ON video_cache (cached_at)")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS playlist_cache (
+                    url TEXT PRIMARY KEY,
+                    info_compact BLOB NOT NULL,
+                    entry_urls BLOB NOT NULL,
+                    cached_at TIMESTAMP NOT NULL
+                )
+            """)
+
+    def _is_fresh(self, cached_at: str | datetime.datetime) -> bool:
+        if isinstance(cached_at, str):
+            cached_at = datetime.datetime.fromisoformat(cached_at)
+        return datetime.datetime.now() - cached_at < self.ttl
+
+    @staticmethod
+    def _memory_key(key: str, download_playlist: bool = False) -> tuple:
+        return (key, bool(download_playlist))
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def _touch(self, key: str):
+        """Registra um acesso em memória; os acessos são gravados no banco em lote."""
+        with self._lock:
+            self._pending_touches[key] = datetime.datetime.now().isoformat()
+            should_flush = len(self._pending_touches) >= self.TOUCH_FLUSH_THRESHOLD
+        if should_flush:
+            self._flush_touches()
+
+    def _flush_touches(self):
+        with self._lock:
+            touches, self._pending_touches = self._pending_touches, {}
+        if touches:
+            with self._db.write() as conn:
+                conn.executemany("UPDATE video_cache SET last_accessed = ? WHERE url = ?",
+                                 [(accessed_at, url) for url, accessed_at in touches.items()])
+
+    def _lookup(self, key: str, column: str, count: bool = True):
+        with self._db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {column}, info_json, cached_at FROM video_cache WHERE url = ?", (key,))
+            result = cursor.fetchone()
+
+        if not result:
+            if count: self._count('misses')
+            return None
+        if not self._is_fresh(result[2]):
+            if count: self._count('misses'); self._count('expired')
+            return None
+        if count: self._count('hits')
+        self._touch(key)
+        return result
 
     def get_info(self, url: str) -> dict | None:
         """
-        Recupera informações de uma URL do cache, se existirem e não estiverem expiradas.
+        Recupera a projeção compacta das informações de uma URL, se existir e não estiver expirada.
+
+        Consulta primeiro a camada em memória e só então o SQLite. O dicionário
+        retornado é compartilhado com o cache e não deve ser modificado.
 
         Args:
             url (str): A URL do vídeo.
 
         Returns:
-            dict | None: O dicionário de informações ou None se não estiver em cache ou expirado.
+            dict | None: A projeção (ver `project_info`) ou None se não estiver em cache ou expirado.
         """
-        with self._get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT info_json, cached_at FROM video_cache WHERE url = ?", (url,))
-            result = cursor.fetchone()
+        return self._get_info(url)
 
-            if result:
-                info_json, cached_at_str = result
-                cached_at = datetime.datetime.fromisoformat(cached_at_str)
-                
-                if datetime.datetime.now() - cached_at < self.ttl:
-                    return json.loads(info_json)
+    def _get_info(self, url: str, count: bool = True) -> dict | None:
+        # count=False: a consulta faz parte de outra (uma playlist), que é contabilizada uma única vez
+        key = cache_key(url)
+        memory_key = self._memory_key(key)
+        cached = self._memory.get(memory_key)
+        if cached:
+            info, cached_at = cached
+            if self._is_fresh(cached_at):
+                if count: self._count('hits'); self._count('memory_hits')
+                self._touch(key)
+                return info
+            self._memory.pop(memory_key)
+
+        result = self._lookup(key, 'info_compact', count)
+        if result:
+            info_compact, info_json, cached_at_str = result
+            if info_compact is not None:
+                info = decode_payload(info_compact)
+            else:
+                info = project_info(json.loads(info_json))
+            self._memory.put(memory_key, (info, datetime.datetime.fromisoformat(cached_at_str)))
+            return info
         return None
 
     def save_info(self, url: str, info: dict):
         """
         Salva as informações de um vídeo no cache.
 
+        Grava apenas a projeção compacta, comprimida. Se o cache ultrapassar o
+        orçamento configurado, as entradas menos usadas recentemente são removidas.
+
         Args:
             url (str): A URL do vídeo.
             info (dict): O dicionário de informações retornado pelo yt-dlp.
         """
-        info_json = json.dumps(info)
-        cached_at = datetime.datetime.now().isoformat()
-        
-        with self._get_connection() as conn:
+        projection = project_info(info)
+        info_compact = encode_payload(projection, self.compression_level)
+        size_bytes = len(info_compact)
+        cached_at = datetime.datetime.now()
+        now = cached_at.isoformat()
+        key = cache_key(url)
+
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "INSERT OR REPLACE INTO video_cache (url, info_json, cached_at) VALUES (?, ?, ?)",
-                (url, info_json, cached_at)
+                "INSERT OR REPLACE INTO video_cache (url, info_json, cached_at, info_compact, last_accessed, size_bytes)"
+                " VALUES (?, '', ?, ?, ?, ?)",
+                (key, now, info_compact, now, size_bytes)
+            )
+            evicted = self._enforce_budget(conn)
+        # Se o orçamento removeu a própria linha recém-gravada, a memória não pode servi-la
+        if key not in evicted:
+            self._memory.put(self._memory_key(key), (projection, cached_at))
+
+    def _enforce_budget(self, conn) -> set:
+        """
+        Remove as entradas menos usadas recentemente até o cache caber no orçamento.
+
+        As entradas removidas também saem da camada em memória, assim como as playlists
+        montadas em memória, que podem conter alguma delas.
+
+        Returns:
+            set: As chaves removidas.
+        """
+        if not self.max_rows and not self.max_bytes:
+            return set()
+        row_count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM video_cache").fetchone()
+        excess_rows = max(0, row_count - self.max_rows) if self.max_rows else 0
+        excess_bytes = max(0, total_bytes - self.max_bytes) if self.max_bytes else 0
+        if not excess_rows and not excess_bytes:
+            return set()
+
+        victims = []
+        cursor = conn.execute("SELECT url, size_bytes FROM video_cache ORDER BY COALESCE(last_accessed, cached_at) ASC")
+        for url, size_bytes in cursor:
+            if len(victims) >= excess_rows and excess_bytes <= 0:
+                break
+            victims.append((url,))
+            excess_bytes -= size_bytes or 0
+        conn.executemany("DELETE FROM video_cache WHERE url = ?", victims)
+        for (url,) in victims:
+            self._memory.pop(self._memory_key(url))
+        if victims:
+            self._memory.discard_where(lambda memory_key: memory_key[1])
+        self._count('evictions', len(victims))
+        return {url for (url,) in victims}
+
+    def get_playlist_index(self, url: str) -> dict | None:
+        """
+        Recupera o índice de uma playlist, mesmo que a listagem já esteja desatualizada.
+
+        Args:
+            url (str): A URL da playlist.
+
+        Returns:
+            dict | None: {'info': metadados da playlist, 'entry_urls': [...], 'fresh': bool},
+            ou None se a playlist nunca foi armazenada.
+        """
+        with self._db.read() as conn:
+            result = conn.execute("SELECT info_compact, entry_urls, cached_at FROM playlist_cache WHERE url = ?", (cache_key(url, playlist=True),)).fetchone()
+        if not result:
+            return None
+        info_compact, entry_urls, cached_at_str = result
+        fresh = datetime.datetime.now() - datetime.datetime.fromisoformat(cached_at_str) < self.playlist_ttl
+        return {'info': decode_payload(info_compact), 'entry_urls': decode_payload(entry_urls), 'fresh': fresh}
+
+    def get_playlist_info(self, url: str) -> dict | None:
+        """
+        Monta as informações de uma playlist a partir do índice e das entradas em cache.
+
+        Só retorna um resultado se a listagem ainda estiver dentro do TTL de playlists
+        e todas as entradas disponíveis estiverem em cache. As entradas indisponíveis
+        (None no índice) continuam assim até a listagem expirar. A consulta conta como
+        um único acerto ou uma única falha nas estatísticas.
+
+        Args:
+            url (str): A URL da playlist.
+
+        Returns:
+            dict | None: A projeção da playlist, com as projeções das entradas em 'entries'.
+        """
+        key = self._memory_key(cache_key(url, playlist=True), download_playlist=True)
+        cached = self._memory.get(key)
+        if cached:
+            info, cached_at = cached
+            if datetime.datetime.now() - cached_at < self.playlist_ttl:
+                self._count('hits'); self._count('memory_hits')
+                return info
+            self._memory.pop(key)
+
+        index = self.get_playlist_index(url)
+        if not index or not index['fresh']:
+            self._count('misses')
+            return None
+        entries = [self._get_info(entry_url, count=False) if entry_url else None for entry_url in index['entry_urls']]
+        if any(entry is None for entry, entry_url in zip(entries, index['entry_urls']) if entry_url):
+            self._count('misses')
+            return None
+        self._count('hits')
+        info = self._build_playlist_info(index['info'], entries)
+        self._memory.put(key, (info, datetime.datetime.now()))
+        return info
+
+    def save_playlist(self, url: str, info: dict, entry_urls: list) -> dict:
+        """
+        Salva o índice de uma playlist. As entradas devem ser salvas com `save_info`.
+
+        Args:
+            url (str): A URL da playlist.
+            info (dict): O resultado da extração "flat" da playlist (as entradas são ignoradas).
+            entry_urls (list): As URLs das entradas, na ordem da playlist (None para as indisponíveis,
+                inclusive as que falharam na extração, para que a listagem seja servida do cache).
+
+        Returns:
+            dict: A playlist montada com as entradas atualmente em cache.
+        """
+        playlist_info = {field: value for field, value in project_info(info).items() if field != 'entries'}
+        key = cache_key(url, playlist=True)
+        now = datetime.datetime.now()
+        with self._db.write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO playlist_cache (url, info_compact, entry_urls, cached_at) VALUES (?, ?, ?, ?)",
+                (key, encode_payload(playlist_info, self.compression_level), encode_payload(entry_urls, self.compression_level), now.isoformat())
             )
-            conn.commit()
+        entries = [self._get_info(entry_url, count=False) if entry_url else None for entry_url in entry_urls]
+        assembled = self._build_playlist_info(playlist_info, entries)
+        self._memory.put(self._memory_key(key, download_playlist=True), (assembled, now))
+        return assembled
+
+    @staticmethod
+    def _build_playlist_info(playlist_info: dict, entries: list) -> dict:
+        info = dict(playlist_info)
+        info['_type'] = 'playlist'
+        info['entries'] = entries
+        info.setdefault('entry_count', len(entries))
+        return info
+
+    def purge_expired(self) -> int:
+        """
+        Remove as entradas expiradas, aplica o orçamento de tamanho e libera o espaço em disco.
+
+        Returns:
+            int: O número de entradas expiradas removidas.
+        """
+        self._flush_touches()
+        cutoff = (datetime.datetime.now() - self.ttl).isoformat()
+        with self._db.write() as conn:
+            purged = conn.execute("DELETE FROM video_cache WHERE cached_at < ?", (cutoff,)).rowcount
+            purged += conn.execute("DELETE FROM playlist_cache WHERE cached_at < ?", (cutoff,)).rowcount
+            self._enforce_budget(conn)
+        self._count('purged', purged)
+        self._db.incremental_vacuum()
+        return purged
+
+    def start_background_purge(self, interval_seconds: float | None = None):
+        """
+        Inicia uma thread que executa `purge_expired` periodicamente.
+
+        Args:
+            interval_seconds (float | None): Intervalo entre as limpezas. Se omitido,
+                usa `cache_purge_interval_minutes` da configuração.
+        """
+        if self._purge_thread and self._purge_thread.is_alive():
+            return
+        interval = interval_seconds or self.purge_interval
+        if not interval:
+            return
+        self._purge_stop.clear()
+
+        def run():
+            while not self._purge_stop.wait(interval):
+                try:
+                    self.purge_expired()
+                except Exception:
+                    pass
+
+        self._purge_thread = threading.Thread(target=run, name="cache-purge", daemon=True)
+        self._purge_thread.start()
+
+    def stop_background_purge(self):
+        """Interrompe a limpeza periódica e grava os acessos pendentes."""
+        self._purge_stop.set()
+        self._flush_touches()
+
+    def get_stats(self) -> dict:
+        """
+        Retorna as estatísticas do cache.
+
+        Returns:
+            dict: Contadores de acertos, falhas, expirações, remoções e limpezas desde a
+            inicialização, além do número de linhas e bytes atualmente armazenados.
+        """
+        with self._db.read() as conn:
+            rows, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM video_cache").fetchone()
+        with self._lock:
+            stats = self._stats.copy()
+        lookups = stats['hits'] + stats['misses']
+        stats.update(rows=rows, bytes=total_bytes, memory_entries=len(self._memory),
+                     hit_rate=stats['hits'] / lookups if lookups else 0.0)
+        return stats
 
     def clear_cache(self):
         """Limpa todos os dados da tabela de cache."""
-        with self._get_connection() as conn:
+        with self._lock:
+            self._pending_touches.clear()
+        self._memory.clear()
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM video_cache")
-            conn.commit()
-
+            cursor.execute("DELETE FROM playlist_cache")
+        self._db.incremental_vacuum()
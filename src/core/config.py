@@ -5,18 +5,301 @@ Módulo para carregar e salvar as configurações da aplicação.
 
 Gerencia um arquivo JSON (downloader_config.json) para persistir
 as preferências do usuário, como o caminho de download.
+
+A configuração é carregada uma única vez por processo pelo `ConfigService`
+(ver `get_config`), que valida e converte cada chave conhecida para o tipo
+esperado, aceita nomes alternativos (ex: `download_dir` para `download_path`) e
+recarrega o arquivo quando ele é alterado em disco (pelo mtime), notificando
+os assinantes (ex: o agendador, para ajustar o número de downloads simultâneos).
 """
 
 import json
 import os
+import tempfile
+import threading
+from .exceptions import ConfigError
 
 CONFIG_FILE = "downloader_config.json"
 DEFAULT_CONFIG = {
     "download_path": "downloads",
     "max_resolution": "1080",
     "download_playlist": False,
+    "max_concurrent_downloads": 2,
+    "max_job_attempts": 3,
+    "max_retries": 10,
+    "max_filename_length": 0,
+    "min_free_space_mb": 50,
+    "max_download_speed_kb": 0,
+    "max_connections_per_host": 4,
+    "prefer_aria2c": False,
+    "segmented_connections": 4,
+    "use_download_archive": False,
+    "archive_file": "download_archive.txt",
+    "cache_compression_level": 6,
+    "cache_max_bytes": 256 * 1024 * 1024,
+    "cache_max_rows": 5000,
+    "cache_purge_interval_minutes": 30,
+    "cache_memory_entries": 256,
+    "playlist_cache_ttl_minutes": 60,
+    "metrics_port": 0,
+}
+
+# Nomes alternativos aceitos no arquivo -> nome usado pela aplicação
+CONFIG_ALIASES = {
+    "download_dir": "download_path",
+}
+
+def _range(minimum, maximum=None):
+    def check(value):
+        return value >= minimum and (maximum is None or value <= maximum)
+    return check
+
+# Tipo e validação (opcional) de cada chave conhecida
+CONFIG_SCHEMA = {
+    "download_path": (str, lambda value: bool(value.strip())),
+    "max_resolution": (str, None),
+    "download_playlist": (bool, None),
+    "max_concurrent_downloads": (int, _range(1, 32)),
+    "max_job_attempts": (int, _range(0, 100)),  # Inícios de um job antes de desistir de retomá-lo; 0 = sem limite
+    "max_retries": (int, _range(0, 100)),
+    "max_filename_length": (int, _range(0, 255)),  # 0 = sem limite
+    "min_free_space_mb": (int, _range(0)),
+    "max_download_speed_kb": (int, _range(0)),  # KB/s somados de todos os downloads; 0 = sem limite
+    "max_connections_per_host": (int, _range(0, 64)),  # Inclui as conexões extras do download segmentado; 0 = sem limite
+    "prefer_aria2c": (bool, None),  # Usa o download segmentado (segmented.py) nos formatos elegíveis
+    "segmented_connections": (int, _range(1, 16)),
+    "use_download_archive": (bool, None),
+    "archive_file": (str, None),
+    "cache_compression_level": (int, _range(0, 9)),
+    "cache_max_bytes": (int, _range(0)),
+    "cache_max_rows": (int, _range(0)),
+    "cache_purge_interval_minutes": (int, _range(1)),
+    "cache_memory_entries": (int, _range(0)),
+    "playlist_cache_ttl_minutes": (int, _range(0)),
+    "metrics_port": (int, _range(0, 65535)),
 }
 
+def _coerce(key: str, value):
+    """Converte o valor para o tipo da chave. Lança ConfigError se não for possível ou se for inválido."""
+    expected, check = CONFIG_SCHEMA[key]
+    try:
+        if expected is bool:
+            if isinstance(value, str) and value.strip().lower() in ("true", "false", "1", "0", "sim", "não", "nao"):
+                value = value.strip().lower() in ("true", "1", "sim")
+            elif not isinstance(value, bool):
+                raise TypeError
+        elif expected is int:
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise TypeError
+            value = int(value)
+        elif expected is str:
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                raise TypeError
+            value = str(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"Valor inválido para '{key}': {value!r} (esperado {expected.__name__}).")
+    if check and not check(value):
+        raise ConfigError(f"Valor fora do intervalo permitido para '{key}': {value!r}.")
+    return value
+
+def validate_config(raw: dict, warn=print) -> dict:
+    """
+    Normaliza um dicionário lido do arquivo de configuração.
+
+    Aplica os nomes alternativos, converte as chaves conhecidas e substitui valores
+    inválidos pelo padrão (com um aviso). Chaves desconhecidas são mantidas como estão.
+
+    Args:
+        raw (dict): A configuração lida do arquivo.
+        warn (callable): Função usada para reportar valores inválidos.
+
+    Returns:
+        dict: A configuração normalizada, com todas as chaves padrão.
+    """
+    config = dict(raw)
+    for alias, key in CONFIG_ALIASES.items():
+        if alias in config and key not in config:
+            config[key] = config[alias]
+    for key, default in DEFAULT_CONFIG.items():
+        if key not in config:
+            config[key] = default
+            continue
+        try:
+            config[key] = _coerce(key, config[key])
+        except ConfigError as e:
+            warn(f"{e} Usando o padrão: {default!r}.")
+            config[key] = default
+    return config
+
+class ConfigService:
+    """Configuração compartilhada pelo processo, com recarga automática quando o arquivo muda."""
+
+    def __init__(self, config_file: str = CONFIG_FILE, poll_interval: float = 2.0):
+        """
+        Inicializa o ConfigService e carrega o arquivo.
+
+        Args:
+            config_file (str): O arquivo JSON de configuração.
+            poll_interval (float): Intervalo, em segundos, entre verificações do mtime do arquivo.
+        """
+        self.config_file = config_file
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._signature = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self._config = self._load()
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.config_file)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _load(self) -> dict:
+        """Lê e valida o arquivo. Se ele não existir, é criado com os valores padrão."""
+        if not os.path.exists(self.config_file):
+            self._write(DEFAULT_CONFIG)
+            self._signature = self._file_signature()
+            return dict(DEFAULT_CONFIG)
+        self._signature = self._file_signature()
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if not isinstance(raw, dict):
+                raise ValueError("o arquivo não contém um objeto JSON")
+        except (json.JSONDecodeError, ValueError, IOError) as e:
+            # Em caso de arquivo corrompido ou erro de leitura, usa o padrão
+            print(f"Erro ao ler o arquivo de configuração: {e}")
+            return dict(DEFAULT_CONFIG)
+        return validate_config(raw)
+
+    def _write(self, config: dict):
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=4)
+            os.replace(temp_path, self.config_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def get(self, key: str, default=None):
+        """Retorna o valor atual de uma chave."""
+        with self._lock:
+            return self._config.get(key, default)
+
+    def __getitem__(self, key: str):
+        with self._lock:
+            return self._config[key]
+
+    def snapshot(self) -> dict:
+        """Retorna uma cópia da configuração atual."""
+        with self._lock:
+            return dict(self._config)
+
+    def save(self, config: dict):
+        """
+        Valida e salva a configuração, notificando os assinantes das chaves alteradas.
+
+        Lança:
+            ConfigError: Se alguma chave conhecida tiver um valor inválido.
+        """
+        config = dict(config)
+        for key in CONFIG_SCHEMA:
+            if key in config:
+                config[key] = _coerce(key, config[key])
+        # Se o arquivo usa um nome alternativo, o valor é gravado apenas nele
+        for alias, key in CONFIG_ALIASES.items():
+            if alias in config and key in config:
+                config[alias] = config.pop(key)
+        with self._lock:
+            try:
+                self._write(config)
+            except IOError as e:
+                print(f"Erro ao salvar o arquivo de configuração: {e}")
+                return
+            self._signature = self._file_signature()
+            changed = self._replace(validate_config(config))
+        self._notify(changed)
+
+    def update(self, **changes):
+        """Altera algumas chaves e salva a configuração (ver `save`)."""
+        self.save(dict(self.snapshot(), **changes))
+
+    def reload_if_changed(self) -> dict:
+        """
+        Recarrega o arquivo se o mtime (ou o tamanho) mudou desde a última leitura.
+
+        Returns:
+            dict: As chaves alteradas e os seus novos valores (vazio se nada mudou).
+        """
+        with self._lock:
+            if self._file_signature() == self._signature:
+                return {}
+            changed = self._replace(self._load())
+        self._notify(changed)
+        return changed
+
+    def _replace(self, config: dict) -> dict:
+        changed = {key: value for key, value in config.items() if self._config.get(key) != value}
+        changed.update({key: None for key in self._config if key not in config})
+        self._config = config
+        return changed
+
+    def subscribe(self, callback):
+        """
+        Registra uma função chamada como `callback(changed, config)` quando a configuração muda.
+
+        `changed` contém apenas as chaves alteradas. O registro inicia a verificação
+        periódica do arquivo, se ela ainda não estiver em execução.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            if self._watcher is None and self.poll_interval:
+                self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+                self._watcher.start()
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, changed: dict):
+        if not changed:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        config = self.snapshot()
+        for callback in subscribers:
+            try:
+                callback(changed, config)
+            except Exception as e:
+                print(f"Erro ao aplicar a configuração recarregada: {e}")
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload_if_changed()
+
+    def stop(self):
+        """Interrompe a verificação periódica do arquivo."""
+        self._stop.set()
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_config() -> ConfigService:
+    """Retorna o ConfigService compartilhado pelo processo (carregado na primeira chamada)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = ConfigService()
+        return _service
+
 def load_config() -> dict:
     """
     Carrega a configuração do arquivo JSON.
@@ -25,22 +308,11 @@ def load_config() -> dict:
     Se o arquivo estiver corrompido, ele retornará os valores padrão.
 
     Returns:
-        dict: O dicionário de configurações.
+        dict: Uma cópia da configuração atual (lida do disco apenas uma vez por processo).
     """
-    if not os.path.exists(CONFIG_FILE):
-        save_config(DEFAULT_CONFIG)
-        return DEFAULT_CONFIG
-
-    try:
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            # Garante que todas as chaves padrão existam
-            for key, value in DEFAULT_CONFIG.items():
-                config.setdefault(key, value)
-            return config
-    except (json.JSONDecodeError, IOError):
-        # Em caso de arquivo corrompido ou erro de leitura, retorna o padrão
-        return DEFAULT_CONFIG
+    service = get_config()
+    service.reload_if_changed()
+    return service.snapshot()
 
 def save_config(config: dict):
     """
@@ -49,9 +321,4 @@ def save_config(config: dict):
     Args:
         config (dict): O dicionário de configurações a ser salvo.
     """
-    try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=4)
-    except IOError as e:
-        print(f"Erro ao salvar o arquivo de configuração: {e}")
-
+    get_config().save(config)
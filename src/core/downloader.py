@@ -1,12 +1,49 @@
 # src/core/downloader.py
 
-import yt_dlp
-from .config import load_config
-from .stats import StatsManager
-from .exceptions import DownloaderError, NetworkError, InvalidURLError, FileSystemError, FormatSelectionError
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .config import get_config
+from .stats import get_stats_manager
+from .metrics import get_metrics_registry, start_metrics_server
+from .exceptions import DownloaderError, NetworkError, InvalidURLError, FileSystemError, FormatSelectionError, RangeNotSupportedError
 from . import validators
 from .cache import CacheManager
 from .history import HistoryManager
+from .archive import DownloadArchive
+from .jobs import JobJournal
+from .formats import FormatPolicy
+from .admission import DiskAdmissionController, estimate_download_bytes
+from .ratelimit import BandwidthLimiter, HostLimiter
+from .segmented import SegmentedDownloader, segmented_target
+from .urls import cache_key, media_key, site_host
+
+def _yt_dlp():
+    """Importa o yt-dlp no primeiro uso: o import leva centenas de milissegundos e atrasaria a abertura da janela."""
+    import yt_dlp
+    return yt_dlp
+
+class PlaylistProgress:
+    """Progresso agregado de um download de playlist executado em paralelo (thread-safe)."""
+
+    def __init__(self, title: str, total: int):
+        self.title = title
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.bytes_downloaded = 0
+        self._lock = threading.Lock()
+
+    def record(self, success: bool, size_bytes: int = 0) -> dict:
+        """Registra o término de uma entrada e retorna um instantâneo do progresso."""
+        with self._lock:
+            if success: self.completed += 1; self.bytes_downloaded += size_bytes or 0
+            else: self.failed += 1
+            return self.as_dict()
+
+    def as_dict(self) -> dict:
+        return {'title': self.title, 'total': self.total, 'completed': self.completed, 'failed': self.failed, 'skipped': self.skipped,
+                'finished': self.completed + self.failed + self.skipped, 'bytes_downloaded': self.bytes_downloaded}
 
 class Downloader:
     class _YdlLogger:
@@ -17,22 +54,47 @@ class Downloader:
         def error(self, msg): self.log(msg, 'error')
 
     def __init__(self, logger_callback=print):
-        self.config = load_config()
-        self.stats_manager = StatsManager()
+        self.config = get_config()  # Compartilhada e recarregada automaticamente quando o arquivo muda
+        self.stats_manager = get_stats_manager()
+        self.metrics = get_metrics_registry()
+        metrics_port = int(self.config.get('metrics_port') or 0)
+        if metrics_port:
+            try: start_metrics_server(metrics_port)
+            except OSError as e: logger_callback(f"Não foi possível iniciar o servidor de métricas na porta {metrics_port}: {e}", "warning")
         self.logger = logger_callback
         self.ydl_logger = self._YdlLogger(logger_callback)
         self.cache_manager = CacheManager()
-        self.history_manager = HistoryManager()
+        self.cache_manager.start_background_purge()
+        self.history_manager = HistoryManager(logger_callback=logger_callback)
+        self.archive = DownloadArchive(self.cache_manager.db_path, legacy_file=self.config.get('archive_file'))
+        self.journal = JobJournal(self.cache_manager.db_path)
+        self.admission = DiskAdmissionController(min_free_bytes=self._min_free_bytes())
+        # Compartilhados por todos os downloads deste Downloader e ajustados quando a configuração muda
+        self.bandwidth = BandwidthLimiter(self._max_bytes_per_second())
+        self.host_limiter = HostLimiter(self.config.get('max_connections_per_host', 4))
+        self.segmented = SegmentedDownloader(connections=self.config.get('segmented_connections', 4), retries=self.config.get('max_retries', 10))
+        self.config.subscribe(self._on_config_changed)
 
-    def _get_base_ydl_opts(self, download_playlist=False):
-        """Retorna as opções base para o yt-dlp, incluindo o controle de playlist."""
+    def _get_base_ydl_opts(self, download_playlist=False, progress_hook=None, job_id=None):
+        """
+        Retorna as opções base para o yt-dlp, incluindo o controle de playlist, um progress hook
+        adicional opcional e, se `job_id` for informado, o registro do progresso no diário de jobs.
+        """
+        hooks = [self._progress_hook, self.bandwidth.observe]
+        if progress_hook: hooks.append(progress_hook)
+        if job_id is not None: hooks.append(lambda d: self.journal.record_progress(job_id, d))
+        max_filename_length = self.config.get('max_filename_length', 0)
+        title_field = f"%(title).{max_filename_length}s" if max_filename_length else "%(title)s"
         return {
-            'outtmpl': f"{self.config.get('download_path', 'downloads')}/%(title)s.%(ext)s",
-            'progress_hooks': [self._progress_hook],
+            'outtmpl': f"{self.config.get('download_path', 'downloads')}/{title_field}.%(ext)s",
+            'progress_hooks': hooks,
             'logger': self.ydl_logger,
             'noplaylist': not download_playlist,
             'ignoreerrors': download_playlist, # Ignora erros em vídeos individuais de uma playlist
             'merge_output_format': 'mp4',
+            'continuedl': True, # Continua arquivos .part deixados por um download interrompido
+            'retries': self.config.get('max_retries', 10),
+            'fragment_retries': self.config.get('max_retries', 10),
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             },
@@ -40,41 +102,284 @@ class Downloader:
     
     def _validate_prerequisites(self, url: str):
         self.logger("Executando validações de pré-requisitos...", "info")
-        validators.validate_url(url); download_path = self.config.get('download_path', 'downloads'); validators.validate_download_path(download_path); validators.validate_disk_space(download_path)
+        validators.validate_url(url); download_path = self.config.get('download_path', 'downloads'); validators.validate_download_path(download_path); validators.validate_disk_space(download_path, self.config.get('min_free_space_mb', 50))
         self.logger("Validações concluídas com sucesso.", "info")
 
     def _progress_hook(self, d):
-        if d['status'] == 'finished': self.stats_manager.increment_download_count(); self.stats_manager.add_bytes_downloaded(d.get('total_bytes', 0))
+        # As métricas de transferência são alimentadas pelo TransferGroup de cada download (_download_single)
+        # Cada stream (ex: vídeo e áudio de um download mesclado) gera seu próprio 'finished';
+        # o número de downloads é contado em _download_single, uma vez por item.
+        if d['status'] == 'finished' and not d.get('already_downloaded'): self.stats_manager.add_bytes_downloaded(d.get('total_bytes', 0))
 
     def extract_info(self, url: str, download_playlist: bool = False) -> dict:
         self._validate_prerequisites(url)
-        if not download_playlist:
+        if download_playlist:
+            cached_info = self.cache_manager.get_playlist_info(url)
+        else:
             cached_info = self.cache_manager.get_info(url)
-            if cached_info: self.logger(f"Informações para '{cached_info.get('title', url)}' encontradas no cache.", "info"); return cached_info
+        if cached_info: self.logger(f"Informações para '{cached_info.get('title', url)}' encontradas no cache.", "info"); return cached_info
         
         self.logger(f"Buscando informações para '{url}' na web... (Playlist: {'Sim' if download_playlist else 'Não'})", "info")
         try:
-            opts = self._get_base_ydl_opts(download_playlist=download_playlist); opts['progress_hooks'] = []
-            with yt_dlp.YoutubeDL(opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                if not download_playlist: self.cache_manager.save_info(url, info)
-                self.logger(f"Informações para '{info.get('title')}' obtidas com sucesso.", "info")
-                return info
-        except yt_dlp.utils.DownloadError as e: raise DownloaderError(f"Não foi possível extrair informações: {e}") from e
+            if download_playlist: return self._extract_playlist_info(url)
+            info = self._extract_single_info(url)
+            self.logger(f"Informações para '{info.get('title')}' obtidas com sucesso.", "info")
+            return info
+        except _yt_dlp().utils.DownloadError as e: raise DownloaderError(f"Não foi possível extrair informações: {e}") from e
         except Exception as e: raise DownloaderError(f"Um erro inesperado ocorreu ao extrair informações: {e}") from e
 
-    def download(self, url: str, format_code: str, download_playlist: bool = False):
+    def _extract_single_info(self, url: str) -> dict:
+        opts = self._get_base_ydl_opts(download_playlist=False); opts['progress_hooks'] = []
+        with _yt_dlp().YoutubeDL(opts) as ydl: info = ydl.extract_info(url, download=False)
+        self.cache_manager.save_info(url, info)
+        return info
+
+    def _extract_playlist_info(self, url: str) -> dict:
+        """
+        Extrai uma playlist de forma incremental: uma listagem "flat" e, em seguida,
+        apenas as entradas que ainda não estão no cache (em paralelo).
+        """
+        playlist = self._flat_extract(url)
+        if playlist.get('_type') != 'playlist':
+            # A URL não é uma playlist: a listagem já trouxe o vídeo completo
+            self.cache_manager.save_info(url, playlist)
+            return playlist
+
+        entry_urls = [self._entry_url(entry) if entry else None for entry in (playlist.get('entries') or [])]
+        unique_urls = {cache_key(entry_url): entry_url for entry_url in entry_urls if entry_url}
+        missing = [entry_url for entry_url in unique_urls.values() if self.cache_manager.get_info(entry_url) is None]
+        self.logger(f"Playlist '{playlist.get('title', url)}': {len(entry_urls)} vídeo(s), {len(missing)} fora do cache.", "info")
+
+        failed = set()
+        if missing:
+            max_workers = max(1, int(self.config.get('max_concurrent_downloads', 2)))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="playlist-info") as pool:
+                futures = {pool.submit(self._extract_single_info, entry_url): entry_url for entry_url in missing}
+                for future in as_completed(futures):
+                    try: future.result()
+                    except Exception as e:
+                        self.logger(f"Vídeo indisponível na playlist ({futures[future]}): {e}", "warning"); failed.add(cache_key(futures[future]))
+
+        # As entradas que falharam (privadas, removidas...) ficam como None no índice: sem isso, a playlist nunca seria servida do cache
+        entry_urls = [None if entry_url and cache_key(entry_url) in failed else entry_url for entry_url in entry_urls]
+        info = self.cache_manager.save_playlist(url, playlist, entry_urls)
+        self.logger(f"Informações da playlist '{info.get('title', url)}' obtidas com sucesso.", "info")
+        return info
+
+    def select_format(self, url: str, audio_only: bool = False, download_playlist: bool = False, policy: FormatPolicy | None = None) -> str:
+        """
+        Escolhe o formato de download segundo a política (padrão: `FormatPolicy.from_config`).
+        Em playlists, usa os formatos da primeira entrada disponível.
+
+        Returns:
+            str: 'video+audio', ou apenas o id do áudio se `audio_only`.
+
+        Lança:
+            FormatSelectionError: Se nenhum formato compatível for encontrado.
+        """
+        info = self.extract_info(url, download_playlist=download_playlist)
+        if info.get('_type') == 'playlist':
+            info = next((entry for entry in info.get('entries') or [] if entry), None) or {}
+        selection = (policy or FormatPolicy.from_config(self.config)).select(info)
+        if audio_only and selection['audio']: return selection['audio']['id']
+        if not audio_only and selection['format_code']: return selection['format_code']
+        raise FormatSelectionError(f"Nenhum formato compatível encontrado para: {url}")
+
+    @staticmethod
+    def _entry_url(entry: dict) -> str | None:
+        return entry.get('webpage_url') or entry.get('url')
+
+    def _entry_size(self, entry: dict) -> int:
+        return entry.get('filesize', 0) or entry.get('filesize_approx', 0) or 0
+
+    def _record_history(self, entry: dict, url: str, in_background: bool = False):
+        add = self.history_manager.add_entry_async if in_background else self.history_manager.add_entry
+        add(title=entry.get('title', 'Título desconhecido'), url=entry.get('webpage_url', url), size_bytes=self._entry_size(entry), uploader=entry.get('uploader') or '')
+
+    def _flat_extract(self, url: str) -> dict:
+        """Lista as entradas de uma playlist sem extrair cada vídeo (uma única requisição)."""
+        opts = self._get_base_ydl_opts(download_playlist=True); opts['progress_hooks'] = []; opts['extract_flat'] = 'in_playlist'
+        with _yt_dlp().YoutubeDL(opts) as ydl: return ydl.extract_info(url, download=False)
+
+    def _use_archive(self) -> bool:
+        return bool(self.config.get('use_download_archive', False))
+
+    def _min_free_bytes(self) -> int:
+        return int(self.config.get('min_free_space_mb', 50)) * 1024 * 1024
+
+    def _max_bytes_per_second(self) -> int:
+        return int(self.config.get('max_download_speed_kb', 0)) * 1024
+
+    def _on_config_changed(self, changed: dict, config: dict):
+        if 'max_download_speed_kb' in changed:
+            self.bandwidth.set_rate(self._max_bytes_per_second())
+        if 'max_connections_per_host' in changed:
+            self.host_limiter.set_limit(config.get('max_connections_per_host') or 0)
+        if 'segmented_connections' in changed:
+            self.segmented.connections = max(1, int(config.get('segmented_connections') or 1))
+        if 'max_retries' in changed:
+            self.segmented.retries = max(0, int(config.get('max_retries') or 0))
+
+    def _estimate_bytes(self, info: dict, ydl_opts: dict) -> int:
+        """Espaço estimado do download, a partir das informações já extraídas (0 se os formatos não informarem tamanho)."""
+        transcode = next((pp.get('preferredcodec') for pp in ydl_opts.get('postprocessors') or [] if pp.get('key') == 'FFmpegExtractAudio'), None)
+        return estimate_download_bytes(info, ydl_opts.get('format'), transcode)
+
+    def _admit(self, url: str, ydl_opts: dict, info: dict):
+        """Reserva o espaço do download, aguardando enquanto outros downloads em andamento ocupam o disco."""
+        def on_wait(expected, available):
+            self.logger(f"Aguardando espaço em disco para '{url}': {expected / 2**20:.0f} MB necessários, "
+                        f"{max(available, 0) / 2**20:.0f} MB disponíveis após os downloads em andamento.", "warning")
+        self.admission.min_free_bytes = self._min_free_bytes()
+        return self.admission.admit(self._estimate_bytes(info, ydl_opts), self.config.get('download_path', 'downloads'), label=url, on_wait=on_wait)
+
+    def _host_slot(self, url: str):
+        """Ocupa uma das conexões permitidas para o site da URL, aguardando se todas estiverem em uso."""
+        def on_wait(host, limit):
+            self.logger(f"Aguardando uma conexão livre para '{host}' ({limit} conexão(ões) simultânea(s) por site).", "info")
+        return self.host_limiter.slot(site_host(url), on_wait=on_wait)
+
+    def _use_segmented(self, segmented: bool | None, ydl_opts: dict) -> bool:
+        """O download segmentado vale para o job (ou, se não definido, para a configuração) e dispensa pós-processamento."""
+        if segmented is None: segmented = bool(self.config.get('prefer_aria2c', False))
+        return segmented and not ydl_opts.get('postprocessors')
+
+    def _download_segmented(self, ydl, url: str, info: dict, progress_hooks: list) -> dict:
+        """
+        Baixa pelo SegmentedDownloader quando o formato escolhido é um único arquivo HTTP(S);
+        nos demais casos (mesclagem, fragmentos, servidor sem Range), segue pelo yt-dlp, sem extrair de novo.
+        """
+        target = segmented_target(info)
+        if target is not None:
+            filename = ydl.prepare_filename(info)
+            # O download já ocupa uma vaga do site (_host_slot); cada conexão extra ocupa outra, se houver livre
+            host = site_host(url)
+            extra = self.host_limiter.try_acquire(host, self.segmented.connections - 1)
+            # A banda é limitada em cada conexão (throttle), e não pelo hook, chamado por uma conexão de cada vez
+            hooks = [hook for hook in progress_hooks if hook != self.bandwidth.observe]
+            try:
+                self.segmented.download(target['url'], filename, headers=target['http_headers'], progress_hooks=hooks,
+                                        info_dict=info, connections=1 + extra, throttle=self.bandwidth.consume)
+                info['requested_downloads'] = [dict(target, filepath=filename)]; info['filepath'] = filename
+                return info
+            except RangeNotSupportedError as e:
+                self.logger(f"Download segmentado indisponível para '{url}' ({e}); usando o download padrão.", "info")
+            finally:
+                self.host_limiter.release(host, extra)
+        return ydl.process_ie_result(info, download=True)
+
+    def _download_single(self, url: str, ydl_opts: dict, history_in_background: bool = False, segmented: bool | None = None) -> dict:
+        # A vaga do site vem antes da reserva de disco: um download aguardando não retém espaço.
+        # A reserva é feita depois da extração, com os formatos escolhidos (e os seus tamanhos) já conhecidos.
+        with self._host_slot(url), _yt_dlp().YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            # Se o download falhar, os streams que não receberam 'finished' deixam de constar como ativos nas métricas
+            with self._admit(url, ydl_opts, info) as reservation, self.metrics.transfer_group() as transfers:
+                for hook in (reservation.record_progress, transfers.observe): ydl.add_progress_hook(hook)
+                hooks = [*ydl_opts.get('progress_hooks', []), reservation.record_progress, transfers.observe]
+                if self._use_segmented(segmented, ydl_opts): info = self._download_segmented(ydl, url, info, hooks)
+                else: info = ydl.process_ie_result(info, download=True)
+        if info:
+            if self._use_archive(): self.archive.add(info)
+            self._record_history(info, url, in_background=history_in_background); self.stats_manager.increment_download_count()
+        return info
+
+    def _download_playlist(self, url: str, ydl_opts: dict, progress_callback=None, job_id: int | None = None,
+                           segmented: bool | None = None) -> PlaylistProgress:
+        """
+        Baixa uma playlist distribuindo as entradas entre um pool de threads.
+
+        A lista de entradas é obtida com uma extração "flat" e cada entrada é baixada
+        individualmente, sendo registrada no histórico assim que termina.
+
+        Args:
+            url (str): A URL da playlist.
+            ydl_opts (dict): As opções do yt-dlp já configuradas com o formato desejado.
+            progress_callback (callable | None): Chamada com o progresso agregado (dict) a cada entrada concluída.
+            job_id (int | None): O job do diário; entradas já concluídas nele (numa execução anterior) são ignoradas.
+            segmented (bool | None): Se as entradas usam o download segmentado (None segue a configuração).
+
+        Returns:
+            PlaylistProgress: O progresso final da playlist.
+        """
+        if self._use_archive() and media_key(url, playlist=True) == media_key(url) and self.archive.contains_url(url):
+            # Vídeo avulso (sem playlist na URL) já baixado: nem a listagem é necessária
+            self.logger("Este vídeo já consta no arquivo de downloads; download ignorado.", "info")
+            progress = PlaylistProgress(url, 1); progress.skipped = 1
+            if progress_callback: progress_callback(progress.as_dict())
+            return progress
+        playlist = self._flat_extract(url)
+        if playlist.get('_type') != 'playlist':
+            # A URL não é uma playlist: baixa como um vídeo único
+            info = self._download_single(url, dict(ydl_opts, noplaylist=True, ignoreerrors=False), segmented=segmented)
+            progress = PlaylistProgress(info.get('title', url) if info else url, 1); snapshot = progress.record(bool(info), self._entry_size(info or {}))
+            if progress_callback: progress_callback(snapshot)
+            return progress
+
+        # Deduplica pela chave canônica: a mesma mídia pode aparecer mais de uma vez na playlist
+        keyed_entries = {cache_key(self._entry_url(entry)): entry for entry in (playlist.get('entries') or []) if entry and self._entry_url(entry)}
+        entries = list(keyed_entries.values())
+        progress = PlaylistProgress(playlist.get('title', url), len(entries))
+        if not entries: raise DownloaderError("Nenhum vídeo disponível nesta playlist foi encontrado.")
+        if job_id is not None:
+            # Retomada: entradas concluídas antes de a aplicação ser fechada não são baixadas de novo
+            done_keys = self.journal.completed_entries(job_id)
+            if done_keys:
+                entries = [entry for key, entry in keyed_entries.items() if key not in done_keys]
+                progress.skipped = len(keyed_entries) - len(entries)
+                self.logger(f"Playlist '{progress.title}': retomando, {progress.skipped} vídeo(s) já concluído(s) anteriormente.", "info")
+        if self._use_archive():
+            # Entradas já baixadas são ignoradas antes de qualquer extração
+            pending = [entry for entry in entries if not self.archive.contains_entry(entry)]
+            archived = len(entries) - len(pending); progress.skipped += archived; entries = pending
+            if archived: self.logger(f"Playlist '{progress.title}': {archived} vídeo(s) já constam no arquivo de downloads e foram ignorados.", "info")
+        if progress.skipped and progress_callback: progress_callback(progress.as_dict())
+        entry_opts = dict(ydl_opts, noplaylist=True, ignoreerrors=False)
+        max_workers = max(1, int(self.config.get('max_concurrent_downloads', 2)))
+        self.logger(f"Playlist '{progress.title}': {len(entries)} vídeo(s) a baixar, até {max_workers} em paralelo.", "info")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="playlist-entry") as pool:
+            futures = {pool.submit(self._download_single, self._entry_url(entry), entry_opts, True, segmented): entry for entry in entries}
+            for future in as_completed(futures):
+                entry = futures[future]
+                try:
+                    info = future.result(); snapshot = progress.record(bool(info), self._entry_size(info or {}))
+                    if info and job_id is not None:
+                        # O histórico é gravado antes: uma entrada marcada como concluída no job não é baixada de novo ao retomar
+                        self.history_manager.flush(); self.journal.mark_entry_completed(job_id, cache_key(self._entry_url(entry)), self._output_path(info))
+                except Exception as e:
+                    snapshot = progress.record(False)
+                    self.logger(f"Falha ao baixar '{entry.get('title') or entry.get('url')}': {e}", "warning")
+                self.logger(f"Playlist: {snapshot['finished']}/{snapshot['total']} processado(s) ({snapshot['failed']} falha(s)).", "info")
+                if progress_callback: progress_callback(snapshot)
+
+        self.history_manager.flush()
+        if progress.completed == 0 and progress.failed > 0: raise DownloaderError(f"Nenhum vídeo da playlist '{progress.title}' pôde ser baixado.")
+        return progress
+
+    @staticmethod
+    def _output_path(info: dict) -> str | None:
+        downloads = info.get('requested_downloads') or [{}]
+        return downloads[0].get('filepath') or info.get('filepath') or info.get('_filename')
+
+    def _run_download(self, url: str, ydl_opts: dict, download_playlist: bool, progress_callback=None, job_id=None, segmented=None):
+        """Executa o download. Retorna None se o vídeo já constava no arquivo de downloads."""
+        if download_playlist: return self._download_playlist(url, ydl_opts, progress_callback, job_id, segmented)
+        if self._use_archive() and self.archive.contains_url(url):
+            self.logger("Este vídeo já consta no arquivo de downloads; download ignorado.", "info"); return None
+        return self._download_single(url, ydl_opts, segmented=segmented)
+
+    def download(self, url: str, format_code: str, download_playlist: bool = False, progress_callback=None, progress_hook=None, job_id=None, segmented=None):
         self._validate_prerequisites(url)
         self.logger(f"Iniciando download para: {url} | Formato: '{format_code}' | Playlist: {'Sim' if download_playlist else 'Não'}", "info")
         if not format_code: raise FormatSelectionError("Nenhum formato de download foi selecionado.")
-        ydl_opts = self._get_base_ydl_opts(download_playlist=download_playlist); ydl_opts['format'] = format_code
+        ydl_opts = self._get_base_ydl_opts(download_playlist=download_playlist, progress_hook=progress_hook, job_id=job_id); ydl_opts['format'] = format_code
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl: info = ydl.extract_info(url, download=True)
-            entry_list = info.get('entries') if download_playlist else [info]
-            for entry in entry_list:
-                if entry: self.history_manager.add_entry(title=entry.get('title', 'Título desconhecido'), url=entry.get('webpage_url', url), size_bytes=entry.get('filesize', 0) or entry.get('filesize_approx', 0))
-            self.logger("Download salvo no histórico com sucesso.", "info")
-        except yt_dlp.utils.DownloadError as e:
+            result = self._run_download(url, ydl_opts, download_playlist, progress_callback, job_id, segmented)
+            if result is not None: self.logger("Download salvo no histórico com sucesso.", "info")
+            return result
+        except DownloaderError: raise
+        except _yt_dlp().utils.DownloadError as e:
             error_message = str(e).lower()
             if "unsupported url" in error_message or "invalid url" in error_message: raise InvalidURLError(f"A URL fornecida não é suportada ou é inválida: {url}")
             if "name or service not known" in error_message or "no route to host" in error_message: raise NetworkError("Erro de rede. Verifique sua conexão com a internet.")
@@ -83,20 +388,19 @@ class Downloader:
         except Exception as e:
             self.logger(f"Erro inesperado capturado: {e}", "critical"); raise DownloaderError(f"Um erro inesperado ocorreu: {e}")
 
-    def download_audio(self, url: str, audio_format: str, download_playlist: bool = False):
+    def download_audio(self, url: str, audio_format: str, download_playlist: bool = False, progress_callback=None, progress_hook=None, job_id=None, segmented=None):
         self._validate_prerequisites(url)
         self.logger(f"Iniciando download de áudio para: {url} | Formato: {audio_format} | Playlist: {'Sim' if download_playlist else 'Não'}", "info")
-        ydl_opts = self._get_base_ydl_opts(download_playlist=download_playlist)
+        ydl_opts = self._get_base_ydl_opts(download_playlist=download_playlist, progress_hook=progress_hook, job_id=job_id)
         if audio_format == 'flac':
             ydl_opts['format'] = 'bestaudio/best'
             ydl_opts['postprocessors'] = [{'key': 'FFmpegExtractAudio', 'preferredcodec': 'flac'}]
         else:
             ydl_opts['format'] = audio_format
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl: info = ydl.extract_info(url, download=True)
-            entry_list = info.get('entries') if download_playlist else [info]
-            for entry in entry_list:
-                if entry: self.history_manager.add_entry(title=entry.get('title', 'Título desconhecido'), url=entry.get('webpage_url', url), size_bytes=entry.get('filesize', 0) or entry.get('filesize_approx', 0))
-            self.logger("Download de áudio salvo no histórico com sucesso.", "info")
-        except yt_dlp.utils.DownloadError as e: raise DownloaderError(f"Ocorreu um erro durante o download do áudio: {e}")
+            result = self._run_download(url, ydl_opts, download_playlist, progress_callback, job_id, segmented)
+            if result is not None: self.logger("Download de áudio salvo no histórico com sucesso.", "info")
+            return result
+        except DownloaderError: raise
+        except _yt_dlp().utils.DownloadError as e: raise DownloaderError(f"Ocorreu um erro durante o download do áudio: {e}")
         except Exception as e: self.logger(f"Erro inesperado capturado: {e}", "critical"); raise DownloaderError(f"Um erro inesperado ocorreu: {e}")
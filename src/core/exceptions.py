@@ -30,3 +30,11 @@ class FormatSelectionError(DownloaderError):
 class FileSystemError(DownloaderError):
     """Lançada para erros relacionados ao sistema de arquivos (ex: permissão negada, disco cheio)."""
     pass
+
+class ConfigError(SuperDownloaderException):
+    """Lançada quando um valor de configuração é inválido."""
+    pass
+
+class RangeNotSupportedError(DownloaderError):
+    """Lançada quando o servidor não aceita requisições parciais (Range), necessárias ao download segmentado."""
+    pass
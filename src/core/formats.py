@@ -0,0 +1,168 @@
+# src/core/formats.py
+
+"""
+Módulo de seleção de formatos.
+
+Constrói, uma única vez por vídeo, um índice compacto e ordenado dos formatos
+de vídeo e de áudio (`build_format_index`), que é gravado junto com a entrada
+do cache (ver `cache.project_info`). A partir do índice, uma `FormatPolicy`
+(resolução máxima, codecs e contêineres preferidos) define as opções exibidas
+e o formato escolhido por padrão, sem depender da interface gráfica, de modo que
+o mesmo código serve à GUI, ao agendador e à linha de comando.
+"""
+
+FORMAT_INDEX_VERSION = 1
+FLAC_OPTION_ID = 'flac'
+
+# Prefixos do `vcodec`/`acodec` do yt-dlp -> família do codec
+CODEC_FAMILIES = (
+    ('avc1', 'h264'), ('avc3', 'h264'), ('h264', 'h264'),
+    ('hev1', 'h265'), ('hvc1', 'h265'), ('h265', 'h265'),
+    ('vp09', 'vp9'), ('vp9', 'vp9'), ('av01', 'av1'),
+    ('mp4a', 'aac'), ('aac', 'aac'), ('opus', 'opus'), ('vorbis', 'vorbis'),
+    ('mp3', 'mp3'), ('flac', 'flac'),
+)
+
+def codec_family(codec: str | None) -> str | None:
+    """Normaliza um codec do yt-dlp (ex: 'avc1.64001F') para a sua família (ex: 'h264')."""
+    if not codec or codec == 'none':
+        return None
+    codec = codec.lower()
+    for prefix, family in CODEC_FAMILIES:
+        if codec.startswith(prefix):
+            return family
+    return codec.split('.')[0]
+
+def format_bytes(size_bytes) -> str:
+    """Formata um tamanho em bytes para exibição (ex: '1.50 MB')."""
+    if not size_bytes: return "N/A"
+    power = 1024; n = 0; power_labels = {0: '', 1: 'KB', 2: 'MB', 3: 'GB', 4: 'TB'}
+    while size_bytes >= power and n < len(power_labels) - 1: size_bytes /= power; n += 1
+    return f"{size_bytes:.2f} {power_labels[n]}"
+
+def build_format_index(info: dict) -> dict:
+    """
+    Constrói o índice de formatos de um vídeo.
+
+    Inclui apenas streams separados (vídeo sem áudio e áudio sem vídeo), que são os
+    combinados pelo download. Para cada altura e codec de vídeo é mantido apenas o
+    maior arquivo (a melhor taxa de bits).
+
+    Returns:
+        dict: {'version', 'video': [...], 'audio': [...]}, com o vídeo ordenado pela altura
+        (decrescente) e o áudio pela taxa de bits (decrescente).
+    """
+    best_videos = {}
+    audio = []
+    for f in info.get('formats') or []:
+        if not f or not f.get('format_id'):
+            continue
+        vcodec, acodec = codec_family(f.get('vcodec')), codec_family(f.get('acodec'))
+        size = f.get('filesize') or f.get('filesize_approx')
+        if vcodec and not acodec and f.get('height'):
+            entry = {'id': f['format_id'], 'height': f['height'], 'fps': f.get('fps'), 'ext': f.get('ext'),
+                     'codec': vcodec, 'size': size, 'tbr': f.get('tbr')}
+            key = (entry['height'], vcodec)
+            current = best_videos.get(key)
+            if current is None or (size or 0) > (current['size'] or 0):
+                best_videos[key] = entry
+        elif acodec and not vcodec:
+            audio.append({'id': f['format_id'], 'abr': f.get('abr'), 'ext': f.get('ext'), 'codec': acodec, 'size': size})
+    video = sorted(best_videos.values(), key=lambda entry: (entry['height'], entry['size'] or 0), reverse=True)
+    audio.sort(key=lambda entry: (entry['abr'] or 0), reverse=True)
+    return {'version': FORMAT_INDEX_VERSION, 'video': video, 'audio': audio}
+
+def get_format_index(info: dict) -> dict:
+    """Retorna o índice gravado no cache, ou o constrói (e guarda no próprio dicionário) se ele não existir."""
+    index = info.get('format_index')
+    if not index or index.get('version') != FORMAT_INDEX_VERSION:
+        index = info['format_index'] = build_format_index(info)
+    return index
+
+class FormatPolicy:
+    """Critérios de escolha de formatos."""
+
+    def __init__(self, max_resolution: int | None = None, video_codecs: tuple = ('h264',),
+                 audio_codecs: tuple = ('aac',), audio_exts: tuple = ('m4a',)):
+        """
+        Inicializa a FormatPolicy.
+
+        Args:
+            max_resolution (int | None): Altura máxima escolhida por padrão (ex: 1080). None para sem limite.
+            video_codecs (tuple): Famílias de codec de vídeo aceitas, em ordem de preferência.
+                Vazio aceita todas. O padrão (h264) mantém a mesclagem em mp4 compatível.
+            audio_codecs (tuple): Famílias de codec de áudio aceitas, em ordem de preferência. Vazio aceita todas.
+            audio_exts (tuple): Contêineres de áudio aceitos. Vazio aceita todos.
+        """
+        self.max_resolution = max_resolution
+        self.video_codecs = tuple(video_codecs)
+        self.audio_codecs = tuple(audio_codecs)
+        self.audio_exts = tuple(audio_exts)
+
+    @classmethod
+    def from_config(cls, config) -> 'FormatPolicy':
+        """Cria a política a partir da configuração (`max_resolution`)."""
+        try:
+            max_resolution = int(str(config.get('max_resolution') or '').rstrip('pP'))
+        except ValueError:
+            max_resolution = None
+        return cls(max_resolution=max_resolution or None)
+
+    def _rank(self, codec: str, preferences: tuple) -> int:
+        return preferences.index(codec) if codec in preferences else len(preferences)
+
+    def video_options(self, index: dict) -> list:
+        """
+        Retorna as opções de vídeo aceitas pela política: uma por altura (o codec mais
+        preferido), da maior para a menor, cada uma com um rótulo para exibição.
+        """
+        by_height = {}
+        for entry in index['video']:
+            if self.video_codecs and entry['codec'] not in self.video_codecs:
+                continue
+            current = by_height.get(entry['height'])
+            if current is None or self._rank(entry['codec'], self.video_codecs) < self._rank(current['codec'], self.video_codecs):
+                by_height[entry['height']] = entry
+        options = []
+        for height in sorted(by_height, reverse=True):
+            entry = by_height[height]
+            fps_str = f"({entry['fps']}fps) " if entry.get('fps') else ""
+            options.append(dict(entry, label=f"{height}p {fps_str}- {entry['ext']} [{format_bytes(entry['size'])}]"))
+        return options
+
+    def audio_options(self, index: dict, include_flac: bool = True) -> list:
+        """Retorna as opções de áudio aceitas pela política (a opção FLAC, convertida, primeiro)."""
+        options = [{'id': FLAC_OPTION_ID, 'label': "FLAC (Melhor Qualidade)"}] if include_flac else []
+        accepted = [entry for entry in index['audio']
+                    if (not self.audio_codecs or entry['codec'] in self.audio_codecs)
+                    and (not self.audio_exts or entry['ext'] in self.audio_exts)]
+        accepted.sort(key=lambda entry: (self._rank(entry['codec'], self.audio_codecs), -(entry['abr'] or 0)))
+        for entry in accepted:
+            size = format_bytes(entry['size'])
+            label = f"{round(entry['abr'])}kbps - {entry['ext']} [{size}]" if entry.get('abr') else f"{entry['ext']} [{size}]"
+            options.append(dict(entry, label=label))
+        return options
+
+    def default_video_index(self, options: list) -> int:
+        """Posição da opção escolhida por padrão: a maior resolução que não excede `max_resolution`."""
+        if not options: return -1
+        if self.max_resolution:
+            for position, option in enumerate(options):
+                if option['height'] <= self.max_resolution: return position
+            return len(options) - 1
+        return 0
+
+    def select(self, info: dict) -> dict:
+        """
+        Escolhe os formatos de um vídeo segundo a política.
+
+        Returns:
+            dict: {'video': opção | None, 'audio': opção | None, 'format_code': 'video+audio' | None}.
+        """
+        index = get_format_index(info)
+        videos = self.video_options(index)
+        audios = self.audio_options(index, include_flac=False)
+        video = videos[self.default_video_index(videos)] if videos else None
+        audio = audios[0] if audios else None
+        format_code = f"{video['id']}+{audio['id']}" if video and audio else None
+        return {'video': video, 'audio': audio, 'format_code': format_code}
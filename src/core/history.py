@@ -5,33 +5,131 @@ Módulo para gerenciamento do histórico de downloads.
 
 Usa o mesmo banco de dados SQLite do cache para manter um registro
 persistente de todos os downloads concluídos com sucesso.
+
+Registros vindos de threads de trabalho (ex: entradas de uma playlist) podem ser
+enfileirados com `add_entry_async`; um HistoryWriter em segundo plano os grava
+em lote, numa única transação por lote.
+
+A busca (`search`) usa um índice FTS5 sobre título, URL e canal, mantido em
+sincronia com a tabela por triggers; filtros de data e tamanho usam índices comuns.
 """
 
-import sqlite3
+import atexit
 import json
 import datetime
 import os
-from .config import load_config
+import queue
+import re
+import sqlite3
+import threading
+import time
+from .config import get_config
+from .storage import get_database
+from .urls import cache_key
+
+# Espera antes da nova tentativa de um lote que falhou (ex: banco bloqueado por outro processo)
+WRITE_RETRY_DELAY = 1.0
+
+class HistoryWriter:
+    """Fila de escrita em segundo plano (write-behind) que grava o histórico em lotes."""
+
+    def __init__(self, history_manager: 'HistoryManager', batch_size: int = 500, retry_delay: float = WRITE_RETRY_DELAY):
+        """
+        Inicializa o HistoryWriter e inicia a sua thread.
+
+        Args:
+            history_manager (HistoryManager): O gerenciador usado para gravar os lotes.
+            batch_size (int): Número máximo de registros gravados por transação.
+            retry_delay (float): Espera, em segundos, antes de tentar de novo um lote que falhou.
+        """
+        self.history_manager = history_manager
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: dict):
+        """Enfileira um registro (dict com 'title', 'url' e 'size_bytes')."""
+        self._queue.put(entry)
+
+    def flush(self):
+        """Bloqueia até que todos os registros enfileirados tenham sido gravados."""
+        self._queue.join()
+
+    def close(self):
+        """Grava os registros pendentes e encerra a thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            # Agrupa tudo o que já estiver na fila, sem esperar por novos registros
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [entry for entry in batch if entry is not None]
+            try:
+                if entries:
+                    self._write(entries)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(entries) < len(batch):
+                return
+
+    def _write(self, entries: list):
+        """
+        Grava um lote. Se a transação falhar, tenta de novo uma vez após `retry_delay`; se falhar
+        outra vez, grava registro a registro, para que uma entrada problemática não descarte o lote.
+        """
+        log = self.history_manager.logger
+        for attempt in range(2):
+            try:
+                self.history_manager.add_entries(entries)
+                return
+            except Exception as e:
+                error = e
+                if attempt == 0:
+                    log(f"Erro ao gravar {len(entries)} registro(s) no histórico de downloads: {e}. Tentando novamente...", "warning")
+                    time.sleep(self.retry_delay)
+        lost = 0
+        for entry in entries:
+            try:
+                self.history_manager.add_entry(entry['title'], entry['url'], entry.get('size_bytes') or 0, entry.get('uploader') or '')
+            except Exception as e:
+                lost += 1; error = e
+                log(f"Não foi possível gravar '{entry.get('title') or entry.get('url')}' no histórico de downloads: {e}", "error")
+        if lost:
+            log(f"{lost} de {len(entries)} registro(s) não foram gravados no histórico de downloads (último erro: {error}).", "error")
 
 class HistoryManager:
     """Gerencia o armazenamento e recuperação do histórico de downloads."""
 
-    def __init__(self):
-        """Inicializa o HistoryManager."""
-        config = load_config()
+    def __init__(self, logger_callback=print):
+        """
+        Inicializa o HistoryManager.
+
+        Args:
+            logger_callback (callable): Recebe `(mensagem, nível)` dos erros da gravação em segundo plano.
+        """
+        self.logger = logger_callback
+        config = get_config()
         db_folder = config.get('download_path', 'downloads')
         os.makedirs(db_folder, exist_ok=True)
         
         self.db_path = os.path.join(db_folder, 'cache.db') # Usando o mesmo DB do cache
+        self._db = get_database(self.db_path)
+        self._writer = None
+        self._writer_lock = threading.Lock()
         self._create_table()
 
-    def _get_connection(self):
-        """Retorna uma conexão com o banco de dados SQLite."""
-        return sqlite3.connect(self.db_path)
-
     def _create_table(self):
         """Cria a tabela de histórico se ela não existir."""
-        with self._get_connection() as conn:
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS download_history (
@@ -43,9 +141,63 @@ class HistoryManager:
                     status TEXT NOT NULL DEFAULT 'Completed'
                 )
             """)
-            conn.commit()
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(download_history)")}
+            if 'media_key' not in columns:
+                # Chave canônica da URL (ver urls.cache_key), usada para deduplicação
+                cursor.execute("ALTER TABLE download_history ADD COLUMN media_key TEXT")
+                rows = cursor.execute("SELECT id, url FROM download_history").fetchall()
+                cursor.executemany("UPDATE download_history SET media_key = ? WHERE id = ?",
+                                   [(cache_key(url), row_id) for row_id, url in rows])
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_download_history_media_key ON download_history (media_key)")
+            if 'uploader' not in columns:
+                cursor.execute("ALTER TABLE download_history ADD COLUMN uploader TEXT NOT NULL DEFAULT ''")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_download_history_date ON download_history (download_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_download_history_size ON download_history (size_bytes)")
+            self.fts_enabled = self._create_search_index(cursor)
+
+    def _create_search_index(self, cursor) -> bool:
+        """
+        Cria o índice FTS5 (tabela de conteúdo externo + triggers) se necessário.
 
-    def add_entry(self, title: str, url: str, size_bytes: int):
+        Returns:
+            bool: False se o SQLite disponível não tiver suporte a FTS5.
+        """
+        exists = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'download_history_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE download_history_fts USING fts5(
+                    title, url, uploader,
+                    content='download_history', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return False
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS download_history_fts_insert AFTER INSERT ON download_history BEGIN
+                INSERT INTO download_history_fts (rowid, title, url, uploader) VALUES (new.id, new.title, new.url, new.uploader);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS download_history_fts_delete AFTER DELETE ON download_history BEGIN
+                INSERT INTO download_history_fts (download_history_fts, rowid, title, url, uploader)
+                VALUES ('delete', old.id, old.title, old.url, old.uploader);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS download_history_fts_update AFTER UPDATE OF title, url, uploader ON download_history BEGIN
+                INSERT INTO download_history_fts (download_history_fts, rowid, title, url, uploader)
+                VALUES ('delete', old.id, old.title, old.url, old.uploader);
+                INSERT INTO download_history_fts (rowid, title, url, uploader) VALUES (new.id, new.title, new.url, new.uploader);
+            END
+        """)
+        # Indexa os registros que já existiam antes da criação do índice
+        cursor.execute("INSERT INTO download_history_fts (download_history_fts) VALUES ('rebuild')")
+        return True
+
+    def add_entry(self, title: str, url: str, size_bytes: int, uploader: str = ''):
         """
         Adiciona uma nova entrada ao histórico de downloads.
 
@@ -53,15 +205,72 @@ class HistoryManager:
             title (str): O título do vídeo.
             url (str): A URL original do vídeo.
             size_bytes (int): O tamanho do arquivo baixado em bytes.
+            uploader (str): O canal/autor do vídeo.
         """
         download_date = datetime.datetime.now().isoformat()
-        with self._get_connection() as conn:
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                "INSERT INTO download_history (title, url, download_date, size_bytes) VALUES (?, ?, ?, ?)",
-                (title, url, download_date, size_bytes)
+                "INSERT INTO download_history (title, url, download_date, size_bytes, media_key, uploader) VALUES (?, ?, ?, ?, ?, ?)",
+                (title, url, download_date, size_bytes, cache_key(url), uploader or '')
+            )
+
+    def add_entries(self, entries: list):
+        """
+        Adiciona vários registros ao histórico numa única transação.
+
+        Args:
+            entries (list): Lista de dicts com as chaves 'title', 'url', 'size_bytes' e,
+                opcionalmente, 'uploader'.
+        """
+        download_date = datetime.datetime.now().isoformat()
+        rows = [(entry['title'], entry['url'], download_date, entry.get('size_bytes') or 0, cache_key(entry['url']), entry.get('uploader') or '')
+                for entry in entries]
+        with self._db.write() as conn:
+            conn.executemany(
+                "INSERT INTO download_history (title, url, download_date, size_bytes, media_key, uploader) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
             )
-            conn.commit()
+
+    def add_entry_async(self, title: str, url: str, size_bytes: int, uploader: str = ''):
+        """
+        Enfileira um registro para gravação em segundo plano (ver HistoryWriter).
+        Use `flush()` para garantir que ele já foi gravado.
+        """
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = HistoryWriter(self)
+                # A thread de escrita é daemon: sem isto, os registros ainda na fila se perderiam ao fechar a aplicação
+                atexit.register(self.close)
+        self._writer.submit({'title': title, 'url': url, 'size_bytes': size_bytes, 'uploader': uploader})
+
+    def flush(self):
+        """Aguarda a gravação de todos os registros enfileirados com `add_entry_async`."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        """Grava os registros enfileirados e encerra a thread de escrita (recriada se houver novos registros)."""
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+
+    def has_entry(self, url: str) -> bool:
+        """
+        Verifica se a mídia apontada pela URL já está no histórico, independentemente
+        da variação de URL usada (ex: `youtu.be/ID` e `youtube.com/watch?v=ID`).
+
+        Args:
+            url (str): A URL do vídeo.
+
+        Returns:
+            bool: True se já existe um registro para a mesma mídia.
+        """
+        with self._db.read() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM download_history WHERE media_key = ? LIMIT 1", (cache_key(url),))
+            return cursor.fetchone() is not None
 
     def get_all_entries(self) -> list:
         """
@@ -70,14 +279,108 @@ class HistoryManager:
         Returns:
             list: Uma lista de tuplas, onde cada tupla representa um registro.
         """
-        with self._get_connection() as conn:
+        with self._db.read() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT title, url, download_date, size_bytes, status FROM download_history ORDER BY download_date DESC")
+            cursor.execute("SELECT title, url, download_date, size_bytes, status FROM download_history ORDER BY id DESC")
             return cursor.fetchall()
 
+    def get_page(self, limit: int = 200, before_id: int | None = None) -> list:
+        """
+        Recupera uma página do histórico, da entrada mais recente para a mais antiga.
+
+        Usa paginação por cursor (keyset) sobre a chave primária: como os registros são
+        inseridos em ordem cronológica, `id` decrescente equivale a `download_date`
+        decrescente, e cada página custa O(log n) independentemente da posição.
+
+        Args:
+            limit (int): Número máximo de registros na página.
+            before_id (int | None): O `id` do último registro da página anterior.
+                Se omitido, retorna a primeira página.
+
+        Returns:
+            list: Tuplas (id, title, url, download_date, size_bytes, status).
+        """
+        query = "SELECT id, title, url, download_date, size_bytes, status FROM download_history"
+        params = []
+        if before_id is not None:
+            query += " WHERE id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._db.read() as conn:
+            return conn.execute(query, params).fetchall()
+
+    def get_entries_since(self, last_id: int, limit: int | None = None) -> list:
+        """
+        Recupera os registros adicionados depois do registro `last_id` (mais recentes primeiro).
+
+        Args:
+            last_id (int): O id do registro mais recente já conhecido.
+            limit (int | None): Número máximo de registros retornados (os mais recentes).
+
+        Returns:
+            list: Tuplas no mesmo formato de `get_page`.
+        """
+        query = "SELECT id, title, url, download_date, size_bytes, status FROM download_history WHERE id > ? ORDER BY id DESC"
+        params = [last_id]
+        if limit is not None:
+            query += " LIMIT ?"; params.append(int(limit))
+        with self._db.read() as conn:
+            return conn.execute(query, params).fetchall()
+
+    @staticmethod
+    def _build_match_query(query: str) -> str:
+        """Converte o texto digitado numa expressão FTS5 (todos os termos, como prefixo)."""
+        terms = re.findall(r'\w+', query, flags=re.UNICODE)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, query: str = '', limit: int = 50, offset: int = 0,
+               date_from: datetime.datetime | None = None, date_to: datetime.datetime | None = None,
+               min_size: int | None = None, max_size: int | None = None) -> list:
+        """
+        Busca no histórico por título, URL ou canal, com filtros opcionais de data e tamanho.
+
+        Cada termo do texto é tratado como prefixo, o que permite buscar enquanto se digita.
+
+        Args:
+            query (str): O texto buscado. Vazio retorna todos os registros (respeitando os filtros).
+            limit (int): Número máximo de resultados.
+            offset (int): Número de resultados a pular (paginação).
+            date_from (datetime | None): Data mínima do download.
+            date_to (datetime | None): Data máxima do download.
+            min_size (int | None): Tamanho mínimo, em bytes.
+            max_size (int | None): Tamanho máximo, em bytes.
+
+        Returns:
+            list: Tuplas no mesmo formato de `get_page`, das mais relevantes/recentes para as demais.
+        """
+        columns = "h.id, h.title, h.url, h.download_date, h.size_bytes, h.status"
+        conditions, params = [], []
+        match_query = self._build_match_query(query or '')
+        if match_query and self.fts_enabled:
+            sql = f"SELECT {columns} FROM download_history_fts f JOIN download_history h ON h.id = f.rowid"
+            conditions.append("download_history_fts MATCH ?"); params.append(match_query)
+            order = "ORDER BY f.rank, h.id DESC"
+        else:
+            sql = f"SELECT {columns} FROM download_history h"
+            order = "ORDER BY h.id DESC"
+            if match_query:
+                # Sem FTS5: busca por substring, mais lenta, mas equivalente para o usuário
+                for term in re.findall(r'\w+', query, flags=re.UNICODE):
+                    conditions.append("(h.title LIKE ? OR h.url LIKE ? OR h.uploader LIKE ?)"); params += [f"%{term}%"] * 3
+        if date_from is not None: conditions.append("h.download_date >= ?"); params.append(date_from.isoformat())
+        if date_to is not None: conditions.append("h.download_date <= ?"); params.append(date_to.isoformat())
+        if min_size is not None: conditions.append("h.size_bytes >= ?"); params.append(min_size)
+        if max_size is not None: conditions.append("h.size_bytes <= ?"); params.append(max_size)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" {order} LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with self._db.read() as conn:
+            return conn.execute(sql, params).fetchall()
+
     def clear_history(self):
         """Limpa todos os registros da tabela de histórico."""
-        with self._get_connection() as conn:
+        with self._db.write() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM download_history")
-            conn.commit()
@@ -0,0 +1,307 @@
+# src/core/jobs.py
+
+"""
+Módulo do diário (journal) persistente de jobs de download.
+
+Cada job submetido ao agendador é gravado na tabela `download_jobs` do banco de
+dados do cache, com o seu estado (queued/running/completed/skipped/failed/cancelled),
+o arquivo de saída e o arquivo parcial (`.part`) em andamento. Em playlists, as
+entradas já concluídas são registradas em `download_job_entries`.
+
+Se a aplicação for fechada (ou travar) com downloads pendentes, os jobs que não
+chegaram a um estado final são retomados na próxima inicialização: as entradas
+de playlist já concluídas são ignoradas e os arquivos `.part` são continuados
+pelo yt-dlp (`continuedl`), ou a partir do mapa de segmentos no download
+segmentado, em vez de recomeçar do zero.
+
+Vários processos podem compartilhar o mesmo banco (a interface gráfica e a CLI,
+por exemplo). Por isso cada job registra o seu dono (host, pid e um token da
+instância do diário) e um lease renovado periodicamente enquanto o dono estiver
+vivo: só são retomados os jobs cujo dono terminou ou cujo lease expirou. Um job
+que já foi iniciado `max_attempts` vezes (por exemplo, um que derruba a
+aplicação) é marcado como falho em vez de ser retomado outra vez.
+"""
+
+import datetime
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from .segmented import partial_bytes
+from .storage import get_database
+
+# Estados gravados no diário (os mesmos de scheduler.JobStatus)
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_SKIPPED = 'skipped'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+UNFINISHED_STATES = (STATUS_QUEUED, STATUS_RUNNING)
+
+PROGRESS_WRITE_INTERVAL = 2.0  # segundos entre gravações do progresso de um mesmo job
+LEASE_SECONDS = 60.0  # validade do lease de um job sem renovação pelo seu dono
+HEARTBEAT_INTERVAL = LEASE_SECONDS / 3
+
+def _process_alive(pid: int) -> bool:
+    """Indica se o processo `pid` (deste host) ainda existe. Na dúvida, considera que sim."""
+    if os.name == 'nt':
+        return True  # No Windows, os.kill encerraria o processo; vale apenas o lease
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+class JobJournal:
+    """Diário de jobs em SQLite, thread-safe."""
+
+    def __init__(self, db_path: str, retention_days: int = 30):
+        """
+        Inicializa o JobJournal.
+
+        Args:
+            db_path (str): O banco de dados SQLite (o mesmo do cache).
+            retention_days (int): Jobs finalizados há mais tempo que isso são removidos na inicialização.
+        """
+        self._db = get_database(db_path)
+        self._last_progress_write = {}
+        self._lock = threading.Lock()
+        self.host = socket.gethostname()
+        self.pid = os.getpid()
+        self.owner = f"{self.host}:{self.pid}:{uuid.uuid4().hex[:12]}"
+        self._heartbeat_thread = None
+        self._heartbeat_stop = threading.Event()
+        self._create_tables()
+        self.purge_finished(retention_days)
+
+    def _create_tables(self):
+        with self._db.write() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    format_code TEXT,
+                    download_playlist INTEGER NOT NULL DEFAULT 0,
+                    priority INTEGER NOT NULL DEFAULT 10,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    output_path TEXT,
+                    part_path TEXT,
+                    downloaded_bytes INTEGER NOT NULL DEFAULT 0,
+                    total_bytes INTEGER,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(download_jobs)")}
+            if 'segmented' not in columns:
+                # Escolha do download segmentado feita no job (NULL = segue a configuração)
+                conn.execute("ALTER TABLE download_jobs ADD COLUMN segmented INTEGER")
+            # Dono do job (ver o docstring do módulo); NULL nos jobs gravados por versões anteriores
+            for column, column_type in (('owner', 'TEXT'), ('owner_host', 'TEXT'), ('owner_pid', 'INTEGER'), ('lease_until', 'REAL')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE download_jobs ADD COLUMN {column} {column_type}")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_download_jobs_status ON download_jobs (status)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_job_entries (
+                    job_id INTEGER NOT NULL REFERENCES download_jobs (id) ON DELETE CASCADE,
+                    entry_key TEXT NOT NULL,
+                    output_path TEXT,
+                    completed_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, entry_key)
+                ) WITHOUT ROWID
+            """)
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat()
+
+    def _ensure_heartbeat(self):
+        """Inicia (uma única vez) a thread que renova o lease dos jobs desta instância."""
+        with self._lock:
+            if self._heartbeat_thread is not None:
+                return
+            self._heartbeat_thread = threading.Thread(target=self._heartbeat, name="job-journal-heartbeat", daemon=True)
+            self._heartbeat_thread.start()
+
+    def _heartbeat(self):
+        while not self._heartbeat_stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.renew_leases()
+            except sqlite3.Error as e:
+                print(f"Erro ao renovar o lease dos jobs: {e}")
+
+    def renew_leases(self) -> int:
+        """Renova o lease dos jobs não finalizados desta instância. Retorna o número de jobs renovados."""
+        with self._db.write() as conn:
+            cursor = conn.execute(
+                f"UPDATE download_jobs SET lease_until = ? WHERE owner = ? AND status IN ({','.join('?' * len(UNFINISHED_STATES))})",
+                (time.time() + LEASE_SECONDS, self.owner, *UNFINISHED_STATES)
+            )
+            return cursor.rowcount
+
+    def close(self):
+        """Interrompe a renovação dos leases; os jobs pendentes poderão ser retomados por outro processo quando expirarem."""
+        self._heartbeat_stop.set()
+
+    def create(self, kind: str, url: str, format_code: str, download_playlist: bool, priority: int,
+               segmented: bool | None = None) -> int:
+        """
+        Registra um novo job na fila.
+
+        Returns:
+            int: O identificador persistente do job.
+        """
+        now = self._now()
+        with self._db.write() as conn:
+            cursor = conn.execute(
+                "INSERT INTO download_jobs (kind, url, format_code, download_playlist, priority, segmented, status, created_at, updated_at, "
+                "owner, owner_host, owner_pid, lease_until) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, url, format_code, int(download_playlist), priority, None if segmented is None else int(segmented),
+                 STATUS_QUEUED, now, now, self.owner, self.host, self.pid, time.time() + LEASE_SECONDS)
+            )
+        self._ensure_heartbeat()
+        return cursor.lastrowid
+
+    def set_status(self, job_id: int, status: str, error: str | None = None):
+        """Atualiza o estado de um job. Ao iniciar, incrementa o número de tentativas."""
+        with self._db.write() as conn:
+            if status == STATUS_RUNNING:
+                conn.execute("UPDATE download_jobs SET status = ?, updated_at = ?, attempts = attempts + 1, error = NULL WHERE id = ?",
+                             (status, self._now(), job_id))
+            else:
+                conn.execute("UPDATE download_jobs SET status = ?, updated_at = ?, error = ? WHERE id = ?",
+                             (status, self._now(), error, job_id))
+        if status not in UNFINISHED_STATES:
+            with self._lock:
+                self._last_progress_write.pop(job_id, None)
+
+    def record_progress(self, job_id: int, d: dict):
+        """
+        Registra o estado do arquivo em andamento a partir de um evento do progress hook.
+
+        Os eventos 'downloading' são gravados no máximo a cada PROGRESS_WRITE_INTERVAL
+        segundos por job; 'finished' é sempre gravado.
+        """
+        status = d.get('status')
+        if status not in ('downloading', 'finished'):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if status == 'downloading' and now - self._last_progress_write.get(job_id, 0.0) < PROGRESS_WRITE_INTERVAL:
+                return
+            self._last_progress_write[job_id] = now
+        part_path = d.get('tmpfilename') if status == 'downloading' else None
+        with self._db.write() as conn:
+            conn.execute(
+                "UPDATE download_jobs SET output_path = ?, part_path = ?, downloaded_bytes = ?, total_bytes = ?, updated_at = ? WHERE id = ?",
+                (d.get('filename'), part_path, d.get('downloaded_bytes') or 0,
+                 d.get('total_bytes') or d.get('total_bytes_estimate'), self._now(), job_id)
+            )
+
+    def mark_entry_completed(self, job_id: int, entry_key: str, output_path: str | None = None):
+        """Registra uma entrada de playlist concluída dentro de um job."""
+        with self._db.write() as conn:
+            conn.execute("INSERT OR REPLACE INTO download_job_entries (job_id, entry_key, output_path, completed_at) VALUES (?, ?, ?, ?)",
+                         (job_id, entry_key, output_path, self._now()))
+
+    def completed_entries(self, job_id: int) -> set:
+        """Retorna as chaves (ver urls.cache_key) das entradas de playlist já concluídas no job."""
+        with self._db.read() as conn:
+            return {row[0] for row in conn.execute("SELECT entry_key FROM download_job_entries WHERE job_id = ?", (job_id,))}
+
+    def get(self, job_id: int) -> dict | None:
+        """Retorna o registro de um job."""
+        with self._db.read() as conn:
+            cursor = conn.execute("SELECT * FROM download_jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return dict(zip([column[0] for column in cursor.description], row)) if row else None
+
+    def unfinished(self) -> list:
+        """
+        Retorna os jobs que não chegaram a um estado final (na fila ou interrompidos
+        durante a execução), em ordem de prioridade e de criação.
+
+        Returns:
+            list: Lista de dicts; 'part_bytes' indica os bytes já baixados do arquivo parcial existente, se houver.
+        """
+        with self._db.read() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM download_jobs WHERE status IN ({','.join('?' * len(UNFINISHED_STATES))}) ORDER BY priority, id",
+                UNFINISHED_STATES
+            )
+            columns = [column[0] for column in cursor.description]
+            jobs = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for job in jobs:
+            part_path = job.get('part_path')
+            job['part_bytes'] = partial_bytes(part_path) if part_path else 0
+        return jobs
+
+    def _orphaned(self, job: dict, now: float) -> bool:
+        """Indica se o dono de um job não finalizado terminou (ou deixou o lease expirar)."""
+        if job['owner'] == self.owner:
+            return False
+        if job['owner'] is None or (job['lease_until'] or 0) < now:
+            return True
+        return job['owner_host'] == self.host and job['owner_pid'] != self.pid and not _process_alive(job['owner_pid'])
+
+    def claim_unfinished(self, max_attempts: int = 0) -> tuple:
+        """
+        Assume os jobs não finalizados cujo dono terminou ou cujo lease expirou, devolvendo-os à fila.
+
+        A verificação e a troca de dono ocorrem numa única transação, de modo que dois
+        processos iniciados ao mesmo tempo nunca assumem o mesmo job.
+
+        Args:
+            max_attempts (int): Jobs já iniciados esse número de vezes são marcados como
+                falhos em vez de retomados. 0 para sem limite.
+
+        Returns:
+            tuple: (retomados, abandonados), listas de dicts em ordem de prioridade e de criação;
+                'part_bytes' indica os bytes já baixados do arquivo parcial existente, se houver.
+        """
+        claimed, abandoned = [], []
+        now = time.time()
+        with self._db.write() as conn:
+            cursor = conn.execute(
+                f"SELECT * FROM download_jobs WHERE status IN ({','.join('?' * len(UNFINISHED_STATES))}) ORDER BY priority, id",
+                UNFINISHED_STATES
+            )
+            columns = [column[0] for column in cursor.description]
+            for job in (dict(zip(columns, row)) for row in cursor.fetchall()):
+                if not self._orphaned(job, now):
+                    continue
+                if max_attempts and job['attempts'] >= max_attempts:
+                    job['status'] = STATUS_FAILED
+                    job['error'] = f"Interrompido em {job['attempts']} tentativa(s); o job não será retomado novamente."
+                    conn.execute("UPDATE download_jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                                 (job['status'], job['error'], self._now(), job['id']))
+                    abandoned.append(job)
+                    continue
+                job['status'] = STATUS_QUEUED
+                conn.execute("UPDATE download_jobs SET status = ?, owner = ?, owner_host = ?, owner_pid = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                             (STATUS_QUEUED, self.owner, self.host, self.pid, now + LEASE_SECONDS, self._now(), job['id']))
+                claimed.append(job)
+        for job in claimed:
+            part_path = job.get('part_path')
+            job['part_bytes'] = partial_bytes(part_path) if part_path else 0
+        if claimed:
+            self._ensure_heartbeat()
+        return claimed, abandoned
+
+    def purge_finished(self, older_than_days: int = 30) -> int:
+        """Remove jobs finalizados há mais de `older_than_days` dias."""
+        cutoff = (datetime.datetime.now() - datetime.timedelta(days=older_than_days)).isoformat()
+        with self._db.write() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM download_jobs WHERE status NOT IN ({','.join('?' * len(UNFINISHED_STATES))}) AND updated_at < ?",
+                (*UNFINISHED_STATES, cutoff)
+            )
+            return cursor.rowcount
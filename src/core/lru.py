@@ -0,0 +1,77 @@
+# src/core/lru.py
+
+"""
+Módulo com um cache LRU em memória, thread-safe e de tamanho limitado.
+
+Usado como camada rápida na frente de armazenamentos mais lentos (SQLite, disco,
+rede), quando a mesma chave tende a ser consultada repetidamente.
+"""
+
+import threading
+from collections import OrderedDict
+
+_MISSING = object()
+
+class LRUCache:
+    """Dicionário limitado que descarta a chave usada há mais tempo ao atingir o limite."""
+
+    def __init__(self, max_items: int = 128):
+        """
+        Inicializa o LRUCache.
+
+        Args:
+            max_items (int): Número máximo de itens mantidos. Zero desativa o cache.
+        """
+        self.max_items = max(0, int(max_items))
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Retorna o valor da chave (marcando-a como usada recentemente) ou `default`."""
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """Armazena um valor, descartando o item menos usado se o limite for excedido."""
+        if not self.max_items:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove a chave e retorna o seu valor, se existir."""
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def discard_where(self, predicate) -> int:
+        """
+        Remove todas as chaves para as quais `predicate(key)` é verdadeiro.
+
+        Returns:
+            int: O número de itens removidos.
+        """
+        with self._lock:
+            keys = [key for key in self._items if predicate(key)]
+            for key in keys:
+                del self._items[key]
+            return len(keys)
+
+    def clear(self):
+        """Remove todos os itens."""
+        with self._lock:
+            self._items.clear()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._items
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
@@ -0,0 +1,331 @@
+# src/core/metrics.py
+
+"""
+Módulo de métricas de transferência em tempo real.
+
+Alimentado por todos os eventos do progress hook do yt-dlp, registra para cada
+stream baixado (e agregado por host) a vazão em bytes/s, o tempo até o primeiro
+byte, travamentos (intervalos sem progresso) e fragmentos baixados. Os eventos
+são amostrados: o hook é chamado a cada bloco recebido, mas o processamento
+completo só acontece no máximo uma vez por `sample_interval` por stream.
+
+As métricas ficam disponíveis via `MetricsRegistry.snapshot()` e em formato de
+texto do Prometheus (`render_prometheus`), que pode ser servido localmente por
+`start_metrics_server`.
+
+Um download que falha pode terminar sem um evento 'finished' ou 'error' (o
+yt-dlp lança a exceção sem avisar os hooks); os seus streams são encerrados
+como falhas pelo `TransferGroup` do download (ver `MetricsRegistry.transfer_group`).
+O grupo também prefixa a chave de cada stream com o seu número, para que dois
+downloads simultâneos do mesmo id e formato (ex: o mesmo vídeo na fila duas
+vezes) não se misturem.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque, OrderedDict
+from urllib.parse import urlsplit
+
+METRIC_PREFIX = "superdownloader"
+MAX_FINISHED_TRANSFERS = 100
+
+class TransferTracker:
+    """Estado de um único stream em transferência."""
+
+    def __init__(self, key: str, host: str, window: float):
+        self.key = key
+        self.host = host
+        self.window = window
+        self.started_at = time.monotonic()
+        self.last_event_at = self.started_at
+        self.last_sample_at = 0.0
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.ttfb = None
+        self.stalls = 0
+        self.stall_seconds = 0.0
+        self.fragment_index = None
+        self.fragment_count = None
+        self.status = 'downloading'
+        self._samples = deque()
+
+    def add_sample(self, now: float, downloaded_bytes: int):
+        self.downloaded_bytes = downloaded_bytes
+        self._samples.append((now, downloaded_bytes))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.window:
+            self._samples.popleft()
+
+    @property
+    def rate(self) -> float:
+        """Vazão média (bytes/s) na janela móvel."""
+        if self.status != 'downloading' or len(self._samples) < 2:
+            return 0.0
+        (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def as_dict(self, stall_threshold: float) -> dict:
+        idle = time.monotonic() - self.last_event_at
+        return {
+            'key': self.key, 'host': self.host, 'status': self.status,
+            'downloaded_bytes': self.downloaded_bytes, 'total_bytes': self.total_bytes,
+            'bytes_per_second': self.rate, 'ttfb_seconds': self.ttfb,
+            'stalls': self.stalls, 'stall_seconds': self.stall_seconds,
+            'stalled_for': idle if self.status == 'downloading' and idle > stall_threshold else 0.0,
+            'fragment_index': self.fragment_index, 'fragment_count': self.fragment_count,
+        }
+
+class TransferGroup:
+    """
+    Os streams de um download. Use como gerenciador de contexto, com `observe` entre os progress
+    hooks: se o bloco terminar com uma exceção, os streams ainda ativos são encerrados como falhas.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, registry: 'MetricsRegistry'):
+        self.registry = registry
+        self.id = next(self._ids)
+        self.keys = set()
+
+    def observe(self, d: dict):
+        """Repassa um evento do progress hook ao registro, com a chave do stream restrita a este download."""
+        key = f"{self.id}:{self.registry.transfer_key(d)}"
+        self.keys.add(key)
+        self.registry.observe(d, key=key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.registry.abort(self.keys)
+        return False
+
+class MetricsRegistry:
+    """Registro de métricas de transferência, thread-safe."""
+
+    def __init__(self, sample_interval: float = 0.5, stall_threshold: float = 5.0, window: float = 10.0):
+        """
+        Inicializa o MetricsRegistry.
+
+        Args:
+            sample_interval (float): Intervalo mínimo, em segundos, entre amostras do mesmo stream.
+            stall_threshold (float): Intervalo sem eventos, em segundos, considerado um travamento.
+            window (float): Janela, em segundos, usada no cálculo da vazão móvel.
+        """
+        self.sample_interval = sample_interval
+        self.stall_threshold = stall_threshold
+        self.window = window
+        self._lock = threading.Lock()
+        self._active = {}
+        self._finished = OrderedDict()
+        # Totais acumulados por host
+        self._hosts = {}
+        self._completed = 0
+        self._failed = 0
+
+    @staticmethod
+    def transfer_key(d: dict) -> str:
+        """A chave do stream de um evento do progress hook."""
+        info = d.get('info_dict') or {}
+        return f"{info.get('id') or d.get('filename')}:{info.get('format_id', '')}"
+
+    @staticmethod
+    def _host(d: dict) -> str:
+        info = d.get('info_dict') or {}
+        return urlsplit(info.get('url') or '').hostname or info.get('extractor_key') or 'unknown'
+
+    def _host_totals(self, host: str) -> dict:
+        totals = self._hosts.get(host)
+        if totals is None:
+            totals = self._hosts[host] = {'bytes': 0, 'transfers': 0, 'ttfb_sum': 0.0, 'ttfb_count': 0,
+                                          'stalls': 0, 'stall_seconds': 0.0, 'fragments': 0}
+        return totals
+
+    def observe(self, d: dict, key: str | None = None):
+        """
+        Processa um evento do progress hook do yt-dlp.
+
+        Chamado a cada bloco recebido; o trabalho completo é feito apenas a cada
+        `sample_interval` segundos por stream e nas mudanças de estado.
+
+        Args:
+            key (str | None): A chave do stream (padrão: `transfer_key(d)`). Os downloads
+                passam pelo `TransferGroup`, que a torna única por download.
+        """
+        status = d.get('status')
+        key = key or self.transfer_key(d)
+        now = time.monotonic()
+        with self._lock:
+            tracker = self._active.get(key)
+            if tracker is None:
+                if status != 'downloading':
+                    return
+                tracker = self._active[key] = TransferTracker(key, self._host(d), self.window)
+                self._host_totals(tracker.host)['transfers'] += 1
+
+            # Um intervalo longo sem eventos (nenhum bloco recebido) é contabilizado como travamento
+            gap = now - tracker.last_event_at
+            tracker.last_event_at = now
+            if gap > self.stall_threshold:
+                tracker.stalls += 1
+                tracker.stall_seconds += gap
+                totals = self._host_totals(tracker.host)
+                totals['stalls'] += 1
+                totals['stall_seconds'] += gap
+
+            downloaded = d.get('downloaded_bytes') or 0
+            first_byte = tracker.ttfb is None and downloaded > 0
+            if status == 'downloading' and not first_byte and now - tracker.last_sample_at < self.sample_interval:
+                return
+            self._sample(tracker, d, now, downloaded, first_byte)
+            if status in ('finished', 'error'):
+                self._finish(tracker, status)
+
+    def _sample(self, tracker: TransferTracker, d: dict, now: float, downloaded: int, first_byte: bool):
+        totals = self._host_totals(tracker.host)
+        tracker.last_sample_at = now
+        if first_byte:
+            tracker.ttfb = d.get('elapsed') or (now - tracker.started_at)
+            totals['ttfb_sum'] += tracker.ttfb
+            totals['ttfb_count'] += 1
+        if downloaded > tracker.downloaded_bytes:
+            totals['bytes'] += downloaded - tracker.downloaded_bytes
+        tracker.add_sample(now, max(downloaded, tracker.downloaded_bytes))
+        tracker.total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate') or tracker.total_bytes
+        fragment_index = d.get('fragment_index')
+        if fragment_index is not None:
+            if tracker.fragment_index is not None and fragment_index > tracker.fragment_index:
+                totals['fragments'] += fragment_index - tracker.fragment_index
+            tracker.fragment_index = fragment_index
+            tracker.fragment_count = d.get('fragment_count')
+
+    def transfer_group(self) -> TransferGroup:
+        """Cria um TransferGroup para acompanhar os streams de um download."""
+        return TransferGroup(self)
+
+    def abort(self, keys):
+        """Encerra como falhas os streams ainda ativos entre `keys` (ex: download interrompido por uma exceção)."""
+        with self._lock:
+            for key in keys:
+                tracker = self._active.get(key)
+                if tracker is not None:
+                    self._finish(tracker, 'error')
+
+    def _finish(self, tracker: TransferTracker, status: str):
+        tracker.status = status
+        del self._active[tracker.key]
+        self._finished[tracker.key] = tracker
+        while len(self._finished) > MAX_FINISHED_TRANSFERS:
+            self._finished.popitem(last=False)
+        if status == 'finished':
+            self._completed += 1
+        else:
+            self._failed += 1
+
+    def snapshot(self) -> dict:
+        """
+        Retorna o estado atual das métricas.
+
+        Returns:
+            dict: 'transfers' (streams ativos), 'recent' (últimos concluídos),
+            'hosts' (agregados por host) e 'totals'.
+        """
+        with self._lock:
+            active = [tracker.as_dict(self.stall_threshold) for tracker in self._active.values()]
+            recent = [tracker.as_dict(self.stall_threshold) for tracker in self._finished.values()]
+            hosts = {}
+            for host, totals in self._hosts.items():
+                hosts[host] = dict(totals)
+                hosts[host]['bytes_per_second'] = sum(t['bytes_per_second'] for t in active if t['host'] == host)
+                hosts[host]['active_transfers'] = sum(1 for t in active if t['host'] == host)
+            totals = {
+                'active_transfers': len(active), 'completed_transfers': self._completed, 'failed_transfers': self._failed,
+                'bytes_per_second': sum(t['bytes_per_second'] for t in active),
+                'bytes': sum(h['bytes'] for h in self._hosts.values()),
+            }
+        return {'transfers': active, 'recent': recent, 'hosts': hosts, 'totals': totals}
+
+    def render_prometheus(self) -> str:
+        """Exporta as métricas no formato de texto do Prometheus."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text else f"{METRIC_PREFIX}_{name} {value}")
+
+        hosts = snapshot['hosts']
+        totals = snapshot['totals']
+        metric("active_transfers", "gauge", "Streams em transferência.", [({}, totals['active_transfers'])])
+        metric("completed_transfers_total", "counter", "Streams concluídos.", [({}, totals['completed_transfers'])])
+        metric("failed_transfers_total", "counter", "Streams que falharam.", [({}, totals['failed_transfers'])])
+        metric("bytes_total", "counter", "Bytes recebidos por host.", [({'host': h}, v['bytes']) for h, v in hosts.items()])
+        metric("throughput_bytes_per_second", "gauge", "Vazão móvel atual por host.", [({'host': h}, round(v['bytes_per_second'], 2)) for h, v in hosts.items()])
+        metric("ttfb_seconds_sum", "counter", "Soma dos tempos até o primeiro byte.", [({'host': h}, round(v['ttfb_sum'], 4)) for h, v in hosts.items()])
+        metric("ttfb_seconds_count", "counter", "Número de medições de tempo até o primeiro byte.", [({'host': h}, v['ttfb_count']) for h, v in hosts.items()])
+        metric("stalls_total", "counter", "Travamentos detectados por host.", [({'host': h}, v['stalls']) for h, v in hosts.items()])
+        metric("stall_seconds_total", "counter", "Tempo total em travamento por host.", [({'host': h}, round(v['stall_seconds'], 3)) for h, v in hosts.items()])
+        metric("fragments_total", "counter", "Fragmentos baixados por host.", [({'host': h}, v['fragments']) for h, v in hosts.items()])
+        metric("transfer_throughput_bytes_per_second", "gauge", "Vazão móvel atual por stream.",
+               [({'transfer': t['key'], 'host': t['host']}, round(t['bytes_per_second'], 2)) for t in snapshot['transfers']])
+        return "\n".join(lines) + "\n"
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+_registry = None
+_registry_lock = threading.Lock()
+_server = None
+
+def get_metrics_registry() -> MetricsRegistry:
+    """Retorna o MetricsRegistry compartilhado pelo processo."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+def start_metrics_server(port: int, host: str = "127.0.0.1", registry: MetricsRegistry | None = None) -> 'ThreadingHTTPServer':
+    """
+    Inicia (uma única vez por processo) um servidor HTTP local que expõe `/metrics`.
+
+    Args:
+        port (int): A porta TCP. Use 0 para escolher uma porta livre.
+        host (str): O endereço de escuta (por padrão, apenas a máquina local).
+        registry (MetricsRegistry | None): O registro exportado (padrão: o compartilhado).
+
+    Returns:
+        ThreadingHTTPServer: O servidor em execução (`server_address` contém a porta real).
+    """
+    global _server
+    # Importado aqui: o http.server (e o pacote email que ele carrega) só é necessário com o servidor ativo
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    registry = registry or get_metrics_registry()
+    with _registry_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
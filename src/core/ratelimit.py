@@ -0,0 +1,179 @@
+# src/core/ratelimit.py
+
+"""
+Módulo de limitação de banda e de conexões por site.
+
+`BandwidthLimiter` é um token bucket compartilhado por todos os downloads em
+andamento: cada evento do progress hook do yt-dlp consome os bytes recebidos
+desde o evento anterior do mesmo arquivo e, se o orçamento estiver esgotado, a
+thread do download dorme dentro do hook. Como o yt-dlp só lê o próximo bloco
+depois que o hook retorna, a pausa se propaga para a conexão TCP e a vazão
+somada de todos os downloads fica dentro do limite.
+
+`HostLimiter` limita o número de conexões simultâneas a um mesmo site, para
+evitar o estrangulamento pela origem quando muitos jobs rodam em paralelo. Cada
+download ocupa uma vaga; o download segmentado ocupa, além dela, uma vaga por
+conexão adicional, mas apenas as que estiverem livres (`try_acquire`), de modo
+que usa menos conexões em vez de aguardar.
+
+Ambos podem ser ajustados em tempo de execução (`set_rate`/`set_limit`), o que
+permite seguir as alterações do arquivo de configuração.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Rajada máxima, em segundos de banda: acomoda os blocos grandes que o yt-dlp lê de uma vez
+DEFAULT_BURST_SECONDS = 0.5
+# Pausa máxima por chamada: mantém o hook responsivo quando o limite é reduzido em tempo de execução
+MAX_SLEEP = 0.5
+
+class BandwidthLimiter:
+    """Token bucket global de bytes por segundo (thread-safe)."""
+
+    def __init__(self, rate: float | None = None, burst_seconds: float = DEFAULT_BURST_SECONDS):
+        """
+        Inicializa o BandwidthLimiter.
+
+        Args:
+            rate (float | None): O limite, em bytes por segundo. None ou 0 para sem limite.
+            burst_seconds (float): Tamanho do balde, em segundos de banda.
+        """
+        self.burst_seconds = burst_seconds
+        self._lock = threading.Lock()
+        self._rate = None
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._last_bytes = {}
+        self.set_rate(rate)
+
+    @property
+    def rate(self) -> float | None:
+        return self._rate
+
+    def set_rate(self, rate: float | None):
+        """Altera o limite (bytes por segundo; None ou 0 para sem limite). Vale também para os downloads em andamento."""
+        with self._lock:
+            self._rate = float(rate) if rate else None
+            self._tokens = min(self._tokens, self._capacity())
+            self._updated = time.monotonic()
+
+    def _capacity(self) -> float:
+        return (self._rate or 0.0) * self.burst_seconds
+
+    def consume(self, amount: int):
+        """
+        Registra `amount` bytes recebidos e bloqueia o tempo necessário para manter a vazão no limite.
+
+        O saldo pode ficar negativo (um bloco maior que o balde): a dívida é paga com
+        pausas nas chamadas seguintes, de modo que a média respeita o limite.
+        """
+        if amount <= 0 or self._rate is None:
+            return
+        with self._lock:
+            if self._rate is None:
+                return
+            now = time.monotonic()
+            self._tokens = min(self._capacity(), self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= amount
+            deficit = -self._tokens
+        while deficit > 0:
+            # Dorme fora do lock; a dívida é recalculada a cada volta, pois o limite pode mudar
+            with self._lock:
+                if self._rate is None:
+                    return
+                wait = min(MAX_SLEEP, deficit / self._rate)
+            time.sleep(wait)
+            with self._lock:
+                if self._rate is None:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self._capacity(), self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                deficit = -self._tokens
+
+    def observe(self, d: dict):
+        """
+        Progress hook do yt-dlp: consome os bytes recebidos desde o último evento do mesmo arquivo.
+
+        O progresso é acompanhado mesmo sem limite, para que um limite ativado durante um
+        download conte apenas os bytes recebidos a partir dali.
+        """
+        key = d.get('tmpfilename') or d.get('filename')
+        downloaded = d.get('downloaded_bytes') or 0
+        with self._lock:
+            previous = self._last_bytes.get(key, 0)
+            if d.get('status') == 'downloading':
+                self._last_bytes[key] = downloaded
+            else:
+                self._last_bytes.pop(key, None)
+        # Um valor menor que o anterior indica que o arquivo recomeçou do zero
+        self.consume(downloaded - previous if downloaded >= previous else downloaded)
+
+class HostLimiter:
+    """Limita o número de conexões simultâneas por site (thread-safe)."""
+
+    def __init__(self, limit: int = 0):
+        """
+        Inicializa o HostLimiter.
+
+        Args:
+            limit (int): Conexões simultâneas por site. 0 para sem limite.
+        """
+        self._limit = max(0, int(limit))
+        self._active = {}
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def set_limit(self, limit: int):
+        """Altera o limite. Ao reduzi-lo, os downloads em andamento continuam; os novos aguardam."""
+        with self._condition:
+            self._limit = max(0, int(limit))
+            self._condition.notify_all()
+
+    def acquire(self, host: str, on_wait=None):
+        """Aguarda uma vaga para `host`. `on_wait` é chamada uma vez se for preciso aguardar."""
+        with self._condition:
+            notified = False
+            while self._limit and self._active.get(host, 0) >= self._limit:
+                if on_wait and not notified:
+                    on_wait(host, self._limit); notified = True
+                self._condition.wait()
+            self._active[host] = self._active.get(host, 0) + 1
+
+    def try_acquire(self, host: str, count: int = 1) -> int:
+        """Ocupa, sem aguardar, até `count` vagas livres de `host`. Retorna quantas foram ocupadas."""
+        with self._condition:
+            active = self._active.get(host, 0)
+            acquired = max(0, min(count, self._limit - active)) if self._limit else max(0, count)
+            if acquired:
+                self._active[host] = active + acquired
+            return acquired
+
+    def release(self, host: str, count: int = 1):
+        if count <= 0:
+            return
+        with self._condition:
+            count = self._active.get(host, 0) - count
+            if count > 0: self._active[host] = count
+            else: self._active.pop(host, None)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, host: str, on_wait=None):
+        """Gerenciador de contexto: ocupa uma vaga de `host` durante o bloco."""
+        self.acquire(host, on_wait)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def active(self) -> dict:
+        """Retorna o número de conexões em uso por site."""
+        with self._condition:
+            return dict(self._active)
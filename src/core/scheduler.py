@@ -0,0 +1,433 @@
+# src/core/scheduler.py
+
+"""
+Módulo para o agendamento de downloads concorrentes.
+
+Mantém uma fila de prioridades de jobs e um pool limitado de threads de
+trabalho que executam `Downloader.download`/`download_audio`, permitindo manter
+vários downloads em andamento ao mesmo tempo (até `max_concurrent_downloads`).
+O tamanho do pool pode ser alterado em execução (`set_max_workers`) e, quando
+não é informado explicitamente, acompanha as alterações da configuração.
+
+Com um diário de jobs (ver `jobs.JobJournal`), cada job e as suas transições de
+estado são persistidos, e `resume_pending` recoloca na fila os jobs que não
+terminaram numa execução anterior da aplicação.
+"""
+
+import datetime
+import itertools
+import queue
+import sqlite3
+import threading
+from .config import get_config
+from .exceptions import DownloaderError
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_JOB_ATTEMPTS = 3
+
+class JobStatus:
+    """Estados possíveis de um job de download."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    SKIPPED = 'skipped'  # Nada a baixar: o conteúdo já constava no arquivo de downloads (ou no job, ao retomar)
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    FINAL_STATES = (COMPLETED, SKIPPED, FAILED, CANCELLED)
+
+class JobPriority:
+    """Prioridades pré-definidas. Valores menores são executados primeiro."""
+    HIGH = 0
+    NORMAL = 10
+    LOW = 20
+
+class DownloadJob:
+    """Representa um download enfileirado no agendador e o seu estado atual."""
+
+    KIND_VIDEO = 'video'
+    KIND_AUDIO = 'audio'
+
+    def __init__(self, job_id: int, kind: str, url: str, format_code: str,
+                 download_playlist: bool = False, priority: int = JobPriority.NORMAL, segmented: bool | None = None):
+        """
+        Inicializa o DownloadJob.
+
+        Args:
+            job_id (int): Identificador único do job dentro do agendador.
+            kind (str): 'video' ou 'audio', define qual método do Downloader será usado.
+            url (str): A URL a ser baixada.
+            format_code (str): O código de formato (ou formato de áudio) a ser usado.
+            download_playlist (bool): Se a playlist inteira deve ser baixada.
+            priority (int): Prioridade do job. Valores menores são executados primeiro.
+            segmented (bool | None): Se o download segmentado deve ser usado. None segue a configuração.
+        """
+        self.id = job_id
+        self.kind = kind
+        self.url = url
+        self.format_code = format_code
+        self.download_playlist = download_playlist
+        self.priority = priority
+        self.segmented = segmented
+        self.resumed_bytes = 0
+        self.status = JobStatus.QUEUED
+        self.error = None
+        self.created_at = datetime.datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        # Último progresso conhecido: bytes do stream atual e, em playlists, o agregado das entradas
+        self.progress = {}
+        self._done_event = threading.Event()
+        self._callbacks = []
+        self._progress_callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        """Indica se o job chegou a um estado final."""
+        return self._done_event.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """
+        Bloqueia até que o job termine.
+
+        Args:
+            timeout (float | None): Tempo máximo de espera em segundos.
+
+        Returns:
+            bool: True se o job terminou, False se o tempo de espera expirou.
+        """
+        return self._done_event.wait(timeout)
+
+    def result(self, timeout: float | None = None):
+        """
+        Aguarda o término do job e propaga o erro, caso ele tenha falhado.
+
+        Lança:
+            DownloaderError: Se o tempo de espera expirar ou o job for cancelado.
+            Exception: O erro original do download, caso o job tenha falhado.
+        """
+        if not self.wait(timeout):
+            raise DownloaderError(f"O job #{self.id} não terminou dentro do tempo de espera.")
+        if self.status == JobStatus.CANCELLED:
+            raise DownloaderError(f"O job #{self.id} foi cancelado.")
+        if self.error:
+            raise self.error
+
+    def add_done_callback(self, callback):
+        """
+        Registra uma função chamada (com o job como argumento) quando ele terminar.
+        Se o job já tiver terminado, a função é chamada imediatamente.
+        """
+        with self._lock:
+            if not self.done:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def add_progress_callback(self, callback):
+        """
+        Registra uma função chamada (com o job como argumento) a cada atualização de progresso.
+
+        A função é chamada na thread de trabalho, a cada evento do progress hook do
+        yt-dlp; quem a registra é responsável por limitar a frequência de atualização.
+        """
+        with self._lock:
+            self._progress_callbacks.append(callback)
+
+    def _report_progress(self, d: dict):
+        """Progress hook do yt-dlp associado a este job."""
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        self.progress.update({'status': d.get('status'), 'downloaded_bytes': d.get('downloaded_bytes') or 0,
+                              'total_bytes': total, 'speed': d.get('speed'), 'eta': d.get('eta'),
+                              'title': (d.get('info_dict') or {}).get('title')})
+        self._notify_progress()
+
+    def _report_playlist_progress(self, snapshot: dict):
+        self.progress['playlist'] = snapshot
+        self._notify_progress()
+
+    def _notify_progress(self):
+        for callback in self._progress_callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+    def _try_start(self) -> bool:
+        with self._lock:
+            if self.status != JobStatus.QUEUED: return False
+            self.status = JobStatus.RUNNING
+            self.started_at = datetime.datetime.now()
+            return True
+
+    def _cancel(self) -> bool:
+        with self._lock:
+            if self.status != JobStatus.QUEUED: return False
+            self.status = JobStatus.CANCELLED
+        self._finish(JobStatus.CANCELLED)
+        return True
+
+    def _finish(self, status: str, error: Exception | None = None):
+        with self._lock:
+            if self.done: return
+            self.status = status
+            self.error = error
+            self.finished_at = datetime.datetime.now()
+            self._done_event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass
+
+    def __repr__(self):
+        return f"<DownloadJob #{self.id} {self.kind} {self.status} {self.url!r}>"
+
+class DownloadScheduler:
+    """
+    Agendador de downloads com fila de prioridades e pool de threads limitado.
+
+    Cada thread de trabalho retira o próximo job da fila (menor prioridade primeiro,
+    depois ordem de chegada) e o executa no Downloader compartilhado.
+    """
+
+    def __init__(self, downloader, max_workers: int | None = None, journal=None):
+        """
+        Inicializa o DownloadScheduler e inicia as threads de trabalho.
+
+        Args:
+            downloader (Downloader): A instância usada para executar os downloads.
+            max_workers (int | None): Número de downloads simultâneos. Se omitido,
+                usa `max_concurrent_downloads` da configuração e acompanha as suas alterações.
+            journal (JobJournal | None): O diário onde os jobs são persistidos. Se omitido,
+                usa o diário do Downloader (`downloader.journal`), se existir.
+        """
+        self._follow_config = max_workers is None
+        if self._follow_config:
+            max_workers = get_config().get('max_concurrent_downloads', DEFAULT_MAX_WORKERS)
+        self.downloader = downloader
+        self.journal = journal if journal is not None else getattr(downloader, 'journal', None)
+        self.max_workers = max(1, int(max_workers))
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._job_ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = []
+        self._is_shutdown = False
+        self._worker_names = itertools.count(1)
+        for _ in range(self.max_workers):
+            self._spawn_worker()
+        if self._follow_config:
+            get_config().subscribe(self._on_config_changed)
+
+    def _spawn_worker(self):
+        worker = threading.Thread(target=self._worker_loop, name=f"download-worker-{next(self._worker_names)}", daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def set_max_workers(self, max_workers: int):
+        """
+        Altera o número de downloads simultâneos sem reiniciar o agendador.
+
+        Ao reduzir, as threads excedentes terminam assim que concluírem o job atual;
+        nenhum download em andamento é interrompido.
+        """
+        max_workers = max(1, int(max_workers))
+        with self._lock:
+            if self._is_shutdown or max_workers == self.max_workers: return
+            delta, self.max_workers = max_workers - self.max_workers, max_workers
+            if delta > 0:
+                for _ in range(delta): self._spawn_worker()
+        # Sentinelas com prioridade "menos infinita": a próxima thread livre termina antes de pegar outro job
+        for _ in range(-delta):
+            self._queue.put((float('-inf'), next(self._sequence), None))
+
+    def _on_config_changed(self, changed: dict, config: dict):
+        if 'max_concurrent_downloads' in changed:
+            self.set_max_workers(config['max_concurrent_downloads'])
+
+    def submit(self, url: str, format_code: str, kind: str = DownloadJob.KIND_VIDEO,
+               download_playlist: bool = False, priority: int = JobPriority.NORMAL, segmented: bool | None = None) -> DownloadJob:
+        """
+        Enfileira um novo download.
+
+        Args:
+            url (str): A URL a ser baixada.
+            format_code (str): O código de formato do vídeo, ou o formato de áudio. Se vazio, o
+                formato é escolhido no início do download segundo a política da configuração.
+            kind (str): 'video' para `Downloader.download`, 'audio' para `download_audio`.
+            download_playlist (bool): Se a playlist inteira deve ser baixada.
+            priority (int): Prioridade do job (ver JobPriority).
+            segmented (bool | None): Força (True) ou impede (False) o download segmentado (ver
+                segmented.SegmentedDownloader). None segue `prefer_aria2c` da configuração.
+
+        Returns:
+            DownloadJob: O job criado, que pode ser aguardado com `wait()`/`result()`.
+
+        Lança:
+            DownloaderError: Se o agendador já tiver sido encerrado.
+        """
+        if kind not in (DownloadJob.KIND_VIDEO, DownloadJob.KIND_AUDIO):
+            raise ValueError(f"Tipo de job desconhecido: {kind}")
+        with self._lock:
+            if self._is_shutdown:
+                raise DownloaderError("O agendador de downloads já foi encerrado.")
+            job_id = self.journal.create(kind, url, format_code, download_playlist, priority, segmented) if self.journal else next(self._job_ids)
+            job = DownloadJob(job_id, kind, url, format_code, download_playlist, priority, segmented)
+            self._jobs[job.id] = job
+        self._queue.put((priority, next(self._sequence), job))
+        return job
+
+    def resume_pending(self) -> list:
+        """
+        Recoloca na fila os jobs do diário que não terminaram numa execução anterior
+        (na fila ou interrompidos durante o download), mantendo os seus identificadores.
+
+        Jobs de outro processo ainda em execução (com o lease em dia) são ignorados. Jobs
+        já iniciados `max_job_attempts` vezes não são retomados: são devolvidos já
+        finalizados como FAILED.
+
+        Returns:
+            list: Os jobs retomados, com `resumed_bytes` indicando o tamanho do arquivo parcial
+                a continuar, seguidos dos jobs abandonados (com `done` verdadeiro).
+        """
+        if not self.journal:
+            return []
+        claimed, abandoned = self.journal.claim_unfinished(get_config().get('max_job_attempts', DEFAULT_MAX_JOB_ATTEMPTS))
+        resumed = []
+        for record in claimed:
+            with self._lock:
+                if self._is_shutdown or record['id'] in self._jobs: continue
+                job = self._job_from_record(record)
+                job.resumed_bytes = record['part_bytes']
+                self._jobs[job.id] = job
+            self._queue.put((job.priority, next(self._sequence), job))
+            resumed.append(job)
+        for record in abandoned:
+            job = self._job_from_record(record)
+            job._finish(JobStatus.FAILED, DownloaderError(record['error']))
+            resumed.append(job)
+        return resumed
+
+    @staticmethod
+    def _job_from_record(record: dict) -> DownloadJob:
+        return DownloadJob(record['id'], record['kind'], record['url'], record['format_code'],
+                           bool(record['download_playlist']), record['priority'],
+                           None if record.get('segmented') is None else bool(record['segmented']))
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancela um job que ainda está na fila. Jobs em execução não são interrompidos.
+
+        Returns:
+            bool: True se o job foi cancelado.
+        """
+        job = self.get_job(job_id)
+        if job is None or not job._cancel():
+            return False
+        self._journal_status(job, JobStatus.CANCELLED)
+        return True
+
+    def get_job(self, job_id: int) -> DownloadJob | None:
+        """Retorna o job com o identificador informado, se existir."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, status: str | None = None) -> list:
+        """Retorna os jobs conhecidos, opcionalmente filtrados por estado."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job for job in jobs if status is None or job.status == status]
+
+    def wait_all(self, timeout: float | None = None) -> bool:
+        """
+        Aguarda o término de todos os jobs submetidos até o momento.
+
+        Returns:
+            bool: True se todos terminaram dentro do tempo de espera.
+        """
+        deadline = None if timeout is None else datetime.datetime.now() + datetime.timedelta(seconds=timeout)
+        for job in self.list_jobs():
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, (deadline - datetime.datetime.now()).total_seconds())
+            if not job.wait(remaining):
+                return False
+        return True
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """
+        Encerra o agendador. Novos jobs deixam de ser aceitos.
+
+        Args:
+            wait (bool): Se deve aguardar as threads de trabalho terminarem.
+            cancel_pending (bool): Se os jobs ainda na fila devem ser cancelados. No diário eles
+                continuam pendentes, para serem retomados na próxima inicialização (`resume_pending`).
+        """
+        with self._lock:
+            if self._is_shutdown: return
+            self._is_shutdown = True
+            workers = list(self._workers)
+        if self._follow_config:
+            get_config().unsubscribe(self._on_config_changed)
+        if cancel_pending:
+            for job in self.list_jobs(JobStatus.QUEUED):
+                job._cancel()
+        # Sentinelas com prioridade "infinita" para que os jobs pendentes sejam processados antes
+        for _ in workers:
+            self._queue.put((float('inf'), next(self._sequence), None))
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def _worker_loop(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                break
+            if not job._try_start():
+                continue
+            self._run_job(job)
+        with self._lock:
+            self._workers.remove(threading.current_thread())
+
+    def _journal_status(self, job: DownloadJob, status: str, error: Exception | None = None):
+        if not self.journal: return
+        try:
+            self.journal.set_status(job.id, status, str(error) if error else None)
+        except sqlite3.Error as e:
+            # Uma falha no diário não deve interromper o download em si
+            print(f"Erro ao atualizar o diário de jobs (job #{job.id}): {e}")
+
+    def _run_job(self, job: DownloadJob):
+        self._journal_status(job, JobStatus.RUNNING)
+        options = {'download_playlist': job.download_playlist, 'progress_callback': job._report_playlist_progress,
+                   'progress_hook': job._report_progress, 'segmented': job.segmented}
+        if self.journal: options['job_id'] = job.id
+        try:
+            if not job.format_code:
+                # Sem formato explícito: escolhido pela política da configuração (ver formats.FormatPolicy)
+                job.format_code = self.downloader.select_format(job.url, audio_only=job.kind == DownloadJob.KIND_AUDIO,
+                                                                download_playlist=job.download_playlist)
+            if job.kind == DownloadJob.KIND_AUDIO:
+                result = self.downloader.download_audio(job.url, job.format_code, **options)
+            else:
+                result = self.downloader.download(job.url, job.format_code, **options)
+        except Exception as e:
+            self._journal_status(job, JobStatus.FAILED, e)
+            job._finish(JobStatus.FAILED, e)
+        else:
+            status = JobStatus.SKIPPED if self._nothing_downloaded(result) else JobStatus.COMPLETED
+            self._journal_status(job, status)
+            job._finish(status)
+
+    @staticmethod
+    def _nothing_downloaded(result) -> bool:
+        """None: o vídeo já constava no arquivo de downloads. PlaylistProgress: todas as entradas foram ignoradas."""
+        if result is None:
+            return True
+        total = getattr(result, 'total', None)
+        return total is not None and result.skipped == total and not result.completed and not result.failed
@@ -0,0 +1,367 @@
+# src/core/segmented.py
+
+"""
+Módulo do download segmentado de arquivos HTTP(S) por várias conexões.
+
+Muitas CDNs limitam a vazão de cada conexão; um único arquivo grande baixado
+por uma conexão fica preso a esse limite. O `SegmentedDownloader` divide o
+arquivo em segmentos contíguos e baixa cada um por uma conexão própria
+(requisições `Range`), gravando diretamente na posição final de um arquivo
+parcial pré-alocado com o tamanho total.
+
+O progresso de cada segmento é gravado periodicamente num mapa de segmentos
+(JSON ao lado do arquivo parcial). Uma falha de rede num segmento é repetida a
+partir do último byte recebido, sem afetar os demais; se o download for
+interrompido, a próxima tentativa continua de onde cada segmento parou.
+
+Apenas formatos servidos como um único arquivo HTTP(S) são elegíveis (ver
+`segmented_target`); os demais (DASH/HLS fragmentados, transmissões ao vivo)
+continuam pelo yt-dlp. Os eventos de progresso seguem o formato dos progress
+hooks do yt-dlp, de modo que métricas, limite de banda, diário de jobs e
+interface funcionam sem alterações.
+"""
+
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from .exceptions import NetworkError, RangeNotSupportedError
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_RETRIES = 5
+DEFAULT_TIMEOUT = 30.0
+MIN_SEGMENT_SIZE = 1024 * 1024  # Arquivos pequenos não compensam o custo de várias conexões
+READ_SIZE = 64 * 1024
+MAP_WRITE_INTERVAL = 1.0  # segundos entre gravações do mapa de segmentos
+RETRY_BACKOFF = 0.5  # espera antes da primeira nova tentativa de um segmento, dobrada a cada falha
+MAX_RETRY_BACKOFF = 8.0
+PART_SUFFIX = ".seg.part"  # Diferente do `.part` do yt-dlp: um arquivo pré-alocado não pode ser "continuado" por ele
+MAP_SUFFIX = ".seg.json"
+
+# Erros transitórios que justificam uma nova tentativa do segmento
+_RETRYABLE = (OSError, http.client.HTTPException)
+
+def segmented_target(info: dict | None) -> dict | None:
+    """
+    Retorna o formato a baixar se o resultado da extração (já com o formato escolhido) for elegível ao download segmentado.
+
+    Elegível: um vídeo (não uma playlist), com um único formato (sem mesclagem de streams),
+    servido por HTTP(S) como um arquivo único e que não seja uma transmissão ao vivo.
+
+    Returns:
+        dict | None: `{'url', 'http_headers', 'filesize', 'format_id', 'ext'}`, ou None se não for elegível.
+    """
+    if not info or info.get('_type', 'video') != 'video' or info.get('requested_formats') or info.get('is_live'):
+        return None
+    url = info.get('url')
+    protocol = info.get('protocol') or (url or '').partition(':')[0]
+    if not url or protocol not in ('http', 'https'):
+        return None
+    return {'url': url, 'http_headers': dict(info.get('http_headers') or {}),
+            'filesize': info.get('filesize'), 'format_id': info.get('format_id'), 'ext': info.get('ext')}
+
+def plan_segments(total_bytes: int, connections: int, min_segment_size: int = MIN_SEGMENT_SIZE) -> list:
+    """Divide `total_bytes` em até `connections` segmentos contíguos `[início, fim]` (inclusivos) de tamanhos próximos."""
+    count = max(1, min(connections, total_bytes // max(1, min_segment_size)))
+    size, remainder = divmod(total_bytes, count)
+    segments, start = [], 0
+    for index in range(count):
+        end = start + size + (1 if index < remainder else 0) - 1
+        segments.append([start, end])
+        start = end + 1
+    return segments
+
+class _Segment:
+    __slots__ = ('start', 'end', 'done')
+
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start, self.end, self.done = start, end, done
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.start + 1 - self.done
+
+class SegmentMap:
+    """O estado persistente de um download segmentado: o tamanho total e os bytes já gravados de cada segmento."""
+
+    def __init__(self, path: str, total_bytes: int, segments: list):
+        self.path = path
+        self.total_bytes = total_bytes
+        self.segments = segments
+
+    @property
+    def done_bytes(self) -> int:
+        return sum(segment.done for segment in self.segments)
+
+    @classmethod
+    def create(cls, path: str, total_bytes: int, connections: int, min_segment_size: int = MIN_SEGMENT_SIZE) -> 'SegmentMap':
+        return cls(path, total_bytes, [_Segment(start, end) for start, end in plan_segments(total_bytes, connections, min_segment_size)])
+
+    @classmethod
+    def load(cls, path: str, total_bytes: int) -> 'SegmentMap | None':
+        """Carrega o mapa de uma tentativa anterior. Retorna None se não existir, estiver corrompido ou for de outro arquivo."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('total_bytes') != total_bytes:
+                return None
+            segments = [_Segment(int(start), int(end), int(done)) for start, end, done in data['segments']]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        covered = sum(segment.end - segment.start + 1 for segment in segments)
+        if covered != total_bytes or any(segment.done < 0 or segment.remaining < 0 for segment in segments):
+            return None
+        return cls(path, total_bytes, segments)
+
+    def save(self):
+        """Grava o mapa de forma atômica (arquivo temporário + rename)."""
+        data = {'total_bytes': self.total_bytes, 'segments': [[s.start, s.end, s.done] for s in self.segments]}
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp_path, self.path)
+
+    def remove(self):
+        try: os.remove(self.path)
+        except FileNotFoundError: pass
+
+def partial_bytes(part_path: str) -> int:
+    """
+    Bytes realmente baixados de um arquivo parcial. Para um download segmentado (pré-alocado com o
+    tamanho total), vem do mapa de segmentos; nos demais casos, é o tamanho do arquivo.
+    """
+    if part_path.endswith(PART_SUFFIX):
+        try:
+            with open(part_path[:-len(PART_SUFFIX)] + MAP_SUFFIX, 'r', encoding='utf-8') as f:
+                return sum(int(done) for _, _, done in json.load(f)['segments'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+    return os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+class SegmentedDownloader:
+    """Baixa um arquivo HTTP(S) em segmentos paralelos, com nova tentativa por segmento e retomada."""
+
+    def __init__(self, connections: int = DEFAULT_CONNECTIONS, retries: int = DEFAULT_RETRIES,
+                 timeout: float = DEFAULT_TIMEOUT, min_segment_size: int = MIN_SEGMENT_SIZE):
+        """
+        Inicializa o SegmentedDownloader.
+
+        Args:
+            connections (int): Conexões simultâneas (e número máximo de segmentos) por arquivo.
+            retries (int): Novas tentativas de cada segmento após uma falha de rede.
+            timeout (float): Tempo máximo, em segundos, sem resposta do servidor em cada requisição.
+            min_segment_size (int): Tamanho mínimo de um segmento, em bytes.
+        """
+        self.connections = max(1, int(connections))
+        self.retries = max(0, int(retries))
+        self.timeout = timeout
+        self.min_segment_size = min_segment_size
+
+    def _open(self, url: str, headers: dict, first: int, last: int | None = None):
+        request = urllib.request.Request(url, headers=dict(headers, Range=f"bytes={first}-{'' if last is None else last}"))
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def probe(self, url: str, headers: dict | None = None) -> int:
+        """
+        Verifica se o servidor aceita requisições parciais e retorna o tamanho total do arquivo.
+
+        Lança:
+            RangeNotSupportedError: Se o servidor ignorar o cabeçalho Range ou não informar o tamanho.
+            NetworkError: Se a requisição falhar.
+        """
+        try:
+            with self._open(url, headers or {}, 0, 0) as response:
+                content_range = response.headers.get('Content-Range') or ''
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            if e.code == 416:
+                raise RangeNotSupportedError(f"O servidor recusou a requisição parcial (HTTP {e.code}).")
+            raise NetworkError(f"Falha ao consultar o arquivo (HTTP {e.code}).")
+        except _RETRYABLE as e:
+            raise NetworkError(f"Falha ao consultar o arquivo: {e}")
+        total = content_range.rpartition('/')[2]
+        if status != 206 or not total.isdigit():
+            raise RangeNotSupportedError("O servidor não aceita requisições parciais (Range).")
+        return int(total)
+
+    def download(self, url: str, filename: str, headers: dict | None = None, progress_hooks=(), info_dict: dict | None = None,
+                 connections: int | None = None, throttle=None) -> int:
+        """
+        Baixa `url` para `filename`.
+
+        Args:
+            url (str): A URL direta do arquivo.
+            filename (str): O caminho final. Enquanto o download não termina, os dados ficam em
+                `filename + PART_SUFFIX` e o mapa de segmentos em `filename + MAP_SUFFIX`.
+            headers (dict | None): Cabeçalhos HTTP exigidos pelo servidor (ex: os `http_headers` do formato).
+            progress_hooks (iterable): Funções chamadas com eventos no formato dos progress hooks do yt-dlp.
+            info_dict (dict | None): Repassado nos eventos de progresso (`info_dict`).
+            connections (int | None): Conexões a usar neste download, se menos que `self.connections`.
+            throttle (callable | None): Chamada por cada conexão com o número de bytes recebidos a cada
+                bloco (ex: `BandwidthLimiter.consume`); pode bloquear para limitar a vazão daquela conexão.
+
+        Returns:
+            int: O tamanho do arquivo baixado, em bytes.
+
+        Lança:
+            RangeNotSupportedError: Se o servidor não aceitar requisições parciais (nada é gravado).
+            NetworkError: Se um segmento falhar após todas as tentativas (o progresso é mantido para retomada).
+        """
+        headers = dict(headers or {})
+        connections = max(1, min(self.connections, connections or self.connections))
+        total = self.probe(url, headers)
+        progress = _Progress(filename, filename + PART_SUFFIX, total, list(progress_hooks), info_dict)
+        if os.path.exists(filename) and os.path.getsize(filename) == total:
+            progress.finish(0, already_downloaded=True)  # Já baixado numa execução anterior
+            return total
+        os.makedirs(os.path.dirname(filename) or '.', exist_ok=True)
+        part_path = progress.tmpfilename
+        segment_map = SegmentMap.load(filename + MAP_SUFFIX, total) if os.path.exists(part_path) else None
+        if segment_map is None or os.path.getsize(part_path) != total:
+            segment_map = SegmentMap.create(filename + MAP_SUFFIX, total, connections, self.min_segment_size)
+            with open(part_path, 'wb') as f:
+                f.truncate(total)  # Pré-aloca o arquivo: cada segmento grava na sua posição final
+            segment_map.save()
+        progress.start(segment_map)
+
+        pending = [segment for segment in segment_map.segments if segment.remaining > 0]
+        abort = threading.Event()
+        errors = []
+        try:
+            if pending:
+                # Um mapa retomado pode ter mais segmentos que as conexões disponíveis agora: os excedentes aguardam na fila
+                with ThreadPoolExecutor(max_workers=min(len(pending), connections), thread_name_prefix="segment") as pool:
+                    futures = [pool.submit(self._download_segment, url, headers, part_path, segment, progress, abort, throttle) for segment in pending]
+                    for future in futures:
+                        try: future.result()
+                        except Exception as e:
+                            errors.append(e); abort.set()  # Os demais segmentos param e o progresso é preservado
+        finally:
+            progress.save_map(force=True)
+        if errors:
+            error = errors[0]
+            raise error if isinstance(error, (NetworkError, RangeNotSupportedError)) else NetworkError(f"Falha no download segmentado: {error}")
+        os.replace(part_path, filename)
+        segment_map.remove()
+        progress.finish(total)
+        return total
+
+    def _download_segment(self, url: str, headers: dict, part_path: str, segment: _Segment, progress: '_Progress',
+                          abort: threading.Event, throttle=None):
+        attempt = 0
+        while segment.remaining > 0 and not abort.is_set():
+            first = segment.start + segment.done
+            try:
+                with self._open(url, headers, first, segment.end) as response, open(part_path, 'r+b', buffering=0) as f:
+                    if response.status != 206 or not (response.headers.get('Content-Range') or '').startswith(f"bytes {first}-"):
+                        raise RangeNotSupportedError("O servidor deixou de respeitar a requisição parcial (Range).")
+                    f.seek(first)
+                    while segment.remaining > 0 and not abort.is_set():
+                        chunk = response.read(min(READ_SIZE, segment.remaining))
+                        if not chunk:
+                            raise http.client.IncompleteRead(b'', segment.remaining)
+                        f.write(chunk)  # Sem buffer: o mapa nunca registra bytes que ainda não chegaram ao sistema operacional
+                        progress.add(segment, len(chunk))
+                        if throttle: throttle(len(chunk))
+                attempt = 0
+            except urllib.error.HTTPError as e:
+                if e.code < 500 and e.code not in (408, 429):
+                    raise NetworkError(f"Falha no segmento {segment.start}-{segment.end} (HTTP {e.code}).")
+                attempt = self._retry_wait(segment, attempt, e, abort)
+            except RangeNotSupportedError:
+                raise
+            except _RETRYABLE as e:
+                attempt = self._retry_wait(segment, attempt, e, abort)
+
+    def _retry_wait(self, segment: _Segment, attempt: int, error: Exception, abort: threading.Event) -> int:
+        attempt += 1
+        if attempt > self.retries:
+            raise NetworkError(f"Falha no segmento {segment.start}-{segment.end} após {self.retries} nova(s) tentativa(s): {error}")
+        abort.wait(min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (attempt - 1)))
+        return attempt
+
+class _Progress:
+    """Agrega o progresso dos segmentos, emite os eventos dos progress hooks e grava o mapa periodicamente."""
+
+    def __init__(self, filename: str, tmpfilename: str, total: int, hooks: list, info_dict: dict | None):
+        self.filename = filename
+        self.tmpfilename = tmpfilename
+        self.total = total
+        self.hooks = hooks
+        self.info_dict = info_dict
+        self.segment_map = None
+        self._lock = threading.Lock()
+        # Apenas uma thread chama os hooks por vez; as demais só atualizam os contadores (ver add)
+        self._emit_lock = threading.Lock()
+        self._pending = False
+        self._started = time.monotonic()
+        self._resumed = 0
+        self._last_map_write = self._started
+
+    def start(self, segment_map: SegmentMap):
+        self.segment_map = segment_map
+        self._resumed = segment_map.done_bytes
+        self._started = self._last_map_write = time.monotonic()
+
+    def add(self, segment: _Segment, amount: int):
+        """
+        Registra `amount` bytes recebidos por um segmento e emite o evento de progresso.
+
+        Os contadores são atualizados sob o lock, mas os hooks (diário, métricas, interface)
+        rodam fora dele e numa thread por vez: se outra thread já estiver emitindo, esta
+        volta a baixar e o progresso é incluído no próximo evento daquela. Assim os
+        eventos saem com `downloaded_bytes` crescente, como os de uma única conexão, sem
+        que um hook lento pare as demais conexões.
+        """
+        with self._lock:
+            segment.done += amount
+            now = time.monotonic()
+            if now - self._last_map_write >= MAP_WRITE_INTERVAL:
+                self.segment_map.save(); self._last_map_write = now
+            self._pending = True
+        while self._emit_lock.acquire(blocking=False):
+            try:
+                while True:
+                    with self._lock:
+                        if not self._pending:
+                            break
+                        self._pending = False
+                        event = self._downloading_event()
+                    self._emit(event)
+            finally:
+                self._emit_lock.release()
+            # Um progresso registrado entre o último evento e a liberação do lock ainda precisa ser emitido
+            with self._lock:
+                if not self._pending:
+                    return
+
+    def _downloading_event(self) -> dict:
+        downloaded = self.segment_map.done_bytes
+        elapsed = time.monotonic() - self._started
+        speed = (downloaded - self._resumed) / elapsed if elapsed else None
+        return {'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': self.total,
+                'speed': speed, 'eta': (self.total - downloaded) / speed if speed else None, 'elapsed': elapsed,
+                'filename': self.filename, 'tmpfilename': self.tmpfilename}
+
+    def save_map(self, force: bool = False):
+        with self._lock:
+            if self.segment_map is not None and (force or time.monotonic() - self._last_map_write >= MAP_WRITE_INTERVAL):
+                self.segment_map.save(); self._last_map_write = time.monotonic()
+
+    def finish(self, downloaded: int, already_downloaded: bool = False):
+        event = {'status': 'finished', 'downloaded_bytes': downloaded, 'total_bytes': self.total,
+                 'elapsed': time.monotonic() - self._started, 'filename': self.filename}
+        if already_downloaded:
+            event['already_downloaded'] = True  # Nada foi transferido: as estatísticas não contam estes bytes
+        with self._emit_lock:
+            self._emit(event)
+
+    def _emit(self, event: dict):
+        event['info_dict'] = self.info_dict
+        for hook in self.hooks:
+            hook(event)
@@ -5,34 +5,95 @@ Módulo para gerenciamento de estatísticas da aplicação.
 
 Rastreia métricas como o número total de downloads e o total de
 bytes baixados, salvando os dados em um arquivo JSON.
+
+Os contadores são atualizados apenas em memória; as alterações pendentes são
+gravadas em lote (no máximo a cada `flush_interval` segundos e ao encerrar o
+processo). Cada gravação relê o arquivo sob um lock entre processos, soma as
+alterações pendentes e substitui o arquivo de forma atômica (arquivo temporário
++ rename), de modo que instâncias em threads ou processos diferentes não
+sobrescrevem os valores umas das outras.
 """
 
+import atexit
 import json
 import os
+import tempfile
 import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 STATS_FILE = "downloader_stats.json"
 DEFAULT_STATS = {
     "total_downloads": 0,
     "total_bytes_downloaded": 0,
 }
+DEFAULT_FLUSH_INTERVAL = 5.0
+
+class _FileLock:
+    """Lock exclusivo entre processos baseado em um arquivo auxiliar."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
 
 class StatsManager:
     """Gerencia as estatísticas de uso da aplicação de forma thread-safe."""
 
-    def __init__(self):
-        self._stats = self.load_stats()
-        # Usar um lock é crucial para evitar que múltiplas threads de download
-        # tentem escrever no arquivo ao mesmo tempo, o que corromperia os dados.
+    def __init__(self, stats_file: str = STATS_FILE, flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        """
+        Inicializa o StatsManager.
+
+        Args:
+            stats_file (str): O arquivo JSON onde as estatísticas são persistidas.
+            flush_interval (float): Atraso máximo, em segundos, entre uma alteração e a sua gravação.
+        """
+        self.stats_file = stats_file
+        self.flush_interval = flush_interval
+        # O lock protege tanto os contadores quanto as alterações pendentes:
+        # sem ele, incrementos concorrentes poderiam se perder.
         self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stats = self.load_stats()
+        self._pending = {key: 0 for key in DEFAULT_STATS}
+        self._timer = None
+        atexit.register(self.flush)
 
     def load_stats(self) -> dict:
         """Carrega as estatísticas do arquivo JSON."""
-        if not os.path.exists(STATS_FILE):
+        if not os.path.exists(self.stats_file):
             return DEFAULT_STATS.copy()
-        
+
         try:
-            with open(STATS_FILE, 'r', encoding='utf-8') as f:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
                 stats = json.load(f)
                 # Garante que todas as chaves padrão existam no arquivo carregado
                 for key, value in DEFAULT_STATS.items():
@@ -41,26 +102,83 @@ class StatsManager:
         except (json.JSONDecodeError, IOError):
             return DEFAULT_STATS.copy()
 
-    def _save_stats(self):
-        """Salva as estatísticas atuais no arquivo JSON de forma segura."""
+    def _add(self, key: str, amount):
         with self._lock:
+            self._stats[key] += amount
+            self._pending[key] += amount
+            if self._timer is None and self.flush_interval is not None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """
+        Grava as alterações pendentes no arquivo.
+
+        O arquivo é relido sob o lock entre processos e as alterações são somadas aos
+        valores gravados, de forma que outros processos não tenham seus incrementos perdidos.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = self._pending
+                self._pending = {key: 0 for key in DEFAULT_STATS}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not any(pending.values()):
+                return
             try:
-                with open(STATS_FILE, 'w', encoding='utf-8') as f:
-                    json.dump(self._stats, f, indent=4)
-            except IOError as e:
+                with _FileLock(self.stats_file + ".lock"):
+                    stats = self.load_stats()
+                    for key, amount in pending.items():
+                        stats[key] += amount
+                    self._write_atomic(stats)
+            except OSError as e:
+                # Devolve as alterações para a fila, para uma nova tentativa
+                with self._lock:
+                    for key, amount in pending.items():
+                        self._pending[key] += amount
                 print(f"Erro ao salvar o arquivo de estatísticas: {e}")
+                return
+            with self._lock:
+                # Atualiza a visão local com os valores de outros processos, mantendo o que ainda está pendente
+                self._stats = {key: stats[key] + self._pending.get(key, 0) for key in stats}
+
+    def _write_atomic(self, stats: dict):
+        directory = os.path.dirname(os.path.abspath(self.stats_file))
+        fd, temp_path = tempfile.mkstemp(prefix=".stats-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.stats_file)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
 
     def increment_download_count(self, count: int = 1):
         """Incrementa o contador total de downloads."""
-        self._stats["total_downloads"] += count
-        self._save_stats()
+        self._add("total_downloads", count)
 
     def add_bytes_downloaded(self, byte_count: int):
         """Adiciona o número de bytes ao total baixado."""
         if byte_count and isinstance(byte_count, (int, float)):
-            self._stats["total_bytes_downloaded"] += byte_count
-            self._save_stats()
+            self._add("total_bytes_downloaded", byte_count)
 
     def get_stats(self) -> dict:
         """Retorna uma cópia do dicionário de estatísticas."""
-        return self._stats.copy()
+        with self._lock:
+            return self._stats.copy()
+
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+def get_stats_manager() -> StatsManager:
+    """Retorna o StatsManager compartilhado pelo processo."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = StatsManager()
+        return _shared_manager
@@ -0,0 +1,201 @@
+# src/core/storage.py
+
+"""
+Módulo da camada de armazenamento SQLite compartilhada.
+
+CacheManager e HistoryManager usam o mesmo arquivo `cache.db`. Em vez de abrir
+uma conexão nova a cada operação, este módulo mantém uma conexão por thread
+(reaproveitada entre chamadas e fechada quando a thread termina), ativa o modo
+WAL para que leitores não bloqueiem o escritor e serializa todas as escritas do
+processo por um único caminho.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+WRITE_RETRIES = 5
+
+# Pragmas aplicados a cada conexão nova
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # Seguro em WAL e bem mais rápido que FULL
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",    # ~8 MB de cache de páginas por conexão
+    "PRAGMA foreign_keys=ON",
+)
+
+class _ThreadConnection:
+    """A conexão de uma thread. Guardada no `threading.local`: é descartada (e a conexão fechada) quando a thread termina."""
+    __slots__ = ('conn', 'write_depth', '__weakref__')
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.write_depth = 0
+
+class Database:
+    """
+    Acesso thread-safe a um arquivo SQLite.
+
+    Leituras usam a conexão da thread atual e podem ocorrer em paralelo.
+    Escritas passam por `write()`, que adquire um lock do processo e abre uma
+    transação `BEGIN IMMEDIATE`, tentando novamente se outro processo estiver
+    com o banco bloqueado.
+    """
+
+    def __init__(self, db_path: str, busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS):
+        """
+        Inicializa o Database.
+
+        Args:
+            db_path (str): O caminho do arquivo SQLite.
+            busy_timeout_ms (int): Tempo que o SQLite aguarda por um lock antes de desistir.
+        """
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: as transações são controladas explicitamente em write()
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+
+    def _thread_connection(self) -> _ThreadConnection:
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._connect())
+            # Threads de curta duração (pools por playlist, carregamento do histórico, thumbnails)
+            # não podem deixar conexões (e os descritores do banco, do WAL e do SHM) abertas
+            weakref.finalize(holder, self._release, holder.conn)
+        return holder
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def connection(self) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual, criando-a na primeira chamada."""
+        return self._thread_connection().conn
+
+    def open_connections(self) -> int:
+        """Retorna o número de conexões abertas (uma por thread viva que já acessou o banco)."""
+        with self._connections_lock:
+            return len(self._connections)
+
+    @contextmanager
+    def read(self):
+        """Fornece uma conexão para leitura (sem lock do processo)."""
+        yield self.connection()
+
+    @contextmanager
+    def write(self):
+        """
+        Fornece uma conexão dentro de uma transação de escrita.
+
+        A transação é confirmada ao sair do bloco ou desfeita em caso de exceção.
+        Chamadas aninhadas na mesma thread participam da transação externa.
+        """
+        with self._write_lock:
+            holder = self._thread_connection()
+            conn = holder.conn
+            if holder.write_depth:
+                holder.write_depth += 1
+                try:
+                    yield conn
+                finally:
+                    holder.write_depth -= 1
+                return
+
+            self._begin_immediate(conn)
+            holder.write_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                holder.write_depth = 0
+
+    def _begin_immediate(self, conn: sqlite3.Connection):
+        # O busy_timeout já cobre a maior parte da contenção; as novas tentativas
+        # tratam o caso em que outro processo segura o lock por mais tempo.
+        for attempt in range(WRITE_RETRIES):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e).lower() or attempt == WRITE_RETRIES - 1:
+                    raise
+                time.sleep(0.05 * (2 ** attempt))
+
+    def enable_incremental_vacuum(self):
+        """
+        Ativa `auto_vacuum=INCREMENTAL` no banco.
+
+        Em bancos criados sem essa opção, é necessário um VACUUM completo (executado
+        uma única vez) para que a mudança tenha efeito.
+        """
+        with self._write_lock:
+            conn = self.connection()
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("VACUUM")
+
+    def incremental_vacuum(self, pages: int = 0):
+        """
+        Devolve ao sistema de arquivos páginas livres do banco.
+
+        Args:
+            pages (int): Número máximo de páginas a liberar (0 libera todas).
+        """
+        with self._write_lock:
+            self.connection().execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+
+    def close(self):
+        """Fecha todas as conexões abertas por este Database."""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def get_database(db_path: str) -> Database:
+    """
+    Retorna a instância compartilhada de Database para o arquivo informado.
+
+    Todos os gerenciadores que apontam para o mesmo arquivo usam a mesma
+    instância e, portanto, o mesmo caminho de escrita.
+    """
+    key = os.path.abspath(db_path)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = Database(key)
+        return database
@@ -0,0 +1,199 @@
+# src/core/thumbnails.py
+
+"""
+Módulo de cache de thumbnails.
+
+As thumbnails são baixadas por uma `requests.Session` compartilhada (conexões
+TCP/TLS reaproveitadas entre requisições), redimensionadas uma única vez e
+gravadas em disco já no tamanho exibido, com o extrator e o id do vídeo como chave. As
+imagens decodificadas ficam num LRU em memória, e as thumbnails de uma
+playlist podem ser pré-carregadas por um pequeno pool de threads.
+
+`requests` e o Pillow são importados apenas no primeiro uso, para que o núcleo
+possa ser usado sem eles (ex: pela interface de linha de comando).
+"""
+
+import hashlib
+import io
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from .lru import LRUCache
+
+DEFAULT_SIZE = (128, 72)
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+SAFE_KEY_REGEX = re.compile(r'^[A-Za-z0-9_-]{1,96}$')
+
+class ThumbnailCache:
+    """Cache de thumbnails em três camadas: memória (LRU), disco e rede."""
+
+    def __init__(self, cache_dir: str, size: tuple = DEFAULT_SIZE, memory_items: int = 128,
+                 max_workers: int = 4, timeout: float = 10.0):
+        """
+        Inicializa o ThumbnailCache.
+
+        Args:
+            cache_dir (str): Pasta onde as thumbnails redimensionadas são gravadas.
+            size (tuple): Tamanho máximo (largura, altura) das thumbnails.
+            memory_items (int): Número de imagens decodificadas mantidas em memória.
+            max_workers (int): Threads usadas para carregamentos em segundo plano e pré-carregamento.
+            timeout (float): Tempo limite, em segundos, de cada requisição HTTP.
+        """
+        self.cache_dir = cache_dir
+        self.size = tuple(size)
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._memory = LRUCache(memory_items)
+        self._session = None
+        self._pool = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'downloads': 0, 'errors': 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _get_session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(4, self.max_workers))
+                session.mount('http://', adapter); session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+            return self._session
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="thumbnail")
+            return self._pool
+
+    @staticmethod
+    def cache_key(url: str, video_id: str | None = None, extractor: str | None = None) -> str:
+        """
+        Chave da thumbnail: '<extrator>-<id>', se for segura como nome de arquivo, ou um hash da URL.
+
+        O id sozinho não basta: sites diferentes podem usar o mesmo id.
+        """
+        if extractor and video_id:
+            key = f"{extractor.lower()}-{video_id}"
+            if SAFE_KEY_REGEX.match(key):
+                return key
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _count(self, name: str):
+        # Chamado pelas threads do pool: `+=` num dict não é atômico
+        with self._lock:
+            self._stats[name] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}_{self.size[0]}x{self.size[1]}.jpg")
+
+    def get(self, url: str, video_id: str | None = None, extractor: str | None = None):
+        """
+        Retorna a thumbnail redimensionada (PIL.Image), buscando na memória, no disco
+        e, por último, na rede. Requisições simultâneas da mesma thumbnail são unificadas.
+
+        Lança:
+            Exception: Erros de rede ou de decodificação da imagem.
+        """
+        key = self.cache_key(url, video_id, extractor)
+        image = self._memory.get(key)
+        if image is not None:
+            self._count('memory_hits')
+            return image
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            image = self._load(key, url)
+            self._memory.put(key, image)
+            future.set_result(image)
+            return image
+        except Exception as e:
+            self._count('errors')
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _load(self, key: str, url: str):
+        from PIL import Image
+        path = self._disk_path(key)
+        if os.path.exists(path):
+            try:
+                with Image.open(path) as stored:
+                    stored.load()
+                    self._count('disk_hits')
+                    return stored.copy()
+            except OSError:
+                os.remove(path)  # Arquivo corrompido: baixa de novo
+        response = self._get_session().get(url, timeout=self.timeout)
+        response.raise_for_status()
+        self._count('downloads')
+        with Image.open(io.BytesIO(response.content)) as original:
+            # draft() permite ao decodificador JPEG reduzir a imagem já na decodificação
+            original.draft('RGB', self.size)
+            image = original.convert('RGB')
+        image.thumbnail(self.size)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(temp_path, 'JPEG', quality=85)
+        os.replace(temp_path, path)
+        return image
+
+    def get_async(self, url: str, video_id: str | None = None, extractor: str | None = None, callback=None) -> Future:
+        """
+        Carrega a thumbnail em segundo plano.
+
+        Args:
+            callback (callable | None): Chamada (na thread do pool) com `(imagem, erro)`.
+
+        Returns:
+            Future: Resolve para a imagem.
+        """
+        def task():
+            try:
+                image = self.get(url, video_id, extractor)
+            except Exception as e:
+                if callback: callback(None, e)
+                raise
+            if callback: callback(image, None)
+            return image
+        return self._get_pool().submit(task)
+
+    def prefetch(self, items) -> list:
+        """
+        Pré-carrega várias thumbnails (ex: as de uma playlist) no pool de threads.
+
+        Args:
+            items: Iterável de trios (url, video_id, extrator).
+
+        Returns:
+            list: Os Futures dos carregamentos que não estavam em memória.
+        """
+        futures = []
+        for url, video_id, extractor in items:
+            if url and self.cache_key(url, video_id, extractor) not in self._memory:
+                futures.append(self.get_async(url, video_id, extractor))
+        return futures
+
+    def get_stats(self) -> dict:
+        """Retorna os contadores de acertos (memória/disco), downloads e erros."""
+        with self._lock:
+            stats = dict(self._stats)
+        return dict(stats, memory_entries=len(self._memory))
+
+    def close(self):
+        """Encerra o pool de threads e a sessão HTTP."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            session, self._session = self._session, None
+        if pool: pool.shutdown(wait=False, cancel_futures=True)
+        if session: session.close()
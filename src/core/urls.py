@@ -0,0 +1,152 @@
+# src/core/urls.py
+
+"""
+Módulo para canonicalização de URLs.
+
+Uma mesma mídia pode chegar por várias URLs diferentes (`youtu.be/ID`,
+`youtube.com/watch?v=ID&t=30`, `m.youtube.com/...`, parâmetros de rastreamento
+como `si=` e `feature=`). Este módulo mapeia essas variações para uma chave
+estável (extrator, id), usada pelo cache, pelo histórico e pela deduplicação.
+
+Nos sites sem semântica conhecida, parâmetros como `ref` ou `source` e
+subdomínios como `m.` podem selecionar outra mídia: ali só são removidos os
+parâmetros de rastreamento de anúncios (`utm_*`, `fbclid`, `gclid`...).
+"""
+
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Parâmetros de rastreamento que não alteram o conteúdo em nenhum site
+TRACKING_PARAMS = {'fbclid', 'gclid', 'igshid', 'mc_cid', 'mc_eid'}
+TRACKING_PREFIXES = ('utm_',)
+# Parâmetros de compartilhamento removidos apenas nos sites conhecidos (KNOWN_HOSTS)
+KNOWN_SITE_TRACKING_PARAMS = {'si', 'feature', 'ref', 'ref_src', 'ref_url', 'pp', 'ab_channel', 'app', 'source', 'share'}
+
+YOUTUBE_HOSTS = {'youtube.com', 'music.youtube.com', 'youtube-nocookie.com', 'gaming.youtube.com'}
+YOUTUBE_SHORT_HOSTS = {'youtu.be'}
+VIMEO_HOSTS = {'vimeo.com', 'player.vimeo.com'}
+KNOWN_HOSTS = YOUTUBE_HOSTS | YOUTUBE_SHORT_HOSTS | VIMEO_HOSTS
+YOUTUBE_ID_REGEX = re.compile(r'^[A-Za-z0-9_-]{11}$')
+YOUTUBE_PATH_REGEX = re.compile(r'^/(?:shorts|embed|live|v|e)/([A-Za-z0-9_-]{11})(?:[/?]|$)')
+VIMEO_PATH_REGEX = re.compile(r'^/(?:video/)?(\d+)(?:/|$)')
+
+def _normalize_host(host: str) -> str:
+    host = (host or '').lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    # `m.` é a versão móvel apenas nos sites conhecidos; em outros pode ser um site diferente
+    if host.startswith('m.') and host[len('m.'):] in KNOWN_HOSTS:
+        host = host[len('m.'):]
+    return host
+
+def _split(url: str):
+    url = (url or '').strip()
+    if '://' not in url:
+        url = 'https://' + url
+    return urlsplit(url)
+
+def _clean_query(query: str, known_site: bool = False) -> list:
+    drop = TRACKING_PARAMS | KNOWN_SITE_TRACKING_PARAMS if known_site else TRACKING_PARAMS
+    params = []
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        lowered = key.lower()
+        if lowered in drop or lowered.startswith(TRACKING_PREFIXES):
+            continue
+        params.append((key, value))
+    return sorted(params)
+
+def _youtube_key(host: str, path: str, query: dict, playlist: bool) -> tuple | None:
+    if playlist and query.get('list'):
+        return ('youtube:playlist', query['list'])
+    if host in YOUTUBE_SHORT_HOSTS:
+        video_id = path.strip('/').split('/')[0]
+        return ('youtube', video_id) if YOUTUBE_ID_REGEX.match(video_id) else None
+    if path in ('/watch', '/watch/') and YOUTUBE_ID_REGEX.match(query.get('v', '')):
+        return ('youtube', query['v'])
+    match = YOUTUBE_PATH_REGEX.match(path)
+    if match:
+        return ('youtube', match.group(1))
+    if path.rstrip('/') == '/playlist' and query.get('list'):
+        return ('youtube:playlist', query['list'])
+    return None
+
+def media_key(url: str, playlist: bool = False) -> tuple | None:
+    """
+    Identifica a mídia apontada por uma URL.
+
+    Args:
+        url (str): A URL original.
+        playlist (bool): Se verdadeiro, URLs com uma playlist (ex: `watch?v=X&list=Y`)
+            são identificadas pela playlist, e não pelo vídeo.
+
+    Returns:
+        tuple | None: (extrator, id), ex: ('youtube', 'dQw4w9WgXcQ'), ou None se
+        o site não for reconhecido.
+    """
+    parts = _split(url)
+    host = _normalize_host(parts.hostname)
+    query = dict(parse_qsl(parts.query))
+    if host in YOUTUBE_HOSTS or host in YOUTUBE_SHORT_HOSTS:
+        return _youtube_key(host, parts.path, query, playlist)
+    if host in VIMEO_HOSTS:
+        match = VIMEO_PATH_REGEX.match(parts.path)
+        return ('vimeo', match.group(1)) if match else None
+    return None
+
+def canonicalize_url(url: str, playlist: bool = False) -> str:
+    """
+    Normaliza uma URL: host em minúsculas e sem `www.` (e sem `m.` nos sites
+    conhecidos), sem fragmento, sem parâmetros de rastreamento e com a query ordenada. Mídias reconhecidas
+    são reescritas para a sua forma canônica (ex: `https://www.youtube.com/watch?v=ID`).
+
+    Args:
+        url (str): A URL original.
+        playlist (bool): Ver `media_key`.
+
+    Returns:
+        str: A URL canônica.
+    """
+    key = media_key(url, playlist=playlist)
+    if key:
+        extractor, media_id = key
+        if extractor == 'youtube':
+            return f"https://www.youtube.com/watch?v={media_id}"
+        if extractor == 'youtube:playlist':
+            return f"https://www.youtube.com/playlist?list={media_id}"
+        if extractor == 'vimeo':
+            return f"https://vimeo.com/{media_id}"
+
+    parts = _split(url)
+    scheme = parts.scheme.lower()
+    host = _normalize_host(parts.hostname)
+    query = _clean_query(parts.query, known_site=host in KNOWN_HOSTS)
+    port = parts.port
+    if port and not ((scheme == 'http' and port == 80) or (scheme == 'https' and port == 443)):
+        host = f"{host}:{port}"
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((scheme, host, path, urlencode(query), ''))
+
+def cache_key(url: str, playlist: bool = False) -> str:
+    """
+    Retorna a chave usada para indexar uma URL no cache e no histórico.
+
+    Returns:
+        str: 'extrator:id' para mídias reconhecidas, ou a URL canônica nos demais casos.
+    """
+    key = media_key(url, playlist=playlist)
+    if key:
+        return f"{key[0]}:{key[1]}"
+    return canonicalize_url(url, playlist=playlist)
+
+def site_host(url: str) -> str:
+    """
+    Retorna o site de uma URL, usado para limitar as conexões simultâneas por origem.
+
+    Variações do mesmo site são unificadas (ex: `youtu.be` e `m.youtube.com` -> 'youtube.com').
+    """
+    host = _normalize_host(_split(url).hostname)
+    if host in YOUTUBE_HOSTS or host in YOUTUBE_SHORT_HOSTS:
+        return 'youtube.com'
+    if host == 'player.vimeo.com':
+        return 'vimeo.com'
+    return host
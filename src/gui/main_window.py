@@ -3,30 +3,44 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-import io
+import os
 import datetime
-from PIL import Image, ImageTk
-import requests
 
 from ..core.downloader import Downloader
-from ..core.config import load_config
-from ..core.exceptions import DownloaderError, NetworkError, InvalidURLError, FileSystemError, FormatSelectionError
+from ..core.config import get_config
+from ..core.exceptions import DownloaderError, NetworkError, InvalidURLError, FormatSelectionError
 from ..core.history import HistoryManager
+from ..core.thumbnails import ThumbnailCache
+from ..core.formats import FormatPolicy, get_format_index, format_bytes, FLAC_OPTION_ID
+from ..core.scheduler import DownloadScheduler, DownloadJob, JobStatus
+from .ui_pump import UiPump
 
 class MainWindow:
+    HISTORY_PAGE_SIZE = 200
+    THUMBNAIL_PREFETCH_LIMIT = 50
+
     def __init__(self, root):
         self.root = root
         self.root.title("Super Downloader v7.1 - Playlist Robusta")
         self.root.geometry("800x750")
 
-        self.config = load_config()
-        self.downloader = Downloader(logger_callback=self.log)
-        self.history_manager = HistoryManager()
+        self.config = get_config()
+        # Criada antes do Downloader: as mensagens de log ficam enfileiradas até os widgets existirem
+        self.ui_pump = UiPump(self.root)
+        # Criados fora da thread do Tk depois da primeira pintura (ver _build_core): abrem o cache (com um possível
+        # VACUUM), o diário de jobs e o arquivo de downloads, o que atrasaria a primeira janela
+        self.downloader = self.scheduler = self.history_manager = self.thumbnails = None
+        self._closing = False
         self.video_info = None
         self.available_formats = {'video': [], 'audio': []}
+        self._history_generation = 0; self._history_cursor = None; self._history_last_id = 0; self._history_has_more = False; self._history_loading = False
+        self._history_query = ''; self._history_search_job = None
 
         self._create_widgets()
-        self.load_history()
+        self.ui_pump.start(self.log_text, self.progress_frame)
+        self._set_ui_state(search_state='disabled'); self.title_label.config(text="Título: (Carregando...)")
+        self.root.after_idle(self._after_first_paint)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
     def _create_widgets(self):
         self.notebook = ttk.Notebook(self.root)
@@ -66,13 +80,14 @@ class MainWindow:
         buttons_frame = ttk.Frame(action_log_frame); buttons_frame.pack(pady=5)
         self.download_video_button = ttk.Button(buttons_frame, text="Baixar Vídeo Completo", command=self.start_video_download_thread, state="disabled"); self.download_video_button.pack(side="left", padx=5)
         self.download_audio_button = ttk.Button(buttons_frame, text="Baixar Apenas Áudio", command=self.start_audio_download_thread, state="disabled"); self.download_audio_button.pack(side="left", padx=5)
+        self.progress_frame = ttk.LabelFrame(action_log_frame, text="Downloads em Andamento"); self.progress_frame.pack(fill="x", pady=(5,0))
         log_frame = ttk.LabelFrame(action_log_frame, text="Logs"); log_frame.pack(fill="both", expand=True, pady=(10,0))
         self.log_text = tk.Text(log_frame, height=8, state="disabled", wrap="word"); self.log_text.pack(side="left", fill="both", expand=True, padx=5, pady=5)
         log_scrollbar = ttk.Scrollbar(log_frame, orient="vertical", command=self.log_text.yview); log_scrollbar.pack(side="right", fill="y", pady=5, padx=(0,5)); self.log_text.config(yscrollcommand=log_scrollbar.set)
 
     def fetch_video_info_thread(self):
         url = self.url_entry.get()
-        if not url: return
+        if not url or self.downloader is None: return
         self.log(f"Buscando informações para a URL...", "info")
         self._set_ui_state(search_state='disabled', download_state='disabled')
         download_playlist = self.playlist_var.get()
@@ -96,7 +111,7 @@ class MainWindow:
         
         is_playlist = self.playlist_var.get() and self.video_info.get('_type') == 'playlist'
         
-        thumbnail_url = None
+        thumbnail_url = thumbnail_info = None
         if is_playlist:
             all_entries = self.video_info.get('entries', [])
             valid_entries = [entry for entry in all_entries if entry]
@@ -115,7 +130,10 @@ class MainWindow:
             self.title_label.config(text=f"Playlist: {title}")
             self.uploader_label.config(text=f"Canal: {uploader}")
             self.details_label.config(text=f"Vídeos: {available_count} de {total_count} disponíveis")
-            if valid_entries: thumbnail_url = valid_entries[0].get('thumbnail')
+            if valid_entries: thumbnail_url = valid_entries[0].get('thumbnail'); thumbnail_info = valid_entries[0]
+            # As demais thumbnails da playlist são pré-carregadas em segundo plano
+            self.thumbnails.prefetch((entry.get('thumbnail'), entry.get('id'), entry.get('extractor_key') or entry.get('ie_key'))
+                                     for entry in valid_entries[1:self.THUMBNAIL_PREFETCH_LIMIT])
         else:
             title = self.video_info.get('title', 'Título não encontrado')
             uploader = self.video_info.get('uploader', 'Canal não encontrado')
@@ -124,11 +142,11 @@ class MainWindow:
             self.title_label.config(text=f"Título: {title}")
             self.uploader_label.config(text=f"Canal: {uploader}")
             self.details_label.config(text=f"Duração: {duration_str}")
-            thumbnail_url = self.video_info.get('thumbnail')
+            thumbnail_url = self.video_info.get('thumbnail'); thumbnail_info = self.video_info
 
         self.populate_format_selectors()
         self._set_ui_state("normal", "normal")
-        if thumbnail_url: threading.Thread(target=self._load_thumbnail, args=(thumbnail_url,), daemon=True).start()
+        if thumbnail_url: self._load_thumbnail(thumbnail_url, thumbnail_info.get('id'), thumbnail_info.get('extractor_key') or thumbnail_info.get('ie_key'))
 
     def populate_format_selectors(self):
         self.available_formats = {'video': [], 'audio': []}; video_display_list = []; audio_display_list = []
@@ -146,59 +164,49 @@ class MainWindow:
             formats_source = self.video_info
 
         try:
-            video_formats = [f for f in formats_source.get('formats', []) if f and f.get('vcodec', 'none').startswith('avc1') and f.get('acodec') == 'none']
-            audio_formats = [f for f in formats_source.get('formats', []) if f and f.get('ext') == 'm4a' and f.get('acodec', 'none').startswith('mp4a')]
-            best_videos = {};
-            for f in sorted(video_formats, key=lambda x: (x.get('filesize') or x.get('filesize_approx') or 0), reverse=True):
-                height = f.get('height')
-                if height and height not in best_videos: best_videos[height] = f
-            sorted_videos = sorted(best_videos.values(), key=lambda x: (x.get('height') or 0), reverse=True)
-            sorted_audios = sorted(audio_formats, key=lambda x: (x.get('abr') or 0), reverse=True)
-            audio_display_list.append("FLAC (Melhor Qualidade)"); self.available_formats['audio'].append({'text': "FLAC (Melhor Qualidade)", 'id': 'flac'})
-            for f in sorted_videos:
-                filesize = self.format_bytes(f.get('filesize') or f.get('filesize_approx')); fps_str = f"({f['fps']}fps) " if f.get('fps') else ""
-                display_text = f"{f.get('height')}p {fps_str}- {f.get('ext')} [{filesize}]"
-                self.available_formats['video'].append({'text': display_text, 'id': f['format_id']}); video_display_list.append(display_text)
-            for f in sorted_audios:
-                filesize = self.format_bytes(f.get('filesize') or f.get('filesize_approx')); abr_val = f.get('abr')
-                display_text = f"{round(abr_val)}kbps - {f.get('ext')} [{filesize}]" if abr_val else f"{f.get('ext')} [{filesize}]"
-                self.available_formats['audio'].append({'text': display_text, 'id': f['format_id']}); audio_display_list.append(display_text)
+            index = get_format_index(formats_source); policy = FormatPolicy.from_config(self.config)
+            self.available_formats = {'video': policy.video_options(index), 'audio': policy.audio_options(index)}
+            video_display_list = [option['label'] for option in self.available_formats['video']]; audio_display_list = [option['label'] for option in self.available_formats['audio']]
         except Exception as e: self.log(f"Erro ao processar formatos: {e}", "error"); video_display_list, audio_display_list = [], []
         self.video_format_combo['values'] = video_display_list; self.audio_format_combo['values'] = audio_display_list
-        if video_display_list: self.video_format_combo.current(0)
+        if video_display_list: self.video_format_combo.current(policy.default_video_index(self.available_formats['video']))
         else: self.video_format_combo.set("Nenhum formato compatível")
         if audio_display_list: self.audio_format_combo.current(0)
         else: self.audio_format_combo.set("Nenhum formato compatível")
 
+    def _selected_format_id(self, kind, combo):
+        """Retorna o id do formato selecionado no combo, pela posição na lista de opções."""
+        position = combo.current(); options = self.available_formats[kind]
+        return options[position]['id'] if 0 <= position < len(options) else None
+
     def start_video_download_thread(self):
         download_playlist = self.playlist_var.get()
         url = self.url_entry.get()
         if not url: messagebox.showwarning("URL Vazia", "Por favor, insira uma URL para baixar."); return
         try:
-            selected_video_text = self.video_format_combo.get(); selected_audio_text = self.audio_format_combo.get()
-            video_id = next((f['id'] for f in self.available_formats['video'] if f['text'] == selected_video_text), None)
-            audio_id = next((f['id'] for f in self.available_formats['audio'] if f['text'] == selected_audio_text), None)
-            if audio_id == 'flac': raise FormatSelectionError("FLAC é apenas para download de áudio. Escolha outro formato de áudio para baixar o vídeo completo.")
+            video_id = self._selected_format_id('video', self.video_format_combo); audio_id = self._selected_format_id('audio', self.audio_format_combo)
+            if audio_id == FLAC_OPTION_ID: raise FormatSelectionError("FLAC é apenas para download de áudio. Escolha outro formato de áudio para baixar o vídeo completo.")
             if not video_id or not audio_id: raise FormatSelectionError("Selecione um formato de vídeo e áudio válido.")
             format_code = f"{video_id}+{audio_id}"
         except Exception as e: messagebox.showerror("Erro de Formato", str(e)); return
-        self._set_ui_state('disabled', 'disabled')
-        self.log(f"Preparando para baixar VÍDEO: {self.video_info.get('title', url)}", "info")
-        threading.Thread(target=self.run_video_download, args=(url, format_code, download_playlist), daemon=True).start()
+        if not download_playlist and not self.config.get("use_download_archive") and self.history_manager.has_entry(url): self.log("Este vídeo já consta no histórico de downloads; baixando novamente.", "warning")
+        job = self.scheduler.submit(url, format_code, kind=DownloadJob.KIND_VIDEO, download_playlist=download_playlist)
+        self.log(f"Download de VÍDEO enfileirado (job #{job.id}): {self.video_info.get('title', url)}", "info")
+        self._watch_job(job)
 
     def start_audio_download_thread(self):
         download_playlist = self.playlist_var.get()
         url = self.url_entry.get()
         if not url: messagebox.showwarning("URL Vazia", "Por favor, insira uma URL para baixar."); return
         try:
-            selected_audio_text = self.audio_format_combo.get()
-            if not selected_audio_text: raise FormatSelectionError("Selecione um formato de áudio.")
-            audio_id = next((f['id'] for f in self.available_formats['audio'] if f['text'] == selected_audio_text), None)
+            if not self.audio_format_combo.get(): raise FormatSelectionError("Selecione um formato de áudio.")
+            audio_id = self._selected_format_id('audio', self.audio_format_combo)
             if not audio_id: raise FormatSelectionError("Formato de áudio inválido selecionado.")
         except Exception as e: messagebox.showerror("Erro de Formato", str(e)); return
-        self._set_ui_state('disabled', 'disabled')
-        self.log(f"Preparando para baixar ÁUDIO: {self.video_info.get('title', url)}", "info")
-        threading.Thread(target=self.run_audio_download, args=(url, audio_id, download_playlist), daemon=True).start()
+        if not download_playlist and not self.config.get("use_download_archive") and self.history_manager.has_entry(url): self.log("Este vídeo já consta no histórico de downloads; baixando novamente.", "warning")
+        job = self.scheduler.submit(url, audio_id, kind=DownloadJob.KIND_AUDIO, download_playlist=download_playlist)
+        self.log(f"Download de ÁUDIO enfileirado (job #{job.id}): {self.video_info.get('title', url)}", "info")
+        self._watch_job(job)
 
     # --- Métodos restantes (sem alterações significativas) ---
     def _create_widgets(self): self.notebook = ttk.Notebook(self.root); self.notebook.pack(pady=10, padx=10, fill="both", expand=True); self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change); self._create_download_tab(); self._create_history_tab()
@@ -214,50 +222,157 @@ class MainWindow:
         history_actions_frame = ttk.Frame(history_frame); history_actions_frame.pack(fill="x", padx=10, pady=5)
         refresh_button = ttk.Button(history_actions_frame, text="Atualizar", command=self.load_history); refresh_button.pack(side="left")
         clear_button = ttk.Button(history_actions_frame, text="Limpar Histórico", command=self.clear_history); clear_button.pack(side="right")
+        ttk.Label(history_actions_frame, text="Buscar:").pack(side="left", padx=(15, 5))
+        self.history_search_var = tk.StringVar(); self.history_search_var.trace_add("write", self._on_history_search_changed)
+        history_search_entry = ttk.Entry(history_actions_frame, textvariable=self.history_search_var, width=40); history_search_entry.pack(side="left", fill="x", expand=True)
         columns = ("title", "url", "date", "size", "status"); self.history_tree = ttk.Treeview(history_frame, columns=columns, show="headings")
         self.history_tree.heading("title", text="Título"); self.history_tree.heading("url", text="URL"); self.history_tree.heading("date", text="Data"); self.history_tree.heading("size", text="Tamanho"); self.history_tree.heading("status", text="Status")
         self.history_tree.column("title", width=300); self.history_tree.column("url", width=150); self.history_tree.column("date", width=120, anchor="center"); self.history_tree.column("size", width=80, anchor="e"); self.history_tree.column("status", width=80, anchor="center")
         self.history_tree.pack(fill="both", expand=True, padx=10, pady=10)
-        tree_scrollbar_y = ttk.Scrollbar(self.history_tree, orient="vertical", command=self.history_tree.yview); self.history_tree.configure(yscrollcommand=tree_scrollbar_y.set); tree_scrollbar_y.pack(side="right", fill="y")
+        self.history_scrollbar_y = ttk.Scrollbar(self.history_tree, orient="vertical", command=self.history_tree.yview); self.history_tree.configure(yscrollcommand=self._on_history_scroll); self.history_scrollbar_y.pack(side="right", fill="y")
         tree_scrollbar_x = ttk.Scrollbar(self.history_tree, orient="horizontal", command=self.history_tree.xview); self.history_tree.configure(xscrollcommand=tree_scrollbar_x.set); tree_scrollbar_x.pack(side="bottom", fill="x")
-    def format_bytes(self, size_bytes):
-        if not size_bytes or size_bytes == 0: return "N/A"
-        power = 1024; n = 0; power_labels = {0: '', 1: 'KB', 2: 'MB', 3: 'GB', 4: 'TB'}
-        while size_bytes >= power and n < len(power_labels): size_bytes /= power; n += 1
-        return f"{size_bytes:.2f} {power_labels[n]}"
+    def format_bytes(self, size_bytes): return format_bytes(size_bytes)
     def log(self, message, level="info"):
-        self.log_text.config(state="normal"); tag = f"log_{level}"; self.log_text.tag_configure(tag, foreground={"info": "blue", "warning": "orange", "error": "red", "critical": "darkred"}.get(level, "black")); self.log_text.insert(tk.END, f"[{level.upper()}] {message}\n", tag); self.log_text.config(state="disabled"); self.log_text.see(tk.END)
-    def _load_thumbnail(self, url):
-        try:
-            response = requests.get(url, timeout=10); response.raise_for_status(); img_data = response.content
-            img = Image.open(io.BytesIO(img_data)); img.thumbnail((128, 72)); photo = ImageTk.PhotoImage(img)
-            self.root.after(0, lambda: self._update_thumbnail_label(photo))
-        except Exception as e: self.log(f"Não foi possível carregar a thumbnail: {e}", "warning")
-    def _update_thumbnail_label(self, photo): self.thumbnail_label.config(image=photo); self.thumbnail_label.image = photo
+        """Registra uma mensagem no log. Pode ser chamada de qualquer thread (ver UiPump)."""
+        self.ui_pump.post_log(message, level)
+    def _on_job_progress(self, job):
+        # Chamado na thread de trabalho a cada evento do yt-dlp; a UiPump exibe apenas o mais recente de cada job
+        progress = job.progress; playlist = progress.get('playlist')
+        downloaded = progress.get('downloaded_bytes') or 0; total = progress.get('total_bytes')
+        text = f"#{job.id} {progress.get('title') or job.url}"
+        if playlist:
+            fraction = playlist['finished'] / playlist['total'] if playlist['total'] else None; text += f" ({playlist['finished']}/{playlist['total']})"
+        else:
+            fraction = downloaded / total if total else None
+        if downloaded: text += f" - {self.format_bytes(downloaded)}" + (f" de {self.format_bytes(total)}" if total else "")
+        if progress.get('speed') and progress.get('status') == 'downloading': text += f" - {self.format_bytes(progress['speed'])}/s"
+        self.ui_pump.post_progress(job.id, fraction, text)
+    def _load_thumbnail(self, url, video_id=None, extractor=None):
+        """Carrega a thumbnail via ThumbnailCache (memória, disco ou rede) fora da thread do Tk."""
+        def on_loaded(image, error):
+            if error: self.log(f"Não foi possível carregar a thumbnail: {error}", "warning")
+            else: self.root.after(0, self._update_thumbnail_label, image)
+        self.thumbnails.get_async(url, video_id, extractor, callback=on_loaded)
+    def _update_thumbnail_label(self, image):
+        from PIL import ImageTk  # Carregado só na primeira thumbnail exibida
+        # O PhotoImage precisa ser criado na thread do Tk
+        photo = ImageTk.PhotoImage(image); self.thumbnail_label.config(image=photo); self.thumbnail_label.image = photo
     def load_history(self):
-        for i in self.history_tree.get_children(): self.history_tree.delete(i)
-        entries = self.history_manager.get_all_entries()
-        for entry in entries:
-            title, url, date_str, size_bytes, status = entry; date_obj = datetime.datetime.fromisoformat(date_str); display_date = date_obj.strftime("%d/%m/%Y %H:%M"); display_size = self.format_bytes(size_bytes)
-            self.history_tree.insert("", tk.END, values=(title, url, display_date, display_size, status))
-    def run_video_download(self, url, format_code, download_playlist):
+        """Recarrega o histórico do zero, buscando apenas a primeira página (fora da thread do Tk)."""
+        if self.history_manager is None: return  # Carregado quando a inicialização terminar (ver _on_core_ready)
+        self._history_generation += 1; self._history_cursor = None; self._history_last_id = 0; self._history_has_more = False; self._history_loading = False
+        self._history_query = self.history_search_var.get().strip()
+        self.history_tree.delete(*self.history_tree.get_children())
+        self._load_more_history()
+    def _load_more_history(self):
+        if self._history_loading: return
+        self._history_loading = True
+        threading.Thread(target=self._fetch_history_page, args=(self._history_generation, self._history_cursor, self._history_query), daemon=True).start()
+    def _fetch_history_page(self, generation, cursor, query):
         try:
-            self.downloader.download(url, format_code, download_playlist=download_playlist)
-            self.log("Download de vídeo concluído e salvo no histórico.", "info")
-            self.root.after(0, self.load_history)
-        except (InvalidURLError, NetworkError, FileSystemError, DownloaderError, FormatSelectionError) as e:
-            self.log(f"Falha no Download: {e}", "error"); messagebox.showerror("Falha no Download", f"Não foi possível completar o download.\nDetalhes: {e}")
-        finally: self._set_ui_state('normal', 'normal')
-    def run_audio_download(self, url, audio_format, download_playlist):
+            # Em modo de busca o cursor é o deslocamento (offset) dos resultados já exibidos
+            if query: rows = self.history_manager.search(query, limit=self.HISTORY_PAGE_SIZE, offset=cursor or 0)
+            else: rows = self.history_manager.get_page(self.HISTORY_PAGE_SIZE, before_id=cursor)
+            formatted = self._format_history_rows(rows)
+        except Exception as e:
+            self.root.after(0, self._history_load_failed, generation, e); return
+        self.root.after(0, self._append_history_rows, generation, rows, formatted)
+    def _history_load_failed(self, generation, error):
+        # Libera o carregamento: a próxima rolagem (ou recarga) tenta de novo
+        if generation == self._history_generation: self._history_loading = False
+        self.log(f"Erro ao carregar o histórico de downloads: {error}", "error")
+    def _on_history_search_changed(self, *args):
+        # Debounce: só busca quando o usuário para de digitar por um instante
+        if self._history_search_job: self.root.after_cancel(self._history_search_job)
+        self._history_search_job = self.root.after(250, self._run_history_search)
+    def _run_history_search(self):
+        self._history_search_job = None
+        if self.history_search_var.get().strip() != self._history_query: self.load_history()
+    def _format_history_rows(self, rows):
+        formatted = []
+        for row_id, title, url, date_str, size_bytes, status in rows:
+            display_date = datetime.datetime.fromisoformat(date_str).strftime("%d/%m/%Y %H:%M"); formatted.append((str(row_id), (title, url, display_date, self.format_bytes(size_bytes), status)))
+        return formatted
+    def _append_history_rows(self, generation, rows, formatted):
+        if generation != self._history_generation: return  # Resultado de uma recarga anterior
+        self._history_loading = False
+        for iid, values in formatted:
+            if not self.history_tree.exists(iid): self.history_tree.insert("", tk.END, iid=iid, values=values)
+        if rows and self._history_query:
+            self._history_cursor = (self._history_cursor or 0) + len(rows)
+        elif rows:
+            self._history_cursor = rows[-1][0]; self._history_last_id = max(self._history_last_id, max(row[0] for row in rows))
+        self._history_has_more = len(rows) == self.HISTORY_PAGE_SIZE
+    def _on_history_scroll(self, first, last):
+        self.history_scrollbar_y.set(first, last)
+        if self._history_has_more and float(last) > 0.9: self._load_more_history()
+    def refresh_history(self):
+        """Insere no topo apenas os registros adicionados desde a última carga."""
+        # Os resultados de uma busca não são atualizados incrementalmente; antes da inicialização não há histórico
+        if self._history_query or self.history_manager is None: return
+        # A primeira página ainda está a caminho e já trará os registros novos
+        if self._history_loading and not self._history_last_id: return
+        generation, last_id = self._history_generation, self._history_last_id
+        def fetch():
+            try:
+                rows = self.history_manager.get_entries_since(last_id, limit=self.HISTORY_PAGE_SIZE)
+                formatted = self._format_history_rows(rows)
+            except Exception as e:
+                self.root.after(0, self.log, f"Erro ao atualizar o histórico de downloads: {e}", "error"); return
+            # Mais registros novos que uma página: recarrega do zero em vez de deixar um buraco na lista
+            if len(rows) == self.HISTORY_PAGE_SIZE: self.root.after(0, self.load_history)
+            elif rows: self.root.after(0, self._prepend_history_rows, generation, rows, formatted)
+        threading.Thread(target=fetch, daemon=True).start()
+    def _prepend_history_rows(self, generation, rows, formatted):
+        if generation != self._history_generation: return
+        for iid, values in reversed(formatted):
+            if not self.history_tree.exists(iid): self.history_tree.insert("", 0, iid=iid, values=values)
+        self._history_last_id = max(self._history_last_id, max(row[0] for row in rows))
+    def _watch_job(self, job):
+        job.add_progress_callback(self._on_job_progress)
+        job.add_done_callback(lambda j: self.root.after(0, self.on_job_done, j))
+    def _after_first_paint(self):
+        threading.Thread(target=self._build_core, name="gui-startup", daemon=True).start()
+    def _build_core(self):
         try:
-            self.downloader.download_audio(url, audio_format, download_playlist=download_playlist)
-            self.log("Download de áudio concluído e salvo no histórico.", "info")
-            self.root.after(0, self.load_history)
-        except (InvalidURLError, NetworkError, FileSystemError, DownloaderError, FormatSelectionError) as e:
-            self.log(f"Falha no Download de Áudio: {e}", "error"); messagebox.showerror("Falha no Download", f"Não foi possível completar o download.\nDetalhes: {e}")
-        finally: self._set_ui_state('normal', 'normal')
+            downloader = Downloader(logger_callback=self.log); scheduler = DownloadScheduler(downloader)
+            history_manager = HistoryManager(logger_callback=self.log)
+            thumbnails = ThumbnailCache(os.path.join(self.config.get('download_path', 'downloads'), '.thumbnails'))
+        except Exception as e:
+            self.log(f"Erro ao inicializar o downloader: {e}", "critical"); return
+        try: self.root.after(0, self._on_core_ready, downloader, scheduler, history_manager, thumbnails)
+        except (RuntimeError, tk.TclError): scheduler.shutdown(wait=False, cancel_pending=True)  # A janela já foi fechada
+    def _on_core_ready(self, downloader, scheduler, history_manager, thumbnails):
+        if self._closing:
+            scheduler.shutdown(wait=False, cancel_pending=True); thumbnails.close(); return
+        self.downloader, self.scheduler, self.history_manager, self.thumbnails = downloader, scheduler, history_manager, thumbnails
+        self.title_label.config(text="Título: (Aguardando URL...)"); self._set_ui_state(search_state='normal')
+        self._resume_pending_jobs()
+        self.load_history()
+    def _resume_pending_jobs(self):
+        """Retoma os downloads que não terminaram na execução anterior (ver JobJournal)."""
+        for job in self.scheduler.resume_pending():
+            if job.done:
+                self.log(f"Download interrompido não retomado (job #{job.id}): {job.error} {job.url}", "warning"); continue
+            partial = f", continuando {self.format_bytes(job.resumed_bytes)} já baixados" if job.resumed_bytes else ""
+            self.log(f"Retomando download interrompido (job #{job.id}){partial}: {job.url}", "info"); self._watch_job(job)
+    def on_job_done(self, job):
+        self.ui_pump.post_progress(job.id, 1.0, "", finished=True)
+        kind_label = "áudio" if job.kind == DownloadJob.KIND_AUDIO else "vídeo"
+        if job.status == JobStatus.COMPLETED:
+            self.log(f"Download de {kind_label} (job #{job.id}) concluído e salvo no histórico.", "info")
+            self.refresh_history()
+        elif job.status == JobStatus.SKIPPED:
+            self.log(f"Download de {kind_label} (job #{job.id}) ignorado: o conteúdo já havia sido baixado anteriormente.", "info")
+        elif job.status == JobStatus.FAILED:
+            self.log(f"Falha no Download de {kind_label} (job #{job.id}): {job.error}", "error"); messagebox.showerror("Falha no Download", f"Não foi possível completar o download.\nDetalhes: {job.error}")
+    def on_close(self):
+        self._closing = True
+        if self.scheduler: self.scheduler.shutdown(wait=False, cancel_pending=True); self.downloader.history_manager.close(); self.thumbnails.close()
+        self.ui_pump.stop(); self.root.destroy()
     def clear_history(self):
+        if self.history_manager is None: return
         if messagebox.askyesno("Confirmar", "Você tem certeza que deseja apagar todo o histórico de downloads? Esta ação não pode ser desfeita."): self.history_manager.clear_history(); self.load_history(); self.log("Histórico de downloads foi limpo.", "warning")
     def on_tab_change(self, event):
-        if self.notebook.index(self.notebook.select()) == 1: self.load_history()
+        if self.notebook.index(self.notebook.select()) == 1: self.refresh_history()
 
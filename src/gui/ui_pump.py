@@ -0,0 +1,144 @@
+# src/gui/ui_pump.py
+
+"""
+Bomba de atualizações da interface (log e barras de progresso).
+
+O Tkinter não é thread-safe: os widgets só podem ser tocados pela thread do
+loop principal. As threads de trabalho apenas enfileiram mensagens de log e
+atualizações de progresso; a bomba as aplica na thread do Tk via `root.after`,
+agrupando todas as mensagens pendentes em uma única inserção por quadro e
+mantendo apenas a atualização mais recente de cada job (as intermediárias são
+descartadas). O texto do log é limitado a `max_log_lines` linhas.
+"""
+
+import queue
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk
+
+LOG_COLORS = {"info": "blue", "warning": "orange", "error": "red", "critical": "darkred"}
+
+class UiPump:
+    """Aplica na thread do Tk as atualizações enviadas por qualquer thread."""
+
+    def __init__(self, root, interval_ms: int = 50, progress_interval_ms: int = 200,
+                 max_log_lines: int = 2000, max_messages_per_tick: int = 500):
+        """
+        Inicializa a UiPump.
+
+        Args:
+            root (tk.Tk): A janela principal.
+            interval_ms (int): Intervalo entre drenagens da fila de log.
+            progress_interval_ms (int): Intervalo mínimo entre redesenhos das barras de progresso.
+            max_log_lines (int): Número máximo de linhas mantidas no log.
+            max_messages_per_tick (int): Limite de mensagens inseridas por quadro (o restante fica para o próximo).
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self.progress_interval = progress_interval_ms / 1000
+        self.max_log_lines = max_log_lines
+        self.max_messages_per_tick = max_messages_per_tick
+        self._messages = queue.SimpleQueue()
+        self._progress = {}
+        self._progress_lock = threading.Lock()
+        self._last_progress_draw = 0.0
+        self._bars = {}
+        self.log_text = None
+        self.progress_frame = None
+        self._after_id = None
+
+    def start(self, log_text: tk.Text, progress_frame: ttk.Frame):
+        """Associa os widgets (já criados) e inicia a drenagem periódica."""
+        self.log_text = log_text
+        self.progress_frame = progress_frame
+        for level, color in LOG_COLORS.items():
+            self.log_text.tag_configure(f"log_{level}", foreground=color)
+        self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self._after_id:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def post_log(self, message: str, level: str = "info"):
+        """Enfileira uma mensagem de log. Pode ser chamada de qualquer thread."""
+        self._messages.put((message, level))
+
+    def post_progress(self, job_id: int, fraction: float | None, text: str, finished: bool = False):
+        """
+        Publica o progresso de um job. Pode ser chamada de qualquer thread; apenas a
+        última atualização de cada job até o próximo redesenho é exibida.
+
+        Args:
+            job_id (int): O job.
+            fraction (float | None): Progresso entre 0 e 1, ou None se desconhecido.
+            text (str): O texto exibido ao lado da barra.
+            finished (bool): Remove a barra do job.
+        """
+        with self._progress_lock:
+            self._progress[job_id] = (fraction, text, finished)
+
+    def _tick(self):
+        try:
+            self._drain_log()
+            now = time.monotonic()
+            if now - self._last_progress_draw >= self.progress_interval:
+                self._last_progress_draw = now
+                self._draw_progress()
+        finally:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _drain_log(self):
+        chunks = []
+        for _ in range(self.max_messages_per_tick):
+            try:
+                message, level = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            tag = f"log_{level}"
+            if level not in LOG_COLORS:
+                self.log_text.tag_configure(tag, foreground="black")
+            chunks.extend((f"[{level.upper()}] {message}\n", tag))
+        if not chunks:
+            return
+        self.log_text.config(state="normal")
+        self.log_text.insert(tk.END, *chunks)
+        # Mantém apenas as últimas max_log_lines linhas ("end-1c" fica no início da linha vazia final)
+        line_count = int(self.log_text.index("end-1c").split(".")[0]) - 1
+        if line_count > self.max_log_lines:
+            self.log_text.delete("1.0", f"{line_count - self.max_log_lines + 1}.0")
+        self.log_text.config(state="disabled")
+        self.log_text.see(tk.END)
+
+    def _draw_progress(self):
+        with self._progress_lock:
+            updates, self._progress = self._progress, {}
+        for job_id, (fraction, text, finished) in updates.items():
+            bar = self._bars.get(job_id)
+            if finished:
+                if bar:
+                    bar['frame'].destroy()
+                    del self._bars[job_id]
+                continue
+            if bar is None:
+                bar = self._bars[job_id] = self._create_bar()
+            if fraction is None:
+                if str(bar['bar'].cget("mode")) != "indeterminate":
+                    bar['bar'].config(mode="indeterminate")
+                    bar['bar'].start(20)
+            else:
+                if str(bar['bar'].cget("mode")) != "determinate":
+                    bar['bar'].stop()
+                    bar['bar'].config(mode="determinate")
+                bar['bar']['value'] = max(0.0, min(fraction, 1.0)) * 100
+            bar['label'].config(text=text)
+
+    def _create_bar(self) -> dict:
+        frame = ttk.Frame(self.progress_frame)
+        frame.pack(fill="x", padx=5, pady=1)
+        label = ttk.Label(frame, width=60, anchor="w")
+        label.pack(side="left", fill="x", expand=True)
+        bar = ttk.Progressbar(frame, orient="horizontal", length=200, mode="determinate", maximum=100)
+        bar.pack(side="right", padx=(5, 0))
+        return {'frame': frame, 'label': label, 'bar': bar}